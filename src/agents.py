@@ -1,6 +1,6 @@
 import json
 import logging
-from typing import List, Tuple
+from typing import Callable, List, Tuple, Optional
 import os
 import io
 import asyncio
@@ -15,9 +15,11 @@ from src.prompts import (
     CONTENT_RESEARCH_PROMPT,
     STORY_BOARD_PROMPT,
 )
-from src.utils import extract_x
+from src.utils import extract_x, JsonArrayStreamParser
+from src.single_flight import coalesce, content_key, normalize_text
 from src.clients import (
     openai_response,
+    openai_response_stream,
     openai_image_response,
     download_image,
     google_image_response,
@@ -52,6 +54,41 @@ async def story_board_generator(headline: str, research_result: str, template: s
     return json.loads(extract_x(response, "json"))
 
 
+async def story_board_stream_generator(
+    headline: str,
+    research_result: str,
+    template: str,
+    image_bytes: bytes,
+    on_slide: Callable[[int, dict], None],
+) -> dict:
+    """
+    Stream the story board and call on_slide(index, slide) with each slide as
+    soon as the model has finished writing it. Returns the full story board
+    at the end.
+    """
+    prompt = STORY_BOARD_PROMPT.format(headline, research_result, template)
+    images = [image_bytes] if image_bytes else []
+    parser = JsonArrayStreamParser("storyboard")
+    streamed_slides = []
+    chunks = []
+
+    async for delta in openai_response_stream(
+        prompt=prompt, model="gpt-4.1", images=images, type="bytes"
+    ):
+        chunks.append(delta)
+        for index, slide in parser.feed(delta):
+            streamed_slides.append(slide)
+            on_slide(index, slide)
+
+    try:
+        return json.loads(extract_x("".join(chunks), "json"))
+    except Exception as e:
+        if not streamed_slides:
+            raise
+        logger.warning(f"Falling back to streamed slides, full parse failed: {e}")
+        return {"storyboard": streamed_slides}
+
+
 async def image_desc_generator(query: str = "") -> List[str]:
     prompt = IMAGE_DESCRIPTION_PROMPT.format(query)
     response = await openai_response(prompt=prompt, model="gpt-4.1")
@@ -69,6 +106,121 @@ async def image_generator(query: str = "", model="gpt-image-1") -> bytes:
     return response
 
 
+# Image models and the API key each one needs to be usable
+IMAGE_MODEL_KEYS = {
+    "gpt-image-1": "OPENAI_API_KEY",
+    "imagen-4.0-ultra-generate-preview-06-06": "GOOGLE_API_KEY",
+    "flux-pro-1.1-ultra": "FLUX_API_KEY",
+}
+
+
+def configured_image_models(models: Optional[List[str]] = None) -> List[str]:
+    """Filter models (in preference order) down to the ones whose API key is set"""
+    models = models or list(IMAGE_MODEL_KEYS)
+    return [
+        model
+        for model in models
+        if model not in IMAGE_MODEL_KEYS or os.getenv(IMAGE_MODEL_KEYS[model])
+    ]
+
+
+async def race_image_generator(
+    query: str,
+    models: Optional[List[str]] = None,
+    hedge_delay: float = 0,
+    deadline: float = 150,
+    mode: str = "first",
+) -> Tuple[str, bytes]:
+    """
+    Generate the same image on several providers and keep the winner.
+
+    Providers are launched in preference order. With hedge_delay == 0 they all
+    start at once; otherwise the next provider is only started if no image has
+    arrived after hedge_delay seconds (or as soon as an earlier provider fails).
+
+    Args:
+        query: Image description sent to every provider
+        models: Candidate models in preference order (defaults to all configured)
+        hedge_delay: Seconds to wait before launching the next provider
+        deadline: Overall time budget in seconds
+        mode: "first" returns the first acceptable image, "best_of" waits for
+            every provider (up to the deadline) and keeps the most preferred one
+
+    Returns:
+        Tuple of (winning model, image bytes). Remaining requests are cancelled.
+    """
+    models = configured_image_models(models)
+    if not models:
+        raise ValueError("No image generation provider is configured")
+
+    loop = asyncio.get_running_loop()
+    end_time = loop.time() + deadline
+    pending = {}
+    results = {}
+    next_index = 0
+
+    def launch_next():
+        nonlocal next_index
+        model = models[next_index]
+        next_index += 1
+        task = asyncio.create_task(image_generator(query=query, model=model))
+        pending[task] = model
+        logger.info(f"Racing image generation on {model}")
+
+    launch_next()
+    while hedge_delay <= 0 and next_index < len(models):
+        launch_next()
+
+    try:
+        while pending or next_index < len(models):
+            remaining = end_time - loop.time()
+            if remaining <= 0:
+                logger.warning(f"Image race hit the {deadline}s deadline")
+                break
+            if not pending:
+                launch_next()
+                continue
+
+            timeout = remaining
+            if next_index < len(models):
+                timeout = min(remaining, hedge_delay)
+            done, _ = await asyncio.wait(
+                pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+            )
+
+            if not done:
+                # Hedge window elapsed without a result, start the next provider
+                if next_index < len(models):
+                    launch_next()
+                continue
+
+            for task in done:
+                model = pending.pop(task)
+                try:
+                    image_bytes = task.result()
+                except Exception as e:
+                    logger.error(f"Image generation failed on {model}: {e}")
+                    image_bytes = None
+
+                if image_bytes:
+                    results[model] = image_bytes
+                elif next_index < len(models):
+                    launch_next()
+
+            if results and mode == "first":
+                break
+    finally:
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    if not results:
+        raise Exception(f"No provider returned an image for models: {models}")
+
+    model = min(results, key=models.index)
+    return model, results[model]
+
+
 async def image_scorer_agent(images: List[io.BytesIO], query: str) -> Tuple[dict, str]:
     resolution = Image.open(images[0]).size
     prompt = IMAGE_SCORER_PROMPT.format(query, resolution)
@@ -79,15 +231,31 @@ async def image_scorer_agent(images: List[io.BytesIO], query: str) -> Tuple[dict
 
 
 async def image_query_creator(headline: str, image: bytes) -> dict:
-    prompt = IMAGE_QUERY_PROMPT.format(headline)
-    response = await openai_response(
-        prompt,
-        model="gpt-4.1",
-        tools=[{"type": "web_search_preview"}],
-        type="bytes",
-        images=[image],
+    async def create_queries():
+        prompt = IMAGE_QUERY_PROMPT.format(headline)
+        response = await openai_response(
+            prompt,
+            model="gpt-4.1",
+            tools=[{"type": "web_search_preview"}],
+            type="bytes",
+            images=[image],
+        )
+        return json.loads(extract_x(response, "json"))
+
+    # Slides with the same (or near-same) description share one query request
+    return await coalesce(
+        "image_query", (normalize_text(headline), content_key(image)), create_queries
     )
-    return json.loads(extract_x(response, "json"))
+
+
+async def _download_image_bytes(image_url: str) -> Optional[bytes]:
+    """Download an image once per URL, shared by every slide that finds it"""
+
+    async def download():
+        image_data = await download_image(image_url)
+        return image_data.getvalue() if image_data else None
+
+    return await coalesce("download", image_url, download)
 
 
 async def image_search_agent(query: str, reference_image: bytes = None) -> List[dict]:
@@ -130,7 +298,12 @@ async def image_search_agent(query: str, reference_image: bytes = None) -> List[
         }
 
         search = GoogleSearch(params)
-        results = search.get_dict()
+        results = await coalesce(
+            "serp",
+            normalize_text(query),
+            lambda: asyncio.to_thread(search.get_dict),
+            cache_if=lambda results: results and "error" not in results,
+        )
 
         if (not results) or ("error" in results):
             logging.error(f"SERP API error: {results['error']}")
@@ -158,8 +331,10 @@ async def image_search_agent(query: str, reference_image: bytes = None) -> List[
         # Step 2: Download images to memory
         downloaded_images = []
         for i, img_data in enumerate(images_data):
-            image_data = await download_image(img_data["image_url"])
-            if image_data:
+            image_bytes = await _download_image_bytes(img_data["image_url"])
+            if image_bytes:
+                image_data = io.BytesIO(image_bytes)
+                image_data.name = "image.jpg"
                 downloaded_images.append({**img_data, "image_data": image_data})
             else:
                 logger.warning(f"Failed to download image {i+1}")
@@ -174,10 +349,19 @@ async def image_search_agent(query: str, reference_image: bytes = None) -> List[
             try:
                 # Create individual scoring tasks for each image
                 scoring_tasks = []
+                reference_key = content_key(reference_image)
                 for img_data in downloaded_images:
-                    # Send single image to scorer
-                    task = image_scorer_agent(
-                        [img_data["image_data"], reference_image], query
+                    # Send single image to scorer, shared with any slide scoring
+                    # the same image for the same query
+                    task = coalesce(
+                        "score",
+                        (img_data["image_url"], normalize_text(query), reference_key),
+                        lambda img_data=img_data: image_scorer_agent(
+                            [img_data["image_data"], reference_image], query
+                        ),
+                        # A response without a score gets retried by later slides
+                        cache_if=lambda response: isinstance(response[0], dict)
+                        and response[0].get("image_score"),
                     )
                     scoring_tasks.append((img_data, task))
 
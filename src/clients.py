@@ -1,10 +1,12 @@
-from typing import List, Tuple
+from typing import AsyncIterator, Callable, Dict, List, Tuple
+from collections import deque
 import base64
 import os
 from dotenv import load_dotenv
 import logging
 import io
 import asyncio
+import threading
 
 import httpx
 import openai
@@ -21,6 +23,116 @@ logging.getLogger("google").setLevel(logging.WARNING)
 openai_client = openai.AsyncClient(api_key=os.getenv("OPENAI_API_KEY"), timeout=150)
 google_client = genai.Client(api_key=os.getenv("GOOGLE_API_KEY"))
 
+# Resources that are bound to an event loop (pooled clients), one set per loop
+_loop_resources: Dict[asyncio.AbstractEventLoop, dict] = {}
+_loop_resources_lock = threading.Lock()
+
+
+async def _close_resources(resources: dict) -> None:
+    for name, resource in list(resources.items()):
+        if not name.startswith("_") and hasattr(resource, "aclose"):
+            try:
+                await resource.aclose()
+            except Exception as e:
+                logging.warning(f"Failed to close {name}: {e}")
+    resources.clear()
+
+
+async def _shutdown_guard(resources: dict):
+    """
+    Async generator that closes the loop's resources when the loop shuts down.
+
+    asyncio.run (and loop.shutdown_asyncgens) closes every async generator
+    started on the loop while the loop is still running, so pooled clients
+    get a proper aclose() before the loop is closed.
+    """
+    try:
+        yield
+    finally:
+        await _close_resources(resources)
+
+
+def _loop_resource(name: str, factory: Callable):
+    """Get or create a resource shared by everything running on the current loop"""
+    loop = asyncio.get_running_loop()
+    with _loop_resources_lock:
+        # Drop resources of loops that have finished (e.g. asyncio.run in a thread)
+        for closed_loop in [l for l in _loop_resources if l.is_closed()]:
+            stale = _loop_resources.pop(closed_loop)
+            for stale_name, resource in stale.items():
+                if not getattr(resource, "is_closed", True):
+                    logging.warning(
+                        f"{stale_name} of a closed event loop was never closed, "
+                        "run the loop with asyncio.run or await close_loop_resources()"
+                    )
+
+        resources = _loop_resources.get(loop)
+        if resources is None:
+            resources = _loop_resources[loop] = {}
+            # Start the guard so the loop tracks it (the reference keeps it alive)
+            guard = _shutdown_guard(resources)
+            try:
+                guard.asend(None).send(None)
+            except StopIteration:
+                pass
+            resources["_shutdown_guard"] = guard
+        if name not in resources:
+            resources[name] = factory()
+        return resources[name]
+
+
+async def close_loop_resources() -> None:
+    """
+    Shutdown hook: close the pooled clients of the current loop.
+
+    Call it before closing a loop that isn't run with asyncio.run (which
+    already does this through loop.shutdown_asyncgens).
+    """
+    loop = asyncio.get_running_loop()
+    with _loop_resources_lock:
+        resources = _loop_resources.pop(loop, None)
+    if resources:
+        guard = resources.pop("_shutdown_guard", None)
+        await _close_resources(resources)
+        if guard is not None:
+            await guard.aclose()
+
+
+def get_openai_limiter() -> asyncio.Semaphore:
+    """Limits concurrent OpenAI requests from all slides running on the current loop"""
+    return _loop_resource(
+        "openai_limiter",
+        lambda: asyncio.Semaphore(int(os.getenv("OPENAI_MAX_CONCURRENCY", "16"))),
+    )
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """Pooled httpx client shared by all requests on the current event loop"""
+    return _loop_resource(
+        "http_client",
+        lambda: httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=50, max_keepalive_connections=20),
+            timeout=30,
+        ),
+    )
+
+
+_sync_http_client = None
+_sync_http_client_lock = threading.Lock()
+
+
+def get_sync_http_client() -> httpx.Client:
+    """Pooled httpx client shared by blocking downloads (safe to use from threads)"""
+    global _sync_http_client
+    if _sync_http_client is None:
+        with _sync_http_client_lock:
+            if _sync_http_client is None:
+                _sync_http_client = httpx.Client(
+                    limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+                    timeout=10,
+                )
+    return _sync_http_client
+
 
 def sync_download_image(image_url: str) -> io.BytesIO:
     """
@@ -28,8 +140,8 @@ def sync_download_image(image_url: str) -> io.BytesIO:
     Returns the image data as BytesIO object if it's a valid image
     """
     try:
-        with httpx.Client() as client:
-            response = client.get(image_url, timeout=10)
+        # Streamed so the body of non-image responses (e.g. videos) is never read
+        with get_sync_http_client().stream("GET", image_url, timeout=10) as response:
             response.raise_for_status()
 
             # Check if content type is an image
@@ -41,7 +153,7 @@ def sync_download_image(image_url: str) -> io.BytesIO:
                 return None
 
             # Create BytesIO object with image data
-            image_data = io.BytesIO(response.content)
+            image_data = io.BytesIO(response.read())
             image_data.name = "image.jpg"  # Default name
             return image_data
     except Exception as e:
@@ -49,28 +161,28 @@ def sync_download_image(image_url: str) -> io.BytesIO:
         return None
 
 
-async def download_image(image_url: str) -> io.BytesIO:
+async def download_image(image_url: str, timeout: float = 10) -> io.BytesIO:
     """
     Download image from URL and return as BytesIO object
     Returns the image data as BytesIO object if it's a valid image
     """
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(image_url, timeout=10)
-            response.raise_for_status()
-
-            # Check if content type is an image
-            content_type = response.headers.get("content-type", "").lower()
-            if not content_type.startswith("image/"):
-                logging.warning(
-                    f"URL does not return an image content type: {content_type} for {image_url}"
-                )
-                return None
+        client = get_async_http_client()
+        response = await client.get(image_url, timeout=timeout)
+        response.raise_for_status()
+
+        # Check if content type is an image
+        content_type = response.headers.get("content-type", "").lower()
+        if not content_type.startswith("image/"):
+            logging.warning(
+                f"URL does not return an image content type: {content_type} for {image_url}"
+            )
+            return None
 
-            # Create BytesIO object with image data
-            image_data = io.BytesIO(response.content)
-            image_data.name = "image.jpg"  # Default name
-            return image_data
+        # Create BytesIO object with image data
+        image_data = io.BytesIO(response.content)
+        image_data.name = "image.jpg"  # Default name
+        return image_data
     except Exception as e:
         logging.error(f"Failed to download image {image_url}: {e}")
         return None
@@ -81,35 +193,28 @@ async def download_video(video_url: str) -> io.BytesIO:
     Returns the video data as BytesIO object if it's a valid video
     """
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(video_url, timeout=10)  
-            response.raise_for_status()
-            
-            # Check if content type is a video
-            content_type = response.headers.get("content-type", "").lower()
-            if not content_type.startswith("video/"):
-                logging.warning(
-                    f"URL does not return a video content type: {content_type} for {video_url}"
-                )
-                return None
-            
-            # Create BytesIO object with video data
-            video_data = io.BytesIO(response.content)
-            video_data.name = "video.mp4"  # Default name
-            return video_data
+        client = get_async_http_client()
+        response = await client.get(video_url, timeout=10)
+        response.raise_for_status()
+
+        # Check if content type is a video
+        content_type = response.headers.get("content-type", "").lower()
+        if not content_type.startswith("video/"):
+            logging.warning(
+                f"URL does not return a video content type: {content_type} for {video_url}"
+            )
+            return None
+
+        # Create BytesIO object with video data
+        video_data = io.BytesIO(response.content)
+        video_data.name = "video.mp4"  # Default name
+        return video_data
     except Exception as e:
         logging.error(f"Failed to download video {video_url}: {e}")
         return None
 
-async def openai_response(
-    prompt,
-    model: str = "gpt-4.1",
-    use_web_search: bool = False,
-    tools: List[str] = [],
-    images: List[str] = [],
-    type: str = "path",
-) -> Tuple[dict, dict]:
-
+def _build_input_content(prompt: str, images: List[str], type: str) -> List[dict]:
+    """Build the user message content (images followed by the prompt text)"""
     media_type = "image/png"
     messages = []
     if type == "path":
@@ -141,21 +246,56 @@ async def openai_response(
                 )
 
     messages.append({"type": "input_text", "text": prompt})
-    if use_web_search:
-        response = await openai_client.responses.create(
+    return messages
+
+
+async def openai_response(
+    prompt,
+    model: str = "gpt-4.1",
+    use_web_search: bool = False,
+    tools: List[str] = [],
+    images: List[str] = [],
+    type: str = "path",
+) -> Tuple[dict, dict]:
+
+    messages = _build_input_content(prompt, images, type)
+    async with get_openai_limiter():
+        if use_web_search:
+            response = await openai_client.responses.create(
+                model=model,
+                input=[{"role": "user", "content": messages}],
+                tools=[{"type": "web_search_preview", "search_context_size": "low"}]
+                + tools,
+                timeout=150,
+            )
+            return response.output_text
+        else:
+            response = await openai_client.responses.create(
+                model=model, input=[{"role": "user", "content": messages}], tools=tools
+            )
+
+    return response.output_text
+
+
+async def openai_response_stream(
+    prompt,
+    model: str = "gpt-4.1",
+    tools: List[str] = [],
+    images: List[str] = [],
+    type: str = "path",
+) -> AsyncIterator[str]:
+    """Same as openai_response, but yields the output text as it is generated"""
+    messages = _build_input_content(prompt, images, type)
+    async with get_openai_limiter():
+        stream = await openai_client.responses.create(
             model=model,
             input=[{"role": "user", "content": messages}],
-            tools=[{"type": "web_search_preview", "search_context_size": "low"}]
-            + tools,
-            timeout=150,
-        )
-        return response.output_text
-    else:
-        response = await openai_client.responses.create(
-            model=model, input=[{"role": "user", "content": messages}], tools=tools
+            tools=tools,
+            stream=True,
         )
-
-    return response.output_text
+        async for event in stream:
+            if event.type == "response.output_text.delta":
+                yield event.delta
 
 
 async def openai_image_response(
@@ -218,26 +358,79 @@ async def google_image_response(
         return None
 
 
-async def flux_image_response(
-    prompt: str, timeout=200, model="flux-pro-1.1-ultra"
-) -> bytes:
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            f"https://api.bfl.ai/v1/{model}",
-            headers={
-                "accept": "application/json",
-                "x-key": os.environ.get("FLUX_API_KEY"),
-                "Content-Type": "application/json",
-            },
-            json={"prompt": prompt, "aspect_ratio": "3:4"},
-            timeout=timeout,
-        )
-        request = response.json()
+class FluxJobPoller:
+    """
+    Polls pending Flux generation jobs with adaptive intervals.
+
+    Completion times of finished jobs are recorded, and the next poll of a job
+    is scheduled at the next quantile of that distribution that the job has
+    not reached yet (falling back to exponential backoff). All jobs on a loop
+    share the pooled http client, so many jobs can be pending at once.
+    """
+
+    FAILED_STATUSES = {
+        "Error",
+        "Failed",
+        "Request Moderated",
+        "Content Moderated",
+        "Task not found",
+    }
+
+    # Every request gets the time left until the deadline, but at least this
+    MIN_REQUEST_TIMEOUT = 1.0
+
+    def __init__(
+        self,
+        min_interval: float = 0.5,
+        max_interval: float = 5.0,
+        history_size: int = 50,
+    ):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.durations = deque(maxlen=history_size)
+
+    def next_interval(self, elapsed: float, last_interval: float) -> float:
+        """Seconds to wait before the next poll of a job running for `elapsed`"""
+        if len(self.durations) < 5:
+            interval = last_interval * 1.5 if last_interval else 1.0
+        else:
+            observed = sorted(self.durations)
+            quantiles = [
+                observed[int(q * (len(observed) - 1))]
+                for q in (0.1, 0.25, 0.5, 0.75, 0.9)
+            ]
+            upcoming = [t for t in quantiles if t > elapsed]
+            if upcoming:
+                interval = upcoming[0] - elapsed
+            else:
+                interval = (last_interval or self.min_interval) * 1.5
+        return min(max(interval, self.min_interval), self.max_interval)
+
+    def request_timeout(self, request_id: str, deadline: float, started_at: float) -> float:
+        """Timeout for the next request of a job, raising once the deadline has passed"""
+        remaining = deadline - (asyncio.get_running_loop().time() - started_at)
+        if remaining <= 0:
+            raise TimeoutError(f"Flux generation {request_id} not ready after {deadline}s")
+        return max(remaining, self.MIN_REQUEST_TIMEOUT)
+
+    async def wait_for_result(
+        self, request_id: str, polling_url: str, deadline: float, started_at: float
+    ) -> str:
+        """Poll a job until it is ready and return the signed result URL"""
+        client = get_async_http_client()
+        loop = asyncio.get_running_loop()
+        interval = 0
 
-        request_id = request["id"]
-        polling_url = request["polling_url"]
         while True:
-            await asyncio.sleep(1)
+            elapsed = loop.time() - started_at
+            remaining = deadline - elapsed
+            if remaining <= 0:
+                raise TimeoutError(
+                    f"Flux generation {request_id} not ready after {deadline}s"
+                )
+
+            interval = min(self.next_interval(elapsed, interval), remaining)
+            await asyncio.sleep(interval)
             response = await client.get(
                 polling_url,
                 headers={
@@ -247,20 +440,62 @@ async def flux_image_response(
                 params={
                     "id": request_id,
                 },
-                timeout=timeout,
+                timeout=self.request_timeout(request_id, deadline, started_at),
             )
             result = response.json()
 
             status = result["status"]
 
             if status == "Ready":
-                signed_url = result["result"]["sample"]
-                break
-            elif status in ["Error", "Failed"]:
+                self.durations.append(loop.time() - started_at)
+                return result["result"]["sample"]
+            elif status in self.FAILED_STATUSES:
                 logging.error(f"Generation failed: {result}")
                 raise Exception(f"Flux Generation failed: {result}")
 
-    image_bytes = await download_image(signed_url)
+
+flux_poller = FluxJobPoller()
+
+
+async def flux_image_response(
+    prompt: str, timeout=200, model="flux-pro-1.1-ultra"
+) -> bytes:
+    client = get_async_http_client()
+    started_at = asyncio.get_running_loop().time()
+    try:
+        return await _flux_generate(client, prompt, timeout, model, started_at)
+    except httpx.TimeoutException as e:
+        raise TimeoutError(f"Flux generation timed out after {timeout}s") from e
+
+
+async def _flux_generate(
+    client: httpx.AsyncClient, prompt: str, timeout: float, model: str, started_at: float
+) -> bytes:
+    """Submit a Flux job, wait for it and download the image, all within timeout"""
+    response = await client.post(
+        f"https://api.bfl.ai/v1/{model}",
+        headers={
+            "accept": "application/json",
+            "x-key": os.environ.get("FLUX_API_KEY"),
+            "Content-Type": "application/json",
+        },
+        json={"prompt": prompt, "aspect_ratio": "3:4"},
+        timeout=flux_poller.request_timeout("request", timeout, started_at),
+    )
+    request = response.json()
+
+    signed_url = await flux_poller.wait_for_result(
+        request_id=request["id"],
+        polling_url=request["polling_url"],
+        deadline=timeout,
+        started_at=started_at,
+    )
+
+    image_bytes = await download_image(
+        signed_url, timeout=flux_poller.request_timeout(request["id"], timeout, started_at)
+    )
+    if image_bytes is None:
+        raise Exception(f"Failed to download Flux image {request['id']}")
     return image_bytes.getvalue()
 
 
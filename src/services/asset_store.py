@@ -0,0 +1,165 @@
+import os
+import uuid
+import base64
+import logging
+from pathlib import Path
+from typing import BinaryIO, Dict, Optional
+
+import gridfs
+from bson import ObjectId
+from dotenv import load_dotenv
+
+from src.utils import create_thumbnail
+
+load_dotenv(override=True)
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.WARNING)
+
+# Thumbnail sizes stored next to every image: small for listings, medium for
+# the 300-400px previews on the pages (2x for high density screens)
+THUMBNAIL_SIZES = {
+    "small": (160, 200),
+    "medium": (540, 675),
+}
+
+
+class GridFSAssetStore:
+    """Stores binary assets (images, videos) in a GridFS bucket"""
+
+    kind = "gridfs"
+
+    def __init__(self, db, bucket_name: str = "assets"):
+        self.bucket = gridfs.GridFSBucket(db, bucket_name=bucket_name)
+
+    def put(
+        self, data: bytes, filename: str, content_type: str, metadata: Optional[Dict] = None
+    ) -> str:
+        file_id = self.bucket.upload_from_stream(
+            filename,
+            data,
+            metadata={"content_type": content_type, **(metadata or {})},
+        )
+        return str(file_id)
+
+    def open(self, asset_id: str) -> BinaryIO:
+        return self.bucket.open_download_stream(ObjectId(asset_id))
+
+    def delete(self, asset_id: str) -> None:
+        self.bucket.delete(ObjectId(asset_id))
+
+
+class LocalAssetStore:
+    """Stores binary assets as files on disk (local stand-in for an object store)"""
+
+    kind = "local"
+
+    def __init__(self, root: str = "./data/assets"):
+        self.root = Path(root)
+
+    def _path(self, asset_id: str) -> Path:
+        return self.root / asset_id[:2] / asset_id
+
+    def put(
+        self, data: bytes, filename: str, content_type: str, metadata: Optional[Dict] = None
+    ) -> str:
+        asset_id = uuid.uuid4().hex
+        path = self._path(asset_id)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+        return asset_id
+
+    def open(self, asset_id: str) -> BinaryIO:
+        return open(self._path(asset_id), "rb")
+
+    def delete(self, asset_id: str) -> None:
+        self._path(asset_id).unlink(missing_ok=True)
+
+
+def create_asset_store(db):
+    """Create the asset store selected by the ASSET_STORE env var (gridfs or local)"""
+    store_type = os.getenv("ASSET_STORE", "gridfs")
+    if store_type == "local":
+        return LocalAssetStore(os.getenv("ASSET_STORE_PATH", "./data/assets"))
+    elif store_type == "gridfs":
+        return GridFSAssetStore(db)
+    else:
+        raise ValueError(f"Unknown asset store: {store_type}")
+
+
+def store_asset(
+    store, data: bytes, filename: str, content_type: str, metadata: Optional[Dict] = None
+) -> Optional[Dict]:
+    """Store bytes and return the reference that is saved in documents"""
+    if not data:
+        return None
+    asset_id = store.put(data, filename, content_type, metadata)
+    return {
+        "asset_id": asset_id,
+        "store": store.kind,
+        "content_type": content_type,
+        "size": len(data),
+    }
+
+
+def store_thumbnails(
+    store, image_bytes: bytes, filename: str, metadata: Optional[Dict] = None
+) -> Dict[str, Optional[Dict]]:
+    """Store a WebP thumbnail of every THUMBNAIL_SIZES size, keyed by size"""
+    thumbnails = {}
+    for size, dimensions in THUMBNAIL_SIZES.items():
+        try:
+            thumbnails[size] = store_asset(
+                store,
+                create_thumbnail(image_bytes, dimensions),
+                filename=f"{Path(filename).stem}_{size}.webp",
+                content_type="image/webp",
+                metadata={**(metadata or {}), "thumbnail": size},
+            )
+        except Exception as e:
+            logger.error(f"Error creating {size} thumbnail for {filename}: {e}")
+            thumbnails[size] = None
+    return thumbnails
+
+
+def get_asset_store():
+    """Get the asset store of the shared Mongo client"""
+    # Imported here as mongo_client depends on this module
+    from src.services.mongo_client import get_mongo_client
+
+    return get_mongo_client().asset_store
+
+
+def open_asset(asset: Dict, store=None) -> BinaryIO:
+    """Open a stored asset for streaming reads"""
+    store = store or get_asset_store()
+    if asset.get("store") != store.kind:
+        raise ValueError(f"Asset stored in {asset.get('store')}, not {store.kind}")
+    return store.open(asset["asset_id"])
+
+
+def load_image_bytes(
+    image_info: Optional[Dict], store=None, size: Optional[str] = None
+) -> Optional[bytes]:
+    """
+    Load the bytes of a stored image version.
+
+    Handles both documents holding an asset reference and older documents
+    with the image inlined as base64. With size ("small" or "medium") the
+    stored thumbnail is loaded instead, falling back to the full image when
+    there is no thumbnail of that size.
+    """
+    if not image_info:
+        return None
+    try:
+        thumbnail = (image_info.get("thumbnails") or {}).get(size) if size else None
+        if thumbnail:
+            with open_asset(thumbnail, store) as stream:
+                return stream.read()
+        if image_info.get("asset"):
+            with open_asset(image_info["asset"], store) as stream:
+                return stream.read()
+        if image_info.get("image_base64"):
+            return base64.b64decode(image_info["image_base64"])
+    except Exception as e:
+        logger.error(f"Error loading image {image_info.get('filename', '')}: {e}")
+    return None
@@ -0,0 +1,99 @@
+import asyncio
+import functools
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from src.services.mongo_client import SimpleMongoClient, get_mongo_client
+
+logger = logging.getLogger(__name__)
+
+# pymongo is blocking, so every database call runs on this bounded pool
+# instead of the event loop (or the shared default executor)
+MONGO_WORKERS = int(os.getenv("MONGO_WORKERS", "4"))
+mongo_executor = ThreadPoolExecutor(
+    max_workers=MONGO_WORKERS, thread_name_prefix="mongo"
+)
+
+
+class AsyncMongoRepository:
+    """
+    Async data access for workflows and daemons.
+
+    Wraps SimpleMongoClient and runs each call (including image compression
+    and asset uploads) on the mongo executor, so the event loop keeps serving
+    other slides and fetches while documents are written.
+    """
+
+    def __init__(self, client: Optional[SimpleMongoClient] = None):
+        self._client = client
+
+    @property
+    def client(self) -> SimpleMongoClient:
+        return self._client or get_mongo_client()
+
+    async def _run(self, fn: Callable, *args, **kwargs) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            mongo_executor, functools.partial(fn, *args, **kwargs)
+        )
+
+    async def store_content_workflow(self, **kwargs) -> str:
+        return await self._run(self.client.store_content_workflow, **kwargs)
+
+    async def mark_workflow_failed(self, **kwargs) -> None:
+        await self._run(self.client.mark_workflow_failed, **kwargs)
+
+    async def get_workflow_result(self, session_id: str) -> Optional[Dict]:
+        return await self._run(self.client.get_workflow_result, session_id)
+
+    async def store_checkpoint_asset(
+        self, data: bytes, filename: str, session_id: str
+    ) -> Optional[Dict]:
+        return await self._run(
+            self.client.store_checkpoint_asset, data, filename, session_id
+        )
+
+    async def load_image(self, image_info: Optional[Dict]) -> Optional[bytes]:
+        return await self._run(self.client.load_image, image_info)
+
+    async def save_checkpoint(self, session_id: str, fields: Dict) -> None:
+        await self._run(self.client.save_checkpoint, session_id, fields)
+
+    async def get_checkpoint(self, session_id: str) -> Optional[Dict]:
+        return await self._run(self.client.get_checkpoint, session_id)
+
+    async def delete_checkpoint(self, session_id: str) -> None:
+        await self._run(self.client.delete_checkpoint, session_id)
+
+    async def get_latest_source_timestamp(
+        self, source: Optional[str] = None, account_id: Optional[str] = None, untagged: bool = False
+    ) -> Optional[int]:
+        return await self._run(self.client.get_latest_source_timestamp, source, account_id, untagged)
+
+    async def get_source_watermark(self, platform: str, account_id: str) -> Optional[Dict]:
+        return await self._run(self.client.get_source_watermark, platform, account_id)
+
+    async def save_source_watermark(self, platform: str, account_id: str, fields: Dict) -> None:
+        await self._run(self.client.save_source_watermark, platform, account_id, fields)
+
+    async def find_source_media(self, urls: List[str]) -> Dict[str, Dict]:
+        return await self._run(self.client.find_source_media, urls)
+
+    async def find_existing_source_codes(self, codes: List[str]) -> Set[str]:
+        return await self._run(self.client.find_existing_source_codes, codes)
+
+    async def add_sources(self, posts: List[Dict]) -> Dict:
+        return await self._run(self.client.add_sources, posts)
+
+
+_repository: Optional[AsyncMongoRepository] = None
+
+
+def get_async_repository() -> AsyncMongoRepository:
+    """Get the async repository backed by the shared Mongo client"""
+    global _repository
+    if _repository is None:
+        _repository = AsyncMongoRepository()
+    return _repository
@@ -0,0 +1,165 @@
+import io
+import os
+import json
+import time
+import asyncio
+import hashlib
+import logging
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+from dotenv import load_dotenv
+
+from src.clients import get_async_http_client
+
+load_dotenv(override=True)
+logger = logging.getLogger(__name__)
+
+
+class AvatarCache:
+    """
+    On-disk cache of profile pictures, keyed by URL.
+
+    Entries younger than ttl_seconds are served without any request. Older
+    entries are revalidated with If-None-Match / If-Modified-Since, so an
+    unchanged avatar only costs a 304. When the cache grows beyond max_bytes
+    the least recently used entries are removed. File IO runs in worker
+    threads so the event loop is never blocked.
+    """
+
+    def __init__(self, root: str, max_bytes: int, ttl_seconds: float):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+
+    def _paths(self, url: str) -> tuple[Path, Path]:
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return self.root / f"{key}.img", self.root / f"{key}.json"
+
+    def _read(self, url: str) -> tuple[Optional[bytes], Dict]:
+        data_path, meta_path = self._paths(url)
+        try:
+            return data_path.read_bytes(), json.loads(meta_path.read_text())
+        except (OSError, ValueError):
+            return None, {}
+
+    def _write_atomic(self, path: Path, data: bytes) -> None:
+        """Write through a unique temp file, so concurrent fetches never share one"""
+        with tempfile.NamedTemporaryFile(dir=self.root, suffix=".tmp", delete=False) as tmp:
+            tmp.write(data)
+        try:
+            os.replace(tmp.name, path)
+        except OSError:
+            os.unlink(tmp.name)
+            raise
+
+    def _write_meta(self, meta_path: Path, meta: Dict) -> None:
+        self._write_atomic(meta_path, json.dumps(meta).encode("utf-8"))
+
+    def _store(self, url: str, data: bytes, meta: Dict) -> None:
+        data_path, meta_path = self._paths(url)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._write_atomic(data_path, data)
+        self._write_meta(meta_path, meta)
+        self._evict()
+
+    def _touch(self, url: str) -> None:
+        data_path, _ = self._paths(url)
+        try:
+            os.utime(data_path)
+        except OSError:
+            pass
+
+    def _evict(self) -> None:
+        """Remove least recently used entries until the cache fits in max_bytes"""
+        with self._lock:
+            entries = []
+            for data_path in self.root.glob("*.img"):
+                try:
+                    stat = data_path.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, data_path))
+
+            total = sum(size for _, size, _ in entries)
+            for _, size, data_path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                data_path.unlink(missing_ok=True)
+                data_path.with_suffix(".json").unlink(missing_ok=True)
+                total -= size
+
+    async def get(self, url: str) -> Optional[io.BytesIO]:
+        """
+        Get a profile picture, downloading or revalidating it if needed.
+
+        Returns the image as BytesIO (like download_image), or None if it
+        can't be downloaded and isn't cached.
+        """
+        if not url:
+            return None
+        cached, meta = await asyncio.to_thread(self._read, url)
+        if cached and time.time() - meta.get("fetched_at", 0) < self.ttl_seconds:
+            await asyncio.to_thread(self._touch, url)
+            return self._to_bytes_io(cached)
+
+        headers = {}
+        if cached:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+        try:
+            response = await get_async_http_client().get(url, headers=headers, timeout=10)
+            if response.status_code == 304 and cached:
+                meta["fetched_at"] = time.time()
+                await asyncio.to_thread(self._write_meta, self._paths(url)[1], meta)
+                await asyncio.to_thread(self._touch, url)
+                return self._to_bytes_io(cached)
+            response.raise_for_status()
+
+            content_type = response.headers.get("content-type", "").lower()
+            if not content_type.startswith("image/"):
+                raise ValueError(f"URL does not return an image content type: {content_type}")
+
+            await asyncio.to_thread(
+                self._store,
+                url,
+                response.content,
+                {
+                    "url": url,
+                    "etag": response.headers.get("etag"),
+                    "last_modified": response.headers.get("last-modified"),
+                    "fetched_at": time.time(),
+                },
+            )
+            return self._to_bytes_io(response.content)
+        except Exception as e:
+            if cached:
+                # A stale avatar is better than no card
+                logger.warning(f"Revalidating avatar {url} failed, using cached copy: {e}")
+                return self._to_bytes_io(cached)
+            logger.error(f"Failed to download avatar {url}: {e}")
+            return None
+
+    @staticmethod
+    def _to_bytes_io(data: bytes) -> io.BytesIO:
+        image_data = io.BytesIO(data)
+        image_data.name = "image.jpg"
+        return image_data
+
+
+avatar_cache = AvatarCache(
+    root=os.getenv("AVATAR_CACHE_DIR", "./data/twitter/avatar_cache"),
+    max_bytes=int(float(os.getenv("AVATAR_CACHE_MAX_MB", "50")) * 1024 * 1024),
+    ttl_seconds=float(os.getenv("AVATAR_CACHE_TTL_HOURS", "24")) * 3600,
+)
+
+
+async def download_avatar(url: str) -> Optional[io.BytesIO]:
+    """Download a profile picture through the shared avatar cache"""
+    return await avatar_cache.get(url)
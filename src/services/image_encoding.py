@@ -0,0 +1,266 @@
+import io
+import os
+import time
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from PIL import Image, features
+from dotenv import load_dotenv
+
+load_dotenv(override=True)
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.WARNING)
+
+# Largest dimensions kept for re-encoded images (passthrough keeps the original)
+MAX_SIZE = (1200, 1800)
+
+# Supported encodings; "passthrough" stores the original bytes untouched
+ENCODINGS = {
+    "jpeg": {
+        "format": "JPEG",
+        "content_type": "image/jpeg",
+        "options": {"quality": 75, "optimize": True},
+    },
+    "webp": {
+        "format": "WEBP",
+        "content_type": "image/webp",
+        "options": {"quality": 80, "method": 4},
+    },
+    # For lossless WebP quality is the compression effort, not fidelity
+    "webp_lossless": {
+        "format": "WEBP",
+        "content_type": "image/webp",
+        "options": {"lossless": True, "quality": 80, "method": 4},
+    },
+    "avif": {
+        "format": "AVIF",
+        "content_type": "image/avif",
+        "options": {"quality": 60, "speed": 6},
+    },
+    "passthrough": None,
+}
+
+# Encoding per asset type, overridable with ASSET_ENCODING_<TYPE>:
+# text_render:  slides rendered from text only (sharp edges, flat colours)
+# photo_render: text overlaid on a photo
+# photo:        background photos without text
+# source:       media downloaded from source posts
+ASSET_ENCODINGS = {
+    asset_type: os.getenv(f"ASSET_ENCODING_{asset_type.upper()}", default)
+    for asset_type, default in {
+        "text_render": "webp_lossless",
+        "photo_render": "webp",
+        "photo": "webp",
+        "source": "jpeg",
+    }.items()
+}
+
+_PASSTHROUGH_TYPES = {
+    "JPEG": "image/jpeg",
+    "PNG": "image/png",
+    "WEBP": "image/webp",
+    "AVIF": "image/avif",
+    "GIF": "image/gif",
+}
+
+# File extension for each content type an asset can be stored as
+EXTENSIONS = {
+    "image/jpeg": ".jpg",
+    "image/png": ".png",
+    "image/webp": ".webp",
+    "image/avif": ".avif",
+    "image/gif": ".gif",
+    "video/mp4": ".mp4",
+}
+
+
+def detect_content_type(image_bytes: bytes) -> str:
+    """Content type of image bytes, from the image format Pillow detects"""
+    try:
+        image_format = Image.open(io.BytesIO(image_bytes)).format
+        return _PASSTHROUGH_TYPES.get(image_format, "application/octet-stream")
+    except Exception:
+        return "application/octet-stream"
+
+
+def filename_for(filename: str, content_type: str) -> str:
+    """Replace the extension of filename with the one of content_type"""
+    extension = EXTENSIONS.get(content_type)
+    if not extension:
+        return filename
+    return f"{os.path.splitext(filename)[0]}{extension}"
+
+
+def encode_image(
+    image_bytes: bytes, encoding: str, max_size: tuple = MAX_SIZE
+) -> Tuple[bytes, str]:
+    """
+    Re-encode an image with one of the ENCODINGS.
+
+    Args:
+        image_bytes: Raw image bytes
+        encoding: Key of ENCODINGS
+        max_size: Maximum dimensions (width, height), aspect ratio is kept
+
+    Returns:
+        Tuple of (encoded bytes, content type)
+    """
+    if encoding not in ENCODINGS:
+        raise ValueError(f"Unknown image encoding: {encoding}")
+    if not image_bytes:
+        raise ValueError("Image data is empty")
+
+    config = ENCODINGS[encoding]
+    if config is None:
+        return image_bytes, detect_content_type(image_bytes)
+
+    if config["format"] == "AVIF" and not features.check("avif"):
+        logger.warning("AVIF is not supported by this Pillow build, using webp")
+        return encode_image(image_bytes, "webp", max_size)
+
+    img = Image.open(io.BytesIO(image_bytes))
+    if config["format"] == "JPEG":
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+    elif img.mode not in ("RGB", "RGBA"):
+        img = img.convert("RGBA" if "transparency" in img.info else "RGB")
+    # thumbnail() only ever shrinks
+    img.thumbnail(max_size, Image.Resampling.LANCZOS)
+
+    output = io.BytesIO()
+    img.save(output, format=config["format"], **config["options"])
+    return output.getvalue(), config["content_type"]
+
+
+def encode_asset(image_bytes: bytes, asset_type: str) -> Tuple[bytes, str]:
+    """Encode an image with the encoding configured for its asset type
+
+    Falls back to the original bytes if encoding fails.
+    """
+    encoding = ASSET_ENCODINGS.get(asset_type, "jpeg")
+    try:
+        return encode_image(image_bytes, encoding)
+    except Exception as e:
+        logger.error(f"Error encoding {asset_type} image as {encoding}: {e}")
+        return image_bytes, detect_content_type(image_bytes)
+
+
+def benchmark_encodings(
+    images: Dict[str, bytes], encodings: Optional[List[str]] = None
+) -> List[Dict]:
+    """
+    Encode every image with every encoding and measure size and time.
+
+    Ratios are only meaningful for original renders (PNG screenshots); an
+    image that was already stored lossy or compressed mostly measures the
+    earlier encoding.
+
+    Args:
+        images: Mapping of a label (e.g. "writeup/with_text") to original image bytes
+        encodings: Encodings to compare (defaults to all of ENCODINGS)
+
+    Returns:
+        One row per (label, encoding) with bytes, ratio to the original and
+        encode time in milliseconds
+    """
+    results = []
+    for label, image_bytes in images.items():
+        for encoding in encodings or list(ENCODINGS):
+            start = time.perf_counter()
+            try:
+                encoded, _ = encode_image(image_bytes, encoding)
+            except Exception as e:
+                logger.error(f"Benchmark of {encoding} failed for {label}: {e}")
+                continue
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            results.append(
+                {
+                    "image": label,
+                    "encoding": encoding,
+                    "bytes": len(encoded),
+                    "ratio": round(len(encoded) / len(image_bytes), 3),
+                    "encode_ms": round(elapsed_ms, 1),
+                }
+            )
+    return results
+
+
+def _render_template_samples(
+    page_names: Optional[List[str]] = None, background_image: Optional[str] = None
+) -> Dict[str, bytes]:
+    """
+    Render every slide of the templates with sample text, giving the original
+    PNG renders the stored assets are encoded from.
+
+    Slides use their default assets; photo slides (no default background)
+    are only rendered when a background_image is given.
+    """
+    from src.templates import get_template_config
+    from src.workflows.editors import text_editor
+
+    templates = {
+        "scoopwhoop": ["text_based", "thumbnail", "writeup"],
+        "twitter": ["text_based"],
+        "social_village": ["content", "thumbnail"],
+        "the_sarcastic_indian": ["writeup"],
+        "infomance": ["content", "thumbnail"],
+    }
+    samples = {}
+    for page_name, template_types in templates.items():
+        if page_names and page_name not in page_names:
+            continue
+        for template_type in template_types:
+            slides = get_template_config(template_type, page_name).get("slides", {})
+            for slide_name, slide_template in slides.items():
+                assets = {}
+                if "default" not in slide_template.get("assets", {}).get("background_image", {"default": None}):
+                    if not background_image:
+                        continue
+                    assets["background_image"] = background_image
+                text = {
+                    key: "Sample headline for the encoding benchmark"
+                    for key, config in slide_template.get("text", {}).items()
+                    if config.get("type") in ("text", "text_area")
+                }
+                image_bytes = text_editor(
+                    template=slide_template,
+                    page_name=page_name,
+                    image_edits={},
+                    video_edits={},
+                    text=text,
+                    assets=assets,
+                    session_id=f"benchmark_{template_type}_{slide_name}",
+                )
+                if image_bytes:
+                    samples[f"{page_name}/{template_type}/{slide_name}"] = image_bytes
+                else:
+                    logger.warning(f"Could not render {page_name}/{template_type}/{slide_name}")
+    return samples
+
+
+if __name__ == "__main__":
+    import sys
+    from collections import defaultdict
+
+    # python -m src.services.image_encoding [original PNG paths...]
+    # Without paths, the text-based templates are rendered fresh
+    if sys.argv[1:]:
+        images = {path: open(path, "rb").read() for path in sys.argv[1:]}
+    else:
+        images = _render_template_samples()
+
+    rows = benchmark_encodings(images)
+    print(f"{'image':<45} {'encoding':<14} {'bytes':>10} {'ratio':>7} {'ms':>8}")
+    for row in rows:
+        print(
+            f"{row['image']:<45} {row['encoding']:<14} {row['bytes']:>10} "
+            f"{row['ratio']:>7} {row['encode_ms']:>8}"
+        )
+
+    totals = defaultdict(lambda: [0, 0.0])
+    for row in rows:
+        totals[row["encoding"]][0] += row["bytes"]
+        totals[row["encoding"]][1] += row["encode_ms"]
+    print("\nTotals:")
+    for encoding, (total_bytes, total_ms) in totals.items():
+        print(f"{encoding:<14} {total_bytes:>10} bytes {total_ms:>9.1f} ms")
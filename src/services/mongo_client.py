@@ -1,42 +1,580 @@
 import os
 import logging
+import threading
+import uuid
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Set
 import base64
 from pathlib import Path
 
-from pymongo import MongoClient
+from pymongo import ASCENDING, DESCENDING, IndexModel, MongoClient, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from bson import ObjectId
 from dotenv import load_dotenv
 
-from src.utils import compress_image
+from src.utils import create_thumbnail, dhash
+from src.services.image_encoding import detect_content_type, encode_asset, filename_for
+from src.services.source_media import (
+    SOURCE_MEDIA_MAX_DISTANCE,
+    content_hash,
+    dhash_bands,
+    hamming_distance,
+    media_url_key,
+)
+from src.services.asset_store import (
+    THUMBNAIL_SIZES,
+    create_asset_store,
+    load_image_bytes,
+    store_asset,
+    store_thumbnails,
+)
 
 load_dotenv(override=True)
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.WARNING)
 
+# Fields returned by workflow listings; image payloads are never included
+WORKFLOW_SUMMARY_PROJECTION = {
+    "session_id": 1,
+    "headline": 1,
+    "template_type": 1,
+    "page_name": 1,
+    "created_at": 1,
+    "workflow_type": 1,
+    "total_slides": 1,
+    "error": 1,
+    "total_images": {"$sum": "$slides.total_images"},
+    "thumbnail": {"$ifNull": ["$thumbnail", ""]},
+}
+
+# Slide metadata without the story board and without inline (legacy) image data
+WORKFLOW_DETAILS_PROJECTION = {
+    "story_board": 0,
+    "slides.images.images.with_text.image_base64": 0,
+    "slides.images.images.without_text.image_base64": 0,
+}
+
+# Indexes backing every query made by this client, per collection
+INDEXES = {
+    "ig_posts": [
+        # Resumed sessions replace their document, so there is one per session
+        IndexModel([("session_id", ASCENDING)], name="session_id_unique", unique=True),
+        # _id breaks created_at ties for keyset pagination
+        IndexModel([("created_at", DESCENDING), ("_id", DESCENDING)], name="created_at_id_desc"),
+        IndexModel(
+            [
+                ("page_name", ASCENDING),
+                ("template_type", ASCENDING),
+                ("created_at", DESCENDING),
+                ("_id", DESCENDING),
+            ],
+            name="page_template_created_at_id",
+        ),
+    ],
+    "workflow_checkpoints": [
+        IndexModel([("session_id", ASCENDING)], name="session_id_unique", unique=True),
+    ],
+    "source_watermarks": [
+        IndexModel(
+            [("platform", ASCENDING), ("account_id", ASCENDING)],
+            name="platform_account_unique",
+            unique=True,
+        ),
+    ],
+    "source_media": [
+        IndexModel([("hashes", ASCENDING)], name="hashes"),
+        IndexModel([("url_keys", ASCENDING)], name="url_keys"),
+        IndexModel([("dhash_bands", ASCENDING)], name="dhash_bands"),
+    ],
+    "sources": [
+        IndexModel([("code", ASCENDING)], name="code_unique", unique=True),
+        IndexModel([("taken_at", DESCENDING)], name="taken_at_desc"),
+        IndexModel(
+            [("source", ASCENDING), ("taken_at", DESCENDING)],
+            name="source_taken_at_desc",
+        ),
+        IndexModel(
+            [("source", ASCENDING), ("account_id", ASCENDING), ("taken_at", DESCENDING)],
+            name="source_account_taken_at_desc",
+        ),
+    ],
+}
+
+# Indexes only need to be created once per process
+_indexes_ensured = False
+
+
+# Connection pool settings for the process-wide client
+MONGODB_MAX_POOL_SIZE = int(os.getenv("MONGODB_MAX_POOL_SIZE", "50"))
+MONGODB_MIN_POOL_SIZE = int(os.getenv("MONGODB_MIN_POOL_SIZE", "2"))
+MONGODB_MAX_IDLE_TIME_MS = int(os.getenv("MONGODB_MAX_IDLE_TIME_MS", "300000"))
+
+
+def create_pymongo_client() -> MongoClient:
+    """Create a pymongo client with the configured pool settings"""
+    mongo_uri = os.getenv("MONGODB_URI", "mongodb://localhost:27017/")
+    return MongoClient(
+        mongo_uri,
+        maxPoolSize=MONGODB_MAX_POOL_SIZE,
+        minPoolSize=MONGODB_MIN_POOL_SIZE,
+        maxIdleTimeMS=MONGODB_MAX_IDLE_TIME_MS,
+        serverSelectionTimeoutMS=10000,
+    )
+
+
+def workflows_page_pipeline(
+    page_size: int = 15,
+    cursor: Optional[Dict] = None,
+    page_name: Optional[str] = None,
+    template_type: Optional[str] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    has_error: Optional[bool] = None,
+) -> List[Dict]:
+    """Aggregation pipeline of one workflow listing page (see list_workflows_page)"""
+    query = {"workflow_type": "content_creator"}
+    if page_name:
+        query["page_name"] = page_name
+    if template_type:
+        query["template_type"] = template_type
+    if created_after or created_before:
+        query["created_at"] = {}
+        if created_after:
+            query["created_at"]["$gte"] = created_after
+        if created_before:
+            query["created_at"]["$lt"] = created_before
+    if has_error is True:
+        query["error"] = {"$nin": [None, ""]}
+    elif has_error is False:
+        query["error"] = {"$in": [None, ""]}
+    if cursor:
+        cursor_id = ObjectId(cursor["_id"])
+        query["$or"] = [
+            {"created_at": {"$lt": cursor["created_at"]}},
+            {"created_at": cursor["created_at"], "_id": {"$lt": cursor_id}},
+        ]
+
+    return [
+        {"$match": query},
+        {"$sort": {"created_at": -1, "_id": -1}},
+        # One extra document tells whether there is a next page
+        {"$limit": page_size + 1},
+        {"$project": WORKFLOW_SUMMARY_PROJECTION},
+    ]
+
+
 class SimpleMongoClient:
-    def __init__(self):
+    def __init__(self, client: Optional[MongoClient] = None, shared: bool = False):
         # Get MongoDB connection string from environment
-        mongo_uri = os.getenv("MONGODB_URI", "mongodb://localhost:27017/")
         database_name = os.getenv("MONGODB_DATABASE", "SCOOPWHOOP_POSTS")
 
-        self.client = MongoClient(mongo_uri)
+        self.client = client or create_pymongo_client()
+        # The shared client outlives callers, so close() leaves it open
+        self.shared = shared
         self.db = self.client[database_name]
         self.collection = self.db.ig_posts
         self.sources_collection = self.db.sources
+        self.checkpoints_collection = self.db.workflow_checkpoints
+        self.watermarks_collection = self.db.source_watermarks
+        self.source_media_collection = self.db.source_media
+        self.asset_store = create_asset_store(self.db)
+
+        global _indexes_ensured
+        if not _indexes_ensured:
+            # Never drops anything; failed builds are reported for ensure-indexes
+            report = self.ensure_indexes()
+            if any(entry["failed"] for entry in report.values()):
+                logger.error(
+                    "Some indexes could not be created, run "
+                    "`python -m src.services.mongo_client dedupe-unique-keys` and "
+                    "`ensure-indexes --drop`"
+                )
+            _indexes_ensured = True
+
+    @staticmethod
+    def _recreate_index(collection, name: str, spec: Dict) -> None:
+        """Create an index again from its index_information() entry"""
+        options = {k: v for k, v in spec.items() if k not in ("key", "v", "ns")}
+        collection.create_index(spec["key"], name=name, **options)
+
+    def ensure_indexes(self, drop_undeclared: bool = False) -> Dict[str, Dict]:
+        """Create the declared index set (no-op for indexes that already exist)
+
+        Every declared index is created on its own, so one failed build (e.g.
+        a unique index over duplicate data, see dedupe_unique_keys) doesn't
+        stop the others. Indexes that aren't declared in INDEXES are only
+        reported, unless drop_undeclared is set (the ensure-indexes --drop
+        command). Dropping happens after the declared set has been created,
+        and never on a collection where a build failed. An undeclared index
+        that blocks a declared one with the same keys (e.g. a renamed index)
+        is only swapped when the collection has no duplicates for it, and is
+        restored if the new build fails anyway.
+
+        Returns:
+            Mapping of collection name to {"failed": {index: error},
+            "undeclared": [...], "dropped": [...]}, for collections with
+            anything to report
+        """
+        report = {}
+        for collection_name, indexes in INDEXES.items():
+            collection = self.db[collection_name]
+            declared = {index.document["name"] for index in indexes}
+            failed = {}
+            dropped = []
+            try:
+                existing = collection.index_information()
+            except Exception as e:
+                logger.error(f"Error reading indexes of {collection_name}: {e}")
+                report[collection_name] = {"failed": {"*": str(e)}, "undeclared": [], "dropped": []}
+                continue
+            undeclared = {
+                name: spec for name, spec in existing.items()
+                if name != "_id_" and name not in declared
+            }
+
+            for index in indexes:
+                name = index.document["name"]
+                try:
+                    collection.create_indexes([index])
+                    continue
+                except Exception as e:
+                    error = e
+                # An undeclared index on the same keys blocks the build
+                key = list(index.document["key"].items())
+                blocking = next(
+                    (n for n, spec in undeclared.items() if list(spec["key"]) == key), None
+                )
+                if drop_undeclared and blocking:
+                    if index.document.get("unique") and self._duplicate_keys(collection, key, limit=1):
+                        error = f"duplicate keys in {collection_name}, run dedupe-unique-keys first"
+                    else:
+                        spec = undeclared[blocking]
+                        collection.drop_index(blocking)
+                        try:
+                            collection.create_indexes([index])
+                            del undeclared[blocking]
+                            dropped.append(blocking)
+                            logger.warning(f"Replaced index {collection_name}.{blocking} with {name}")
+                            continue
+                        except Exception as e:
+                            error = e
+                            self._recreate_index(collection, blocking, spec)
+                failed[name] = str(error)
+                logger.error(f"Error creating index {collection_name}.{name}: {error}")
+
+            for name in list(undeclared):
+                if drop_undeclared and not failed:
+                    collection.drop_index(name)
+                    dropped.append(name)
+                    del undeclared[name]
+                    logger.warning(f"Dropped undeclared index {collection_name}.{name}")
+                else:
+                    logger.warning(f"Undeclared index {collection_name}.{name}")
 
-    def _encode_image_to_base64(self, image_bytes: bytes) -> str:
-        """Convert image file to base64 string"""
+            if failed or undeclared or dropped:
+                report[collection_name] = {
+                    "failed": failed,
+                    "undeclared": list(undeclared),
+                    "dropped": dropped,
+                }
+        return report
+
+    @staticmethod
+    def _duplicate_keys(collection, key: List, limit: int = 0) -> List[Dict]:
+        """Groups of documents sharing the values of a (unique) index key"""
+        pipeline = [
+            {
+                "$group": {
+                    "_id": {field.replace(".", "_"): f"${field}" for field, _ in key},
+                    "ids": {"$push": "$_id"},
+                    "count": {"$sum": 1},
+                }
+            },
+            {"$match": {"count": {"$gt": 1}}},
+        ]
+        if limit:
+            pipeline.append({"$limit": limit})
+        return list(collection.aggregate(pipeline, allowDiskUse=True))
+
+    def dedupe_unique_keys(self, dry_run: bool = False) -> Dict[str, int]:
+        """Resolve duplicates that keep the declared unique indexes from building
+
+        Duplicate workflows (ig_posts session_id collisions) are different
+        posts, so all but the oldest get a new session_id. In the other
+        collections duplicates are copies of the same item and all but the
+        oldest are deleted.
+
+        Returns:
+            Number of documents changed per collection
+        """
+        changed = {}
+        for collection_name, indexes in INDEXES.items():
+            collection = self.db[collection_name]
+            for index in indexes:
+                if not index.document.get("unique"):
+                    continue
+                key = list(index.document["key"].items())
+                for group in self._duplicate_keys(collection, key):
+                    # ObjectIds sort by creation time
+                    extra_ids = sorted(group["ids"])[1:]
+                    changed[collection_name] = changed.get(collection_name, 0) + len(extra_ids)
+                    if dry_run:
+                        continue
+                    if collection_name == "ig_posts":
+                        for doc_id in extra_ids:
+                            collection.update_one(
+                                {"_id": doc_id}, {"$set": {"session_id": uuid.uuid4().hex}}
+                            )
+                    else:
+                        collection.delete_many({"_id": {"$in": extra_ids}})
+                    logger.warning(
+                        f"Resolved {len(extra_ids)} duplicates of {group['_id']} in {collection_name}"
+                    )
+        return changed
+
+    def check_index_usage(self) -> Dict[str, str]:
+        """Explain the hot queries and report the index each one uses
+
+        Returns a mapping of query name to index name, or "COLLSCAN" when a
+        query would scan the whole collection.
+        """
+        queries = {
+            "workflow_by_session_id": self.collection.find({"session_id": ""}),
+            "recent_workflows": self.collection.find().sort("created_at", -1).limit(10),
+            "workflows_by_page_template": self.collection.find(
+                {"page_name": "", "template_type": ""}
+            ).sort("created_at", -1),
+            "source_by_code": self.sources_collection.find({"code": ""}),
+            "latest_sources": self.sources_collection.find().sort("taken_at", -1).limit(10),
+            "latest_source_of_platform": self.sources_collection.find({"source": "twitter"}).sort("taken_at", -1).limit(1),
+            "latest_source_of_account": self.sources_collection.find({"source": "twitter", "account_id": ""}).sort("taken_at", -1).limit(1),
+        }
+
+        def find_index(plan: Dict) -> Optional[str]:
+            if plan.get("stage") == "IXSCAN":
+                return plan.get("indexName")
+            for child in [plan.get("inputStage")] + plan.get("inputStages", []):
+                if child and (index_name := find_index(child)):
+                    return index_name
+            return None
+
+        usage = {}
+        for name, cursor in queries.items():
+            winning_plan = cursor.explain()["queryPlanner"]["winningPlan"]
+            # Newer servers nest the classic plan under queryPlan
+            winning_plan = winning_plan.get("queryPlan", winning_plan)
+            usage[name] = find_index(winning_plan) or "COLLSCAN"
+        return usage
+
+    @staticmethod
+    def _source_media_ref(media: Dict, doc: Dict) -> Dict:
+        return {
+            "type": media.get("type", ""),
+            "url": media.get("url", ""),
+            "media_id": doc["_id"],
+            "asset": doc.get("asset"),
+        }
+
+    def find_source_media(self, urls: List[str]) -> Dict[str, Dict]:
+        """Get already stored source media by download URL, so it isn't downloaded again"""
+        keys = {media_url_key(url): url for url in urls if media_url_key(url)}
+        if not keys:
+            return {}
+        found = {}
+        for doc in self.source_media_collection.find(
+            {"url_keys": {"$in": list(keys)}}, {"asset": 1, "url_keys": 1}
+        ):
+            for key in doc["url_keys"]:
+                if key in keys:
+                    found[keys[key]] = doc
+        return found
+
+    @staticmethod
+    def _closest_image(image_hash: int, docs: List[Dict]) -> Optional[Dict]:
+        """Closest of docs within SOURCE_MEDIA_MAX_DISTANCE dHash bits
+
+        Sharing a dHash band only makes a doc a candidate; every merge of
+        source media goes through this distance check.
+        """
+        best, best_distance = None, None
+        for doc in docs:
+            if not doc.get("dhash"):
+                continue
+            distance = hamming_distance(image_hash, int(doc["dhash"], 16))
+            if distance > SOURCE_MEDIA_MAX_DISTANCE:
+                continue
+            if best_distance is None or distance < best_distance:
+                best, best_distance = doc, distance
+        return best
+
+    def _insert_source_media(
+        self, media: Dict, sha: str, url_key: Optional[str], image_hash: Optional[int]
+    ) -> Dict:
+        """Encode and store new source media, returning its source_media document"""
+        data = media["image_bytes"]
+        if media.get("type") in ("image", "thumbnail"):
+            encoded, content_type = encode_asset(data, "source")
+        else:
+            encoded, content_type = data, "video/mp4"
+        asset = store_asset(
+            self.asset_store, encoded, filename=filename_for(f"source_{sha[:16]}", content_type),
+            content_type=content_type, metadata={"asset_type": "source"},
+        )
+        doc = {
+            "_id": sha,
+            "hashes": [sha],
+            "url_keys": [url_key] if url_key else [],
+            "asset": asset,
+            "created_at": datetime.now(),
+        }
+        if image_hash is not None:
+            doc["dhash"] = f"{image_hash:016x}"
+            doc["dhash_bands"] = dhash_bands(image_hash)
         try:
-            if image_bytes is None:
+            self.source_media_collection.insert_one(doc)
+        except DuplicateKeyError:
+            # Stored concurrently by another update, keep that copy
+            self.asset_store.delete(asset["asset_id"])
+            doc = self.source_media_collection.find_one({"_id": sha}, {"asset": 1, "dhash": 1})
+            if url_key:
+                self.source_media_collection.update_one({"_id": sha}, {"$addToSet": {"url_keys": url_key}})
+        return doc
+
+    def store_source_media_batch(self, media_items: List[Optional[Dict]]) -> List[Optional[Dict]]:
+        """Store the downloaded media of many source posts (see store_source_media)
+
+        Stored copies are looked up with one query on the content hashes and
+        one on the dHash bands of the whole batch, and known copies are
+        updated in one bulk write. Returns the references in input order,
+        None for media that could not be stored.
+        """
+        refs: List[Optional[Dict]] = [None] * len(media_items)
+        pending = []
+        for i, media in enumerate(media_items):
+            media = media or {}
+            if media.get("media_id"):
+                refs[i] = media
+            elif not media.get("image_bytes"):
+                refs[i] = {"type": media.get("type", ""), "url": media.get("url", ""), "media_id": None, "asset": None}
+            else:
+                pending.append((i, media, content_hash(media["image_bytes"])))
+        if not pending:
+            return refs
+
+        by_hash = {}
+        for doc in self.source_media_collection.find(
+            {"hashes": {"$in": list({sha for _, _, sha in pending})}}, {"asset": 1, "hashes": 1}
+        ):
+            for sha in doc["hashes"]:
+                by_hash[sha] = doc
+
+        image_hashes = {}
+        for i, media, sha in pending:
+            if sha not in by_hash and media.get("type") in ("image", "thumbnail"):
+                try:
+                    image_hashes[i] = dhash(media["image_bytes"])
+                except Exception as e:
+                    logger.error(f"Error hashing source image {media.get('url', '')}: {e}")
+        similar = []
+        if image_hashes:
+            bands = {band for image_hash in image_hashes.values() for band in dhash_bands(image_hash)}
+            similar = list(
+                self.source_media_collection.find(
+                    {"dhash_bands": {"$in": list(bands)}}, {"asset": 1, "dhash": 1}
+                )
+            )
+
+        updates = []
+        for i, media, sha in pending:
+            url_key = media_url_key(media.get("url"))
+            image_hash = image_hashes.get(i)
+            doc = by_hash.get(sha)
+            if doc is None and image_hash is not None:
+                doc = self._closest_image(image_hash, similar)
+            if doc is not None:
+                updates.append(
+                    UpdateOne(
+                        {"_id": doc["_id"]},
+                        {"$addToSet": {"hashes": sha, **({"url_keys": url_key} if url_key else {})}},
+                    )
+                )
+            else:
+                try:
+                    doc = self._insert_source_media(media, sha, url_key, image_hash)
+                except Exception as e:
+                    logger.error(f"Error storing source media {media.get('url', '')}: {e}")
+                    continue
+                # Later items of the batch can be duplicates of this one
+                similar.append(doc)
+            by_hash[sha] = doc
+            refs[i] = self._source_media_ref(media, doc)
+
+        if updates:
+            self.source_media_collection.bulk_write(updates, ordered=False)
+        return refs
+
+    def store_source_media(self, media: Dict) -> Dict:
+        """Store the downloaded media of a source post once per content
+
+        Media is keyed by the SHA-256 of its bytes; images also get a dHash so
+        reposts that were re-encoded or resized resolve to the stored copy.
+        Returns the reference saved in the post instead of the bytes.
+        """
+        ref = self.store_source_media_batch([media])[0]
+        if ref is None:
+            raise RuntimeError(f"Source media {(media or {}).get('url', '')} could not be stored")
+        return ref
+
+    def _store_image(
+        self, image_bytes: bytes, filename: str, session_id: str, asset_type: str = "photo"
+    ) -> Dict:
+        """Encode an image into the asset store and return its document entry
+
+        The encoding is picked by asset_type (see ASSET_ENCODINGS) and the
+        filename's extension follows it. Small and medium WebP thumbnails are
+        stored alongside the full image so pages can load the size they
+        display.
+        """
+        asset = None
+        thumbnails = {}
+        try:
+            if image_bytes is not None:
+                encoded, content_type = encode_asset(image_bytes, asset_type)
+                filename = filename_for(filename, content_type)
+                asset = store_asset(
+                    self.asset_store,
+                    encoded,
+                    filename=filename,
+                    content_type=content_type,
+                    metadata={"session_id": session_id, "asset_type": asset_type},
+                )
+                thumbnails = store_thumbnails(
+                    self.asset_store, image_bytes, filename, {"session_id": session_id}
+                )
+        except Exception as e:
+            logger.error(f"Error storing image {filename}: {e}")
+        return {"asset": asset, "thumbnails": thumbnails, "filename": filename}
+
+    def _create_thumbnail(self, image_bytes: bytes) -> str:
+        """Create a small base64 WebP thumbnail that is stored inline for listings"""
+        try:
+            if not image_bytes:
                 return ""
             return base64.b64encode(
-                compress_image(image_bytes, quality=75)
+                create_thumbnail(image_bytes, THUMBNAIL_SIZES["small"], quality=60)
             ).decode("utf-8")
         except Exception as e:
-            logger.error(f"Error encoding image : {e}")
+            logger.error(f"Error creating thumbnail: {e}")
             return ""
 
+    def load_image(self, image_info: Optional[Dict], size: Optional[str] = None) -> Optional[bytes]:
+        """Load the bytes of an image version (asset reference or legacy base64)
+
+        size selects a stored thumbnail ("small" or "medium") instead of the
+        full image.
+        """
+        return load_image_bytes(image_info, self.asset_store, size)
+
     def store_content_workflow(
         self,
         session_id: str,
@@ -46,36 +584,41 @@ class SimpleMongoClient:
         slide_images: List[List[Dict]],
         page_name: str = "scoopwhoop",
         error: Optional[str] = None,
+        replace: bool = False,
     ) -> str:
-        """Store content creator workflow result in MongoDB"""
+        """Store content creator workflow result in MongoDB
+
+        A new session is inserted, so a session_id collision fails instead of
+        overwriting another workflow. With replace=True (a resumed session)
+        the session's earlier result is replaced and its assets are deleted.
+        """
 
         # Prepare slides data with images
         slides_data = []
         for idx, (slide_info, images) in enumerate(
             zip(story_board["storyboard"], slide_images)
         ):
-            # Convert image bytes to base64 for storage with type information
+            # Store image bytes in the asset store, keeping references with type information
             images_with_type = []
             for img_data in images:
                 # Handle both with and without text versions
-                without_text_b64 = self._encode_image_to_base64(
-                    img_data["images"]["without_text"]
-                )
-                with_text_b64 = self._encode_image_to_base64(
-                    img_data["images"]["with_text"]
-                )
-
                 images_with_type.append(
                     {
                         "images": {
-                            "without_text": {
-                                "image_base64": without_text_b64,
-                                "filename": f"slide_{idx}_{img_data['type']}_without_text.png",
-                            },
-                            "with_text": {
-                                "image_base64": with_text_b64,
-                                "filename": f"slide_{idx}_{img_data['type']}_with_text.png",
-                            },
+                            "without_text": self._store_image(
+                                img_data["images"]["without_text"],
+                                f"slide_{idx}_{img_data['type']}_without_text.png",
+                                session_id,
+                                asset_type="photo",
+                            ),
+                            "with_text": self._store_image(
+                                img_data["images"]["with_text"],
+                                f"slide_{idx}_{img_data['type']}_with_text.png",
+                                session_id,
+                                asset_type=(
+                                    "text_render" if img_data["type"] == "text" else "photo_render"
+                                ),
+                            ),
                         },
                         "type": img_data["type"],  # 'real' or 'generated'
                         "model": img_data.get("model", "unknown"),
@@ -92,6 +635,17 @@ class SimpleMongoClient:
             }
             slides_data.append(slide_data)
 
+        # Thumbnail of the first rendered image, for listings
+        first_image = next(
+            (
+                img_data["images"]["with_text"]
+                for images in slide_images
+                for img_data in images
+                if img_data["images"].get("with_text")
+            ),
+            None,
+        )
+
         # Create MongoDB document
         document = {
             "session_id": session_id,
@@ -103,12 +657,25 @@ class SimpleMongoClient:
             "story_board": story_board,
             "slides": slides_data,
             "total_slides": len(slides_data),
+            "thumbnail": self._create_thumbnail(first_image),
             "error": error,
         }
 
-        # Insert into MongoDB
-        result = self.collection.insert_one(document)
-        document_id = str(result.inserted_id)
+        if replace:
+            previous = self.collection.find_one_and_replace(
+                {"session_id": session_id},
+                document,
+                upsert=True,
+                return_document=ReturnDocument.BEFORE,
+                projection={"_id": 1, "slides": 1},
+            )
+            if previous:
+                document_id = str(previous["_id"])
+                self._delete_workflow_assets(previous, keep=self._workflow_asset_ids(document))
+            else:
+                document_id = str(self.collection.find_one({"session_id": session_id}, {"_id": 1})["_id"])
+        else:
+            document_id = str(self.collection.insert_one(document).inserted_id)
 
         logger.info(
             f"Stored content workflow with session_id: {session_id}, document_id: {document_id}"
@@ -116,6 +683,53 @@ class SimpleMongoClient:
         logger.info(f"Stored {len(slides_data)} slides with image type information")
         return document_id
 
+    @staticmethod
+    def _workflow_asset_ids(document: Dict) -> Set[str]:
+        """Ids of all images and thumbnails a workflow document references"""
+        asset_ids = set()
+        for slide in document.get("slides", []):
+            for img_data in slide.get("images", []):
+                for image_info in img_data.get("images", {}).values():
+                    image_info = image_info or {}
+                    refs = [image_info.get("asset")] + list((image_info.get("thumbnails") or {}).values())
+                    asset_ids.update(ref["asset_id"] for ref in refs if ref and ref.get("asset_id"))
+        return asset_ids
+
+    def _delete_workflow_assets(self, document: Dict, keep: Set[str] = frozenset()) -> None:
+        """Delete the assets of a replaced workflow document (except keep)"""
+        for asset_id in self._workflow_asset_ids(document) - set(keep):
+            try:
+                self.asset_store.delete(asset_id)
+            except Exception as e:
+                logger.error(f"Failed to delete asset {asset_id}: {e}")
+
+    def mark_workflow_failed(
+        self, session_id: str, error: str, headline: str, template_type: str, page_name: str
+    ) -> None:
+        """Record the error of a workflow
+
+        An existing (partial) result keeps its slides and only gets the
+        error; an empty result is only written when the session has none.
+        """
+        self.collection.update_one(
+            {"session_id": session_id},
+            {
+                "$set": {"error": error},
+                "$setOnInsert": {
+                    "template_type": template_type,
+                    "page_name": page_name,
+                    "created_at": datetime.now(),
+                    "workflow_type": "content_creator",
+                    "headline": headline,
+                    "story_board": {"storyboard": []},
+                    "slides": [],
+                    "total_slides": 0,
+                    "thumbnail": "",
+                },
+            },
+            upsert=True,
+        )
+
     def get_workflow_result(self, session_id: str) -> Optional[Dict]:
         """Retrieve workflow result by session_id"""
         document = self.collection.find_one({"session_id": session_id})
@@ -144,6 +758,96 @@ class SimpleMongoClient:
         logger.info(f"Retrieved {len(documents)} recent workflows")
         return documents
 
+    def list_workflows(self, limit: int = 15) -> List[Dict]:
+        """List recent workflows with metadata and a thumbnail only (no images)"""
+        return self.list_workflows_page(page_size=limit)["items"]
+
+    def list_workflows_page(
+        self,
+        page_size: int = 15,
+        cursor: Optional[Dict] = None,
+        page_name: Optional[str] = None,
+        template_type: Optional[str] = None,
+        created_after: Optional[datetime] = None,
+        created_before: Optional[datetime] = None,
+        has_error: Optional[bool] = None,
+    ) -> Dict:
+        """List one page of workflows, newest first, filtered on the server
+
+        Pages are keyset-paginated on (created_at, _id): pass the returned
+        next_cursor to get the following page. Items only hold metadata and a
+        thumbnail (see WORKFLOW_SUMMARY_PROJECTION).
+
+        Returns:
+            Dict with "items" and "next_cursor" (None on the last page)
+        """
+        pipeline = workflows_page_pipeline(
+            page_size, cursor, page_name, template_type, created_after, created_before, has_error
+        )
+        documents = list(self.collection.aggregate(pipeline))
+
+        next_cursor = None
+        if len(documents) > page_size:
+            documents = documents[:page_size]
+            next_cursor = {
+                "created_at": documents[-1]["created_at"],
+                "_id": str(documents[-1]["_id"]),
+            }
+        for doc in documents:
+            doc["_id"] = str(doc["_id"])
+
+        logger.info(f"Listed {len(documents)} workflows")
+        return {"items": documents, "next_cursor": next_cursor}
+
+    def get_workflow_details(self, session_id: str) -> Optional[Dict]:
+        """Retrieve a workflow's slide metadata without any image data"""
+        document = self.collection.find_one(
+            {"session_id": session_id}, WORKFLOW_DETAILS_PROJECTION
+        )
+        if document:
+            document["_id"] = str(document["_id"])
+            return document
+        logger.warning(f"No workflow result found for session_id: {session_id}")
+        return None
+
+    def get_workflow_image(
+        self,
+        session_id: str,
+        slide_index: int,
+        image_index: int,
+        with_text: bool = True,
+        size: Optional[str] = None,
+    ) -> Optional[bytes]:
+        """Fetch the bytes of a single workflow image (or its thumbnail) on demand"""
+        version_key = "with_text" if with_text else "without_text"
+        pipeline = [
+            {"$match": {"session_id": session_id}},
+            {"$limit": 1},
+            {
+                "$project": {
+                    "_id": 0,
+                    "image": {
+                        "$arrayElemAt": [
+                            {"$arrayElemAt": ["$slides.images", slide_index]},
+                            image_index,
+                        ]
+                    },
+                }
+            },
+            {"$project": {"image_info": f"$image.images.{version_key}"}},
+        ]
+        try:
+            documents = list(self.collection.aggregate(pipeline))
+            if not documents or not documents[0].get("image_info"):
+                logger.warning(
+                    f"Image {slide_index}/{image_index} not found for session {session_id}"
+                )
+                return None
+            return self.load_image(documents[0]["image_info"], size)
+        except Exception as e:
+            logger.error(f"Error fetching image for session {session_id}: {e}")
+            return None
+
     def save_image_to_file(
         self,
         session_id: str,
@@ -202,8 +906,11 @@ class SimpleMongoClient:
                 version_key = "with_text" if with_text else "without_text"
                 image_info = image_data["images"][version_key]
 
-            # Decode base64 and save to file
-            image_bytes = base64.b64decode(image_info["image_base64"])
+            # Load from the asset store (or legacy base64) and save to file
+            image_bytes = self.load_image(image_info)
+            if not image_bytes:
+                logger.warning(f"No image data for session {session_id}")
+                return False
             with open(output_path, "wb") as f:
                 f.write(image_bytes)
 
@@ -247,6 +954,118 @@ class SimpleMongoClient:
 
         return results
 
+    def migrate_inline_images(self, batch_size: int = 20, dry_run: bool = False) -> Dict[str, int]:
+        """Move base64 images inlined in ig_posts documents into the asset store
+
+        Documents are processed one at a time and rewritten with asset
+        references, so the migration can be interrupted and re-run safely.
+        """
+        stats = {"documents": 0, "images": 0, "failed": 0}
+        query = {"slides.images.images.with_text.image_base64": {"$exists": True}}
+        document_ids = [
+            doc["_id"]
+            for doc in self.collection.find(query, {"_id": 1}).batch_size(batch_size)
+        ]
+
+        for document_id in document_ids:
+            document = self.collection.find_one({"_id": document_id})
+            if not document:
+                continue
+            session_id = document.get("session_id", "")
+            migrated_images = 0
+
+            for slide in document.get("slides", []):
+                for img_data in slide.get("images", []):
+                    for version, image_info in img_data.get("images", {}).items():
+                        if "image_base64" not in image_info:
+                            continue
+                        asset = None
+                        thumbnails = {}
+                        try:
+                            image_bytes = base64.b64decode(image_info["image_base64"])
+                            content_type = detect_content_type(image_bytes)
+                            filename = filename_for(
+                                image_info.get("filename", f"{version}.png"), content_type
+                            )
+                            if image_bytes and not dry_run:
+                                asset = store_asset(
+                                    self.asset_store,
+                                    image_bytes,
+                                    filename=filename,
+                                    content_type=content_type,
+                                    metadata={"session_id": session_id},
+                                )
+                                thumbnails = store_thumbnails(
+                                    self.asset_store, image_bytes, filename, {"session_id": session_id}
+                                )
+                        except Exception as e:
+                            logger.error(f"Failed to migrate image for {session_id}: {e}")
+                            stats["failed"] += 1
+                            continue
+                        img_data["images"][version] = {
+                            "asset": asset,
+                            "thumbnails": thumbnails,
+                            "filename": filename,
+                        }
+                        migrated_images += 1
+
+            if not dry_run:
+                self.collection.update_one(
+                    {"_id": document_id}, {"$set": {"slides": document["slides"]}}
+                )
+            stats["documents"] += 1
+            stats["images"] += migrated_images
+            logger.info(f"Migrated {migrated_images} images for session {session_id}")
+
+        return stats
+
+    # Workflow checkpoint methods
+    def store_checkpoint_asset(self, data: bytes, filename: str, session_id: str) -> Optional[Dict]:
+        """Store checkpointed bytes as-is (no compression) and return the reference"""
+        return store_asset(
+            self.asset_store,
+            data,
+            filename=filename,
+            content_type="application/octet-stream",
+            metadata={"session_id": session_id, "checkpoint": True},
+        )
+
+    def save_checkpoint(self, session_id: str, fields: Dict) -> None:
+        """Set fields (dotted paths allowed) on a workflow's checkpoint"""
+        now = datetime.now()
+        self.checkpoints_collection.update_one(
+            {"session_id": session_id},
+            {"$set": {**fields, "updated_at": now}, "$setOnInsert": {"created_at": now}},
+            upsert=True,
+        )
+
+    def get_checkpoint(self, session_id: str) -> Optional[Dict]:
+        """Get a workflow's checkpoint"""
+        return self.checkpoints_collection.find_one({"session_id": session_id}, {"_id": 0})
+
+    def delete_checkpoint(self, session_id: str) -> None:
+        """Delete a workflow's checkpoint together with its checkpointed assets"""
+        checkpoint = self.get_checkpoint(session_id)
+        if not checkpoint:
+            return
+
+        def asset_ids(value):
+            if isinstance(value, dict):
+                if "asset_id" in value and value.get("store") == self.asset_store.kind:
+                    yield value["asset_id"]
+                for child in value.values():
+                    yield from asset_ids(child)
+            elif isinstance(value, list):
+                for child in value:
+                    yield from asset_ids(child)
+
+        for asset_id in asset_ids(checkpoint):
+            try:
+                self.asset_store.delete(asset_id)
+            except Exception as e:
+                logger.error(f"Error deleting checkpoint asset {asset_id}: {e}")
+        self.checkpoints_collection.delete_one({"session_id": session_id})
+
     # Sources collection methods
     def get_latest_sources(self, limit: int = 10) -> List[Dict]:
         """Get latest sources from sources collection"""
@@ -268,13 +1087,21 @@ class SimpleMongoClient:
             logger.error(f"Error retrieving latest sources: {e}")
             return []
 
-    def get_latest_source_timestamp(self) -> Optional[int]:
-        """Get the latest timestamp from sources collection"""
+    def get_latest_source_timestamp(
+        self, source: Optional[str] = None, account_id: Optional[str] = None, untagged: bool = False
+    ) -> Optional[int]:
+        """Get the latest timestamp from sources collection (optionally of one platform or account)
+
+        untagged=True only looks at posts stored before they were tagged with
+        their account_id.
+        """
         try:
-            latest_doc = self.sources_collection.find_one(
-                {}, 
-                sort=[("taken_at", -1)]
-            )
+            query = {"source": source} if source else {}
+            if account_id:
+                query["account_id"] = account_id
+            elif untagged:
+                query["account_id"] = None
+            latest_doc = self.sources_collection.find_one(query, sort=[("taken_at", -1)])
             if latest_doc:
                 timestamp = latest_doc.get("taken_at")
                 logger.info(f"Latest source timestamp: {timestamp}")
@@ -286,40 +1113,122 @@ class SimpleMongoClient:
             logger.error(f"Error getting latest timestamp: {e}")
             return None
 
-    def add_sources(self, posts: List[Dict]) -> List[str]:
-        """Add multiple Instagram posts to sources collection"""
+    def get_source_watermark(self, platform: str, account_id: str) -> Optional[Dict]:
+        """Get the ingestion watermark of a source account"""
+        return self.watermarks_collection.find_one(
+            {"platform": platform, "account_id": account_id}, {"_id": 0}
+        )
+
+    def save_source_watermark(self, platform: str, account_id: str, fields: Dict) -> None:
+        """Set fields on the ingestion watermark of a source account"""
+        self.watermarks_collection.update_one(
+            {"platform": platform, "account_id": account_id},
+            {"$set": {**fields, "updated_at": datetime.now()}},
+            upsert=True,
+        )
+
+    def find_existing_source_codes(self, codes: List[str]) -> Set[str]:
+        """Codes of the given posts that are already in the sources collection"""
+        if not codes:
+            return set()
+        return {
+            doc["code"]
+            for doc in self.sources_collection.find({"code": {"$in": list(codes)}}, {"code": 1})
+        }
+
+    def add_sources(self, posts: List[Dict], batch_size: int = 500) -> Dict:
+        """Add multiple source posts (Instagram by default) to sources collection
+
+        Posts are upserted on ``code`` with unordered bulk writes (one round
+        trip per batch); posts that already exist are left untouched.
+
+        Returns:
+            Dict with inserted/existing/failed counts and the inserted ids
+        """
+        result = {"inserted": 0, "existing": 0, "failed": 0, "inserted_ids": []}
         if not posts:
             logger.info("No posts to add")
-            return []
-        
-        try:
-            # Add metadata to each post
-            for post in posts:
-                post["added_at"] = datetime.now()
-                post["source"] = "instagram"
-                post['media_bytes']['image_bytes'] = self._encode_image_to_base64(post['media_bytes']['image_bytes'])
-            
-            # Insert posts, handling duplicates
-            inserted_ids = []
-            for post in posts:
-                try:
-                    # Use code as unique identifier to avoid duplicates
-                    existing = self.sources_collection.find_one({"code": post["code"]})
-                    if not existing:
-                        result = self.sources_collection.insert_one(post)
-                        inserted_ids.append(str(result.inserted_id))
-                        logger.info(f"Added post with code: {post['code']}")
-                    else:
-                        logger.info(f"Post with code {post['code']} already exists, skipping")
-                except Exception as e:
-                    logger.error(f"Error inserting post {post.get('code', 'unknown')}: {e}")
+            return result
+
+        # Media of posts that are already stored doesn't need to be stored again
+        existing_codes = self.find_existing_source_codes(
+            [post.get("code") for post in posts if post.get("code")]
+        )
+        new_posts = [post for post in posts if post.get("code") and post["code"] not in existing_codes]
+        media_refs = dict(
+            zip(
+                (id(post) for post in new_posts),
+                self.store_source_media_batch([post.get("media_bytes") for post in new_posts]),
+            )
+        )
+
+        operations = []
+        for post in posts:
+            if not post.get("code"):
+                logger.warning("Skipping post without code")
+                result["failed"] += 1
+                continue
+            post["added_at"] = datetime.now()
+            post.setdefault("source", "instagram")
+            if id(post) in media_refs:
+                if media_refs[id(post)] is None:
+                    logger.error(f"Error storing media of source {post['code']}")
+                    result["failed"] += 1
                     continue
-            
-            logger.info(f"Successfully added {len(inserted_ids)} new posts to sources")
-            return inserted_ids
-        except Exception as e:
-            logger.error(f"Error adding sources: {e}")
-            return []
+                post["media_bytes"] = media_refs[id(post)]
+            operations.append(
+                UpdateOne({"code": post["code"]}, {"$setOnInsert": post}, upsert=True)
+            )
+
+        for i in range(0, len(operations), batch_size):
+            batch = operations[i:i + batch_size]
+            try:
+                bulk_result = self.sources_collection.bulk_write(batch, ordered=False)
+                upserted_ids = bulk_result.upserted_ids
+                errors = []
+            except BulkWriteError as e:
+                details = e.details
+                upserted_ids = {u["index"]: u["_id"] for u in details.get("upserted", [])}
+                errors = details.get("writeErrors", [])
+            except Exception as e:
+                logger.error(f"Error adding sources batch: {e}")
+                result["failed"] += len(batch)
+                continue
+
+            # Duplicate key errors come from concurrent upserts of the same code
+            failed = [err for err in errors if err.get("code") != 11000]
+            for err in failed:
+                logger.error(f"Error upserting source: {err.get('errmsg')}")
+
+            result["inserted_ids"].extend(str(_id) for _id in upserted_ids.values())
+            result["inserted"] += len(upserted_ids)
+            result["failed"] += len(failed)
+            result["existing"] += len(batch) - len(upserted_ids) - len(failed)
+
+        logger.info(
+            f"Added {result['inserted']} new posts to sources "
+            f"({result['existing']} already existed, {result['failed']} failed)"
+        )
+        return result
+
+    def migrate_source_media(self, dry_run: bool = False) -> Dict[str, int]:
+        """Move base64 media inlined in sources documents into source_media"""
+        stats = {"documents": 0, "failed": 0}
+        query = {"media_bytes.image_bytes": {"$type": "string", "$ne": ""}}
+        for document in self.sources_collection.find(query, {"media_bytes": 1}):
+            media = document["media_bytes"]
+            try:
+                image_bytes = base64.b64decode(media["image_bytes"])
+                if not dry_run:
+                    ref = self.store_source_media({**media, "image_bytes": image_bytes})
+                    self.sources_collection.update_one(
+                        {"_id": document["_id"]}, {"$set": {"media_bytes": ref}}
+                    )
+                stats["documents"] += 1
+            except Exception as e:
+                logger.error(f"Failed to migrate media of source {document['_id']}: {e}")
+                stats["failed"] += 1
+        return stats
 
     def get_sources_count(self) -> int:
         """Get total count of sources in collection"""
@@ -332,20 +1241,61 @@ class SimpleMongoClient:
             return 0
 
     def close(self):
-        """Close MongoDB connection"""
-        self.client.close()
+        """Close MongoDB connection (no-op for the shared client)"""
+        if not self.shared:
+            self.client.close()
+
+
+_shared_client: Optional[SimpleMongoClient] = None
+_shared_client_pid: Optional[int] = None
+_shared_client_lock = threading.Lock()
 
 
-# Convenience function to get a client instance
 def get_mongo_client() -> SimpleMongoClient:
-    return SimpleMongoClient()
+    """
+    Get the process-wide Mongo client.
+
+    The client (and its connection pool) is created on first use and shared
+    by all workflows and pages. pymongo clients are not fork-safe, so a
+    forked child process gets its own client instead of inheriting the
+    parent's.
+    """
+    global _shared_client, _shared_client_pid
+    pid = os.getpid()
+    if _shared_client is None or _shared_client_pid != pid:
+        with _shared_client_lock:
+            if _shared_client is None or _shared_client_pid != pid:
+                _shared_client = SimpleMongoClient(create_pymongo_client(), shared=True)
+                _shared_client_pid = pid
+                logger.info(f"Created shared MongoDB client for process {pid}")
+    return _shared_client
 
 
 if __name__ == "__main__":
+    import sys
+
     client = get_mongo_client()
-    # client.collection.create_index([("created_at", -1)])
-    # # Create index on session_id for faster lookups
-    # client.collection.create_index("session_id")
-    # logger.info("Database indexes created successfully")
+    if sys.argv[1:2] == ["migrate-assets"]:
+        # python -m src.services.mongo_client migrate-assets [--dry-run]
+        print(client.migrate_inline_images(dry_run="--dry-run" in sys.argv))
+    elif sys.argv[1:2] == ["migrate-source-media"]:
+        # python -m src.services.mongo_client migrate-source-media [--dry-run]
+        print(client.migrate_source_media(dry_run="--dry-run" in sys.argv))
+    elif sys.argv[1:2] == ["ensure-indexes"]:
+        # python -m src.services.mongo_client ensure-indexes [--drop]
+        report = client.ensure_indexes(drop_undeclared="--drop" in sys.argv)
+        print(report)
+        if any(entry["failed"] for entry in report.values()):
+            sys.exit(1)
+    elif sys.argv[1:2] == ["dedupe-unique-keys"]:
+        # python -m src.services.mongo_client dedupe-unique-keys [--dry-run]
+        print(client.dedupe_unique_keys(dry_run="--dry-run" in sys.argv))
+    elif sys.argv[1:2] == ["check-indexes"]:
+        # python -m src.services.mongo_client check-indexes
+        usage = client.check_index_usage()
+        for query_name, index_name in usage.items():
+            print(f"{query_name}: {index_name}")
+        if "COLLSCAN" in usage.values():
+            sys.exit(1)
     # print(len(client.get_recent_workflows(10)))
     # client.save_image_to_file("90c852fc", 0, 0, "./data_/test.png", with_text=False)
@@ -1,39 +1,228 @@
 import requests
 import os 
+import re
+import time
+import random
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
 from dotenv import load_dotenv
-from typing import List
+from typing import Dict, List, Optional
 from datetime import datetime
+from requests.adapters import HTTPAdapter
 
 from src.clients import sync_download_image
+from src.services.tweet_cache import tweet_data_cache
 
 load_dotenv(override=True)
 api_key = os.getenv("RAPID_API_KEY")
+logger = logging.getLogger(__name__)
+
+# Post media is downloaded on a bounded pool, all posts at once, and whatever
+# hasn't finished by the deadline is left without media
+MEDIA_FETCH_WORKERS = int(os.getenv("MEDIA_FETCH_WORKERS", "8"))
+MEDIA_FETCH_DEADLINE = float(os.getenv("MEDIA_FETCH_DEADLINE", "30"))
+media_executor = ThreadPoolExecutor(
+    max_workers=MEDIA_FETCH_WORKERS, thread_name_prefix="media"
+)
+
+# When a host reports no remaining quota without saying when it resets,
+# one request is let through again after this many seconds
+RAPIDAPI_QUOTA_COOLDOWN = float(os.getenv("RAPIDAPI_QUOTA_COOLDOWN", "3600"))
+
+class RapidAPIError(Exception):
+    """A RapidAPI request failed and should not be retried (anymore)"""
+
+
+class RapidAPIClient:
+    """
+    Session based RapidAPI client shared by the daemon and the pages.
+
+    Keeps connections alive, applies timeouts, retries 429/5xx/connection
+    errors with backoff (honouring Retry-After and the x-ratelimit-* headers
+    RapidAPI sends) and counts requests and remaining quota per API host.
+    Other client errors are raised immediately so they don't burn quota.
+    """
+
+    def __init__(
+        self,
+        max_retries: int = 3,
+        timeout: tuple = (5, 30),
+        backoff_base: float = 1.0,
+        max_backoff: float = 60.0,
+        pool_size: int = 10,
+    ):
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.backoff_base = backoff_base
+        self.max_backoff = max_backoff
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._lock = threading.Lock()
+        self.quota: Dict[str, dict] = {}
+
+    @staticmethod
+    def _int_header(headers, name: str) -> Optional[int]:
+        """Integer value of a header, None if it is missing or malformed"""
+        value = headers.get(name)
+        if value is None:
+            return None
+        try:
+            return int(value)
+        except ValueError:
+            logger.debug(f"Ignoring malformed {name} header: {value!r}")
+            return None
+
+    def _update_quota(self, host: str, response: requests.Response) -> None:
+        headers = response.headers
+        limit = self._int_header(headers, "x-ratelimit-requests-limit")
+        remaining = self._int_header(headers, "x-ratelimit-requests-remaining")
+        reset = self._int_header(headers, "x-ratelimit-requests-reset")
+        with self._lock:
+            quota = self.quota.setdefault(
+                host, {"requests": 0, "limit": None, "remaining": None, "reset_at": None}
+            )
+            quota["requests"] += 1
+            if limit is not None:
+                quota["limit"] = limit
+            if remaining is not None:
+                quota["remaining"] = remaining
+            if reset is not None:
+                quota["reset_at"] = time.time() + reset
+            elif quota["remaining"] == 0 and (
+                quota["reset_at"] is None or quota["reset_at"] <= time.time()
+            ):
+                # No reset time known, probe again after the cooldown
+                quota["reset_at"] = time.time() + RAPIDAPI_QUOTA_COOLDOWN
+
+    def _check_quota(self, host: str) -> None:
+        """Refuse to call an API whose quota is known to be used up"""
+        with self._lock:
+            quota = self.quota.get(host)
+            if not quota or quota["remaining"] != 0:
+                return
+            if quota["reset_at"] > time.time():
+                raise RapidAPIError(f"RapidAPI quota exhausted for {host}")
+            # The quota should have reset: let this request probe it, while
+            # other callers keep waiting until its response updates the quota
+            quota["reset_at"] = time.time() + RAPIDAPI_QUOTA_COOLDOWN
+
+    def _retry_delay(self, response: Optional[requests.Response], attempt: int) -> float:
+        """Seconds to wait before the next attempt"""
+        if response is not None:
+            retry_after = response.headers.get("retry-after")
+            if retry_after and retry_after.isdigit():
+                return min(float(retry_after), self.max_backoff)
+            if response.headers.get("x-ratelimit-requests-remaining") == "0":
+                reset = response.headers.get("x-ratelimit-requests-reset")
+                if reset and reset.isdigit():
+                    return float(reset)
+        # Exponential backoff with jitter
+        return min(self.backoff_base * 2 ** attempt, self.max_backoff) * random.uniform(0.5, 1.0)
+
+    def get(self, url: str, params: dict, headers: dict) -> dict:
+        host = headers.get("x-rapidapi-host", url)
+        for attempt in range(self.max_retries):
+            self._check_quota(host)
+            response = None
+            try:
+                response = self.session.get(url, headers=headers, params=params, timeout=self.timeout)
+                self._update_quota(host, response)
+            except requests.RequestException as e:
+                logger.warning(f"RapidAPI request to {host} failed: {e}")
+            else:
+                if response.status_code == 200:
+                    return response.json()
+                if response.status_code == 404:
+                    raise RapidAPIError(f"Page Not Found: {response.status_code}")
+                if response.status_code != 429 and response.status_code < 500:
+                    raise RapidAPIError(f"status_code:{response.status_code}:{response.text[:500]}")
+                logger.warning(f"RapidAPI {host} returned {response.status_code}")
+
+            if attempt < self.max_retries - 1:
+                delay = self._retry_delay(response, attempt)
+                if delay > self.max_backoff:
+                    raise RapidAPIError(f"RapidAPI rate limited for {delay:.0f}s on {host}")
+                logger.info(f"Retrying {host} in {delay:.1f}s ({attempt + 1}/{self.max_retries})")
+                time.sleep(delay)
+
+        raise RapidAPIError(f"Failed {self.max_retries} Attempts for {host}")
+
+    def get_quota_status(self) -> Dict[str, dict]:
+        """Requests made and last known quota per API host"""
+        with self._lock:
+            return {host: dict(quota) for host, quota in self.quota.items()}
+
+
+rapid_api_client = RapidAPIClient(
+    max_retries=int(os.getenv("RAPID_API_MAX_RETRIES", "3")),
+    timeout=(5, float(os.getenv("RAPID_API_TIMEOUT", "30"))),
+)
+
 
 def call_rapid_api(url: str, params: dict, headers: dict) -> dict:
-    tries = 3
-    while tries > 0:
-        print(f"API call, {tries} tries left")
-        response = requests.get(url, headers=headers, params=params)
-        if response.status_code == 200:
-            data = response.json()
-            return data
-        elif response.status_code == 404:
-            raise Exception(f"Page Not Found: {response.status_code}")
-        else:
-            print(f"status_code:{response.status_code}:{response.content}")
-            tries -= 1
+    return rapid_api_client.get(url=url, params=params, headers=headers)
+
+
+def _download_first_media(media_list: List[dict]) -> dict:
+    """Download the first media item of a post that is a valid image"""
+    for img_data in media_list:
+        image_data = sync_download_image(img_data["url"])
+        if image_data:
+            return {
+                "type": img_data["type"],
+                "url": img_data["url"],
+                "image_bytes": image_data.read()
+            }
+    return None
+
+
+def fetch_post_media(posts: List[dict], deadline: float = MEDIA_FETCH_DEADLINE) -> List[dict]:
+    """
+    Download the media of all posts concurrently and set their media_bytes.
+
+    Each post's media list is tried in order (e.g. a video falls back to its
+    thumbnail). Posts whose download hasn't finished within the deadline keep
+    empty media_bytes.
+    """
+    futures = {
+        media_executor.submit(_download_first_media, post["media_list"]): post
+        for post in posts
+        if post.get("media_list")
+    }
+    if not futures:
+        return posts
+
+    done, not_done = wait(futures, timeout=deadline)
+    for future in done:
+        try:
+            media_bytes = future.result()
+        except Exception as e:
+            logger.error(f"Media download failed for {futures[future].get('code')}: {e}")
             continue
-    if tries == 0:
-        raise Exception(f"Failed 3 Attempts : {response.json()}")
+        if media_bytes:
+            futures[future]["media_bytes"] = media_bytes
+
+    for future in not_done:
+        future.cancel()
+    if not_done:
+        logger.warning(f"Media of {len(not_done)} posts not fetched within {deadline}s")
 
+    return posts
 
-def extract_instagram_post_data(posts_data: List[dict]) -> List[dict]:
+
+def extract_instagram_post_data(posts_data: List[dict], fetch_media: bool = True) -> List[dict]:
     """
     Extracts specific information from a list of Instagram post data dictionaries.
 
     Args:
         posts_data: A list of dictionaries, where each dictionary represents
                     an Instagram post's data (like the provided example).
+        fetch_media: Download each post's media (concurrently, see
+                     fetch_post_media). With False only the media URLs are
+                     collected and media_bytes is left empty.
 
     Returns:
         A list of dictionaries, where each dictionary contains the
@@ -201,29 +390,29 @@ def extract_instagram_post_data(posts_data: List[dict]) -> List[dict]:
 
         # Filter out any potential None values if URLs weren't found
         post_info["media_list"] = [media for media in media_list if media.get("url")]
-        image_data = None
         post_info['media_bytes'] = {
             "type":"",
             "url":"",
             "image_bytes":None
         }
-        for i, img_data in enumerate(post_info["media_list"]):
-            image_data = sync_download_image(img_data["url"])
-            if image_data:
-                post_info["media_bytes"] = {
-                    "type": img_data["type"],
-                    "url": img_data["url"],
-                    "image_bytes": image_data.read()
-                }
-                break
         
         extracted_posts.append(post_info)
 
+    if fetch_media:
+        fetch_post_media(extracted_posts)
+
     return extracted_posts
 
 
 
-def get_latest_instagram_post(page_id:str, last_created_at: int = None, n_posts: int = 10) -> List[dict]:
+def get_latest_instagram_post(
+    page_id: str,
+    last_created_at: int = None,
+    n_posts: int = 10,
+    cursor: str = None,
+    return_cursor: bool = False,
+    fetch_media: bool = True,
+):
     """
     Get latest Instagram posts for a given page.
     
@@ -231,13 +420,20 @@ def get_latest_instagram_post(page_id:str, last_created_at: int = None, n_posts:
         page_name: Instagram username or ID
         last_created_at: Unix timestamp - only return posts after this time. If None, get latest n_posts
         n_posts: Maximum number of posts to return (default 10)
+        cursor: Pagination cursor to continue from instead of the newest post
+        return_cursor: Also return the cursor to continue from
+        fetch_media: Download the media of the posts (see fetch_post_media)
     
     Returns:
-        List of extracted post dictionaries
+        List of extracted post dictionaries. With return_cursor, a tuple of
+        (posts, cursor); the cursor is None once last_created_at was reached
+        or there are no more pages, and all posts of the fetched pages are
+        returned so none are skipped when continuing from it.
     """
-    pagination_token = None
+    pagination_token = cursor
     post_array = []
     should_continue = True
+    reached_watermark = False
 
     query_string = {"amount":n_posts,"user_id":page_id}
     url = "https://instagram-premium-api-2023.p.rapidapi.com/v1/user/medias/chunk"
@@ -249,13 +445,14 @@ def get_latest_instagram_post(page_id:str, last_created_at: int = None, n_posts:
 
         data = call_rapid_api(url=url, params=query_string, headers=headers)
         if not data:
-            return []
+            return ([], None) if return_cursor else []
 
         posts = data[0]
         pagination_token = data[1]
 
         if posts:
-            posts_info = extract_instagram_post_data(posts)
+            # Media is only fetched for the posts that are finally returned
+            posts_info = extract_instagram_post_data(posts, fetch_media=False)
             
             # Filter posts based on timestamp if provided
             if last_created_at is not None:
@@ -267,6 +464,7 @@ def get_latest_instagram_post(page_id:str, last_created_at: int = None, n_posts:
                 old_posts_found = any(post["taken_at"] <= last_created_at for post in posts_info)
                 if old_posts_found:
                     should_continue = False
+                    reached_watermark = True
             else:
                 # No timestamp filtering, just add all posts
                 post_array.extend(posts_info)
@@ -280,8 +478,15 @@ def get_latest_instagram_post(page_id:str, last_created_at: int = None, n_posts:
         elif not pagination_token:
             should_continue = False
 
-    # Limit to requested number of posts
-    return post_array[:n_posts]
+    if not return_cursor:
+        # Limit to requested number of posts
+        post_array = post_array[:n_posts]
+    if fetch_media:
+        post_array = fetch_post_media(post_array)
+
+    if return_cursor:
+        return post_array, None if reached_watermark else pagination_token
+    return post_array
 
 
 def extract_tweet_details(tweet_data: dict) -> dict:
@@ -450,13 +655,177 @@ def extract_tweet_details(tweet_data: dict) -> dict:
     return extracted_info
 
 
-def get_tweet_data(tweet_url:str) -> dict:
-    tweet_id = tweet_url.split("/")[-1]
+def extract_timeline_tweets(timeline_data: dict) -> tuple:
+    """
+    Extracts tweets and the next page cursor from a user timeline response.
+
+    Returns:
+        (list of tweet result objects, bottom cursor or None)
+    """
+    tweets = []
+    cursor = None
+    try:
+        instructions = timeline_data["result"]["timeline"]["instructions"]
+    except (KeyError, TypeError) as e:
+        print(f"An error occurred while parsing the timeline data: {e}")
+        return [], None
+
+    for instruction in instructions:
+        entries = instruction.get("entries", [])
+        if instruction.get("type") == "TimelinePinEntry":
+            # Pinned tweets are old posts shown first, skip them
+            continue
+        for entry in entries:
+            content = entry.get("content", {})
+            if content.get("cursorType") == "Bottom":
+                cursor = content.get("value")
+                continue
+            tweet = (
+                content.get("itemContent", {})
+                .get("tweet_results", {})
+                .get("result", {})
+            )
+            # Tweets with visibility results wrap the actual tweet
+            tweet = tweet.get("tweet", tweet)
+            if tweet.get("legacy"):
+                tweets.append(tweet)
+    return tweets, cursor
+
+
+def extract_tweet_source_data(tweet: dict) -> dict:
+    """Convert a timeline tweet into the post format of the sources collection"""
+    details = extract_tweet_details({"result": {"tweetResult": {"result": tweet}}})
+    legacy = tweet.get("legacy", {})
+
+    media_list = []
+    for media_item in legacy.get("extended_entities", {}).get("media", []):
+        # Photos, and the preview image of videos/GIFs (videos aren't stored)
+        media_type = "image" if media_item.get("type") == "photo" else "thumbnail"
+        if media_item.get("media_url_https"):
+            media_list.append({"url": media_item["media_url_https"], "type": media_type})
+
+    if not media_list:
+        post_type = "text"
+    elif any(m.get("type") in ("video", "animated_gif") for m in details["media"]):
+        post_type = "video"
+    else:
+        post_type = "image"
+
+    created_at = legacy.get("created_at")
+    return {
+        "code": tweet.get("rest_id") or legacy.get("id_str", ""),
+        "source": "twitter",
+        "taken_at": int(datetime.strptime(created_at, "%a %b %d %H:%M:%S %z %Y").timestamp()) if created_at else 0,
+        "username": details["userhandle"] or "",
+        "user_full_name": details["username"] or "",
+        "user_is_verified": details["is_verified"],
+        "location_name": "",
+        "type": post_type,
+        "like_count": legacy.get("favorite_count", 0),
+        "share_count": legacy.get("retweet_count", 0),
+        "comment_count": legacy.get("reply_count", 0),
+        "played_count": None,
+        "hashtags": [f"#{tag.get('text')}" for tag in legacy.get("entities", {}).get("hashtags", [])],
+        "mentions": [f"@{m.get('screen_name')}" for m in legacy.get("entities", {}).get("user_mentions", [])],
+        "caption": details["text"] or "",
+        "media_list": media_list,
+        "media_bytes": {"type": "", "url": "", "image_bytes": None},
+    }
+
+
+def get_latest_tweets(
+    user_id: str,
+    last_created_at: int = None,
+    n_posts: int = 10,
+    cursor: str = None,
+    return_cursor: bool = False,
+    fetch_media: bool = True,
+):
+    """
+    Get latest tweets of a Twitter user in the sources post format.
+
+    Args:
+        user_id: Twitter user ID (rest id)
+        last_created_at: Unix timestamp - only return tweets after this time
+        n_posts: Maximum number of tweets to return (default 10)
+        cursor: Timeline cursor to continue from instead of the newest tweet
+        return_cursor: Also return the cursor to continue from
+        fetch_media: Download the media of the tweets (see fetch_post_media)
+
+    Returns:
+        List of extracted post dictionaries, newest first. With return_cursor,
+        a tuple of (posts, cursor) as for get_latest_instagram_post.
+    """
+    url = "https://twitter241.p.rapidapi.com/user-tweets"
+    headers = {"x-rapidapi-key": api_key, "x-rapidapi-host": "twitter241.p.rapidapi.com"}
+    query_string = {"user": user_id, "count": 20}
+    if cursor:
+        query_string["cursor"] = cursor
+    post_array = []
+    next_cursor = None
+
+    while len(post_array) < n_posts:
+        data = call_rapid_api(url=url, params=query_string, headers=headers)
+        tweets, next_cursor = extract_timeline_tweets(data)
+        if not tweets:
+            next_cursor = None
+            break
+
+        posts_info = sorted(
+            (extract_tweet_source_data(tweet) for tweet in tweets),
+            key=lambda post: post["taken_at"],
+            reverse=True,
+        )
+        if last_created_at is not None:
+            post_array.extend(p for p in posts_info if p["taken_at"] > last_created_at)
+            if any(p["taken_at"] <= last_created_at for p in posts_info):
+                next_cursor = None
+                break
+        else:
+            post_array.extend(posts_info)
+
+        if not next_cursor:
+            break
+        query_string["cursor"] = next_cursor
+
+    if not return_cursor:
+        post_array = post_array[:n_posts]
+    if fetch_media:
+        post_array = fetch_post_media(post_array)
+    return (post_array, next_cursor) if return_cursor else post_array
+
+
+def parse_tweet_id(tweet_url: str) -> str:
+    """Get the tweet ID from a tweet URL (query strings and trailing paths are ignored)"""
+    match = re.search(r"/status(?:es)?/(\d+)", tweet_url)
+    if match:
+        return match.group(1)
+    return tweet_url.split("?")[0].rstrip("/").split("/")[-1]
+
+
+def get_tweet_data(tweet_url:str, use_cache: bool = True) -> dict:
+    """
+    Get the details of a tweet (see extract_tweet_details).
+
+    Parsed details are cached by tweet ID (see TweetDataCache), so fetching
+    the same tweet again, e.g. to re-render it with another crop type,
+    doesn't call RapidAPI. use_cache=False always fetches fresh data.
+    """
+    tweet_id = parse_tweet_id(tweet_url)
+    if use_cache:
+        cached = tweet_data_cache.get(tweet_id)
+        if cached:
+            return cached
+
     url = "https://twitter241.p.rapidapi.com/tweet-v2"
     query_string = {"pid": tweet_id}
     headers = {"x-rapidapi-key": api_key, "x-rapidapi-host": "twitter241.p.rapidapi.com"}
     data = call_rapid_api(url=url, params=query_string, headers=headers)
-    return extract_tweet_details(data)
+    tweet_details = extract_tweet_details(data)
+    # Only cache tweets that were parsed, failed lookups are retried
+    if tweet_details.get("userhandle"):
+        tweet_data_cache.put(tweet_id, tweet_details)
+    return tweet_details
 
 if __name__ == "__main__":
     # import json 
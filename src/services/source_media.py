@@ -0,0 +1,42 @@
+import hashlib
+import os
+from typing import List, Optional
+from urllib.parse import urlparse
+
+# Max number of differing dHash bits for two images to count as the same
+# picture. Hashes are split into DHASH_BANDS bands to look up candidates, so
+# any match within DHASH_BANDS - 1 bits shares at least one band.
+DHASH_BANDS = 8
+SOURCE_MEDIA_MAX_DISTANCE = min(
+    int(os.getenv("SOURCE_MEDIA_MAX_DISTANCE", "6")), DHASH_BANDS - 1
+)
+
+
+def content_hash(data: bytes) -> str:
+    """SHA-256 of the downloaded media bytes"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def media_url_key(url: str) -> Optional[str]:
+    """
+    Stable key of a media URL.
+
+    CDN URLs carry signatures and expiry in the query string and are served
+    from varying hosts, so only the path identifies the file.
+    """
+    if not url:
+        return None
+    return urlparse(url).path or None
+
+
+def dhash_bands(value: int) -> List[str]:
+    """Split a 64 bit dHash into DHASH_BANDS indexed "<band>:<bits>" keys"""
+    band_bits = 64 // DHASH_BANDS
+    mask = (1 << band_bits) - 1
+    return [
+        f"{band}:{(value >> (band * band_bits)) & mask:x}" for band in range(DHASH_BANDS)
+    ]
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
@@ -0,0 +1,110 @@
+import os
+import copy
+import json
+import time
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv(override=True)
+logger = logging.getLogger(__name__)
+
+
+class TweetDataCache:
+    """
+    TTL cache of parsed tweet details, keyed by tweet ID.
+
+    Recently used entries are kept in memory (up to max_entries) and every
+    entry is also written to disk as JSON, so the Streamlit page, batch runs
+    and restarts share the same cache. Expired entries are ignored and
+    removed from disk.
+    """
+
+    # Remove expired files from disk every this many writes
+    PRUNE_EVERY = 100
+
+    def __init__(self, root: str, ttl_seconds: float, max_entries: int = 256):
+        self.root = Path(root)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._memory: "OrderedDict[str, tuple[float, Dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    def _path(self, tweet_id: str) -> Path:
+        return self.root / f"{tweet_id}.json"
+
+    def _is_fresh(self, cached_at: float) -> bool:
+        return time.time() - cached_at < self.ttl_seconds
+
+    def _remember(self, tweet_id: str, cached_at: float, data: Dict) -> None:
+        with self._lock:
+            self._memory[tweet_id] = (cached_at, data)
+            self._memory.move_to_end(tweet_id)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def get(self, tweet_id: str) -> Optional[Dict]:
+        """Get a copy of the cached tweet details, or None if missing or expired"""
+        with self._lock:
+            entry = self._memory.get(tweet_id)
+            if entry and self._is_fresh(entry[0]):
+                self._memory.move_to_end(tweet_id)
+                return copy.deepcopy(entry[1])
+
+        path = self._path(tweet_id)
+        try:
+            entry = json.loads(path.read_text())
+        except (OSError, ValueError):
+            return None
+        if not self._is_fresh(entry.get("cached_at", 0)):
+            path.unlink(missing_ok=True)
+            return None
+        self._remember(tweet_id, entry["cached_at"], entry["data"])
+        return copy.deepcopy(entry["data"])
+
+    def _write_atomic(self, path: Path, text: str) -> None:
+        """Write through a unique temp file, so concurrent writers never share one"""
+        with tempfile.NamedTemporaryFile("w", dir=self.root, suffix=".tmp", delete=False) as tmp:
+            tmp.write(text)
+        try:
+            os.replace(tmp.name, path)
+        except OSError:
+            os.unlink(tmp.name)
+            raise
+
+    def put(self, tweet_id: str, data: Dict) -> None:
+        cached_at = time.time()
+        self._remember(tweet_id, cached_at, copy.deepcopy(data))
+        try:
+            self.root.mkdir(parents=True, exist_ok=True)
+            self._write_atomic(self._path(tweet_id), json.dumps({"cached_at": cached_at, "data": data}))
+        except (OSError, TypeError) as e:
+            logger.error(f"Failed to write tweet {tweet_id} to cache: {e}")
+
+        self._writes += 1
+        if self._writes % self.PRUNE_EVERY == 0:
+            self.prune()
+
+    def prune(self) -> int:
+        """Remove expired entries from disk, returns the number removed"""
+        removed = 0
+        for path in self.root.glob("*.json"):
+            try:
+                if not self._is_fresh(json.loads(path.read_text()).get("cached_at", 0)):
+                    path.unlink(missing_ok=True)
+                    removed += 1
+            except (OSError, ValueError):
+                continue
+        return removed
+
+
+tweet_data_cache = TweetDataCache(
+    root=os.getenv("TWEET_CACHE_DIR", "./data/twitter/tweet_cache"),
+    ttl_seconds=float(os.getenv("TWEET_CACHE_TTL_MINUTES", "60")) * 60,
+)
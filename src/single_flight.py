@@ -0,0 +1,123 @@
+import asyncio
+import concurrent.futures
+import contextlib
+import contextvars
+import hashlib
+import logging
+import re
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class _LeaderCancelled(Exception):
+    """The call that was doing the work got cancelled, followers must retry"""
+
+
+class SingleFlight:
+    """
+    Runs at most one call per key at a time.
+
+    Callers that arrive while a call with the same key is in flight wait for
+    its result instead of repeating the work. The shared futures are thread
+    safe, so workflows running on other event loops are coalesced as well.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, concurrent.futures.Future] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        while True:
+            with self._lock:
+                future = self._calls.get(key)
+                is_leader = future is None
+                if is_leader:
+                    future = concurrent.futures.Future()
+                    # A running future can't be cancelled by a waiting follower
+                    future.set_running_or_notify_cancel()
+                    self._calls[key] = future
+
+            if is_leader:
+                break
+
+            try:
+                return await asyncio.wrap_future(future)
+            except _LeaderCancelled:
+                continue
+
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.set_exception(_LeaderCancelled())
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+
+_single_flight = SingleFlight()
+
+# Results of finished calls, kept for the lifetime of one workflow
+_workflow_memo: contextvars.ContextVar[Optional[dict]] = contextvars.ContextVar(
+    "workflow_memo", default=None
+)
+
+
+@contextlib.contextmanager
+def workflow_scope():
+    """Share finished image work between all slides of the enclosed workflow"""
+    token = _workflow_memo.set({})
+    try:
+        yield
+    finally:
+        _workflow_memo.reset(token)
+
+
+async def coalesce(
+    namespace: str,
+    key: Hashable,
+    fn: Callable[[], Awaitable[Any]],
+    cache_if: Callable[[Any], Any] = bool,
+) -> Any:
+    """
+    Run fn once per (namespace, key).
+
+    Identical in-flight calls share one execution (across slides and across
+    concurrent workflows) and, inside a workflow_scope, finished results are
+    reused by later slides of the same workflow. Exceptions and results
+    failing cache_if (by default falsy ones, like a failed download) are only
+    shared in flight, so a later call tries again.
+    """
+    full_key = (namespace, key)
+    memo = _workflow_memo.get()
+    if memo is not None and full_key in memo:
+        logger.info(f"Reusing {namespace} result within workflow")
+        return memo[full_key]
+
+    result = await _single_flight.do(full_key, fn)
+    if memo is not None and cache_if(result):
+        memo[full_key] = result
+    return result
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text so near-identical queries and descriptions share a key"""
+    text = re.sub(r"[^\w\s]", " ", (text or "").casefold())
+    return " ".join(text.split())
+
+
+def content_key(data: Optional[bytes]) -> str:
+    """Short stable key for binary content (e.g. a reference image)"""
+    if not data:
+        return ""
+    if hasattr(data, "getvalue"):
+        data = data.getvalue()
+    return hashlib.sha256(data).hexdigest()
@@ -3,7 +3,11 @@ from pathlib import Path
 import time
 import logging
 import os
-from typing import List
+import json
+import queue
+import threading
+from contextlib import contextmanager
+from typing import List, Optional, Tuple
 import io
 
 from PIL import Image, ImageDraw
@@ -21,6 +25,81 @@ def extract_x(response: str, code_type: str) -> str:
     match = re.search(pattern, response, re.DOTALL)
     return match.group(1).strip() if match else None
 
+class JsonArrayStreamParser:
+    """
+    Incrementally parse the objects of a JSON array while the text is streamed.
+
+    Feed chunks of text as they arrive; every object of the array stored under
+    `key` is returned as soon as its closing brace has been received, together
+    with its index in the array. Objects that can't be parsed are skipped but
+    still counted, so the indexes always match the full array.
+
+    Example:
+        ```python
+        parser = JsonArrayStreamParser("storyboard")
+        for chunk in chunks:
+            for index, slide in parser.feed(chunk):
+                ...
+        ```
+    """
+
+    def __init__(self, key: str):
+        self.key_pattern = re.compile(rf'"{re.escape(key)}"\s*:\s*\[')
+        self.buffer = ""
+        self.position = None  # Scan position once the array has started
+        self.depth = 0
+        self.object_start = None
+        self.index = 0  # Array index of the next object
+        self.in_string = False
+        self.escaped = False
+        self.finished = False
+
+    def feed(self, chunk: str) -> List[Tuple[int, dict]]:
+        self.buffer += chunk
+        if self.finished:
+            return []
+
+        if self.position is None:
+            match = self.key_pattern.search(self.buffer)
+            if not match:
+                return []
+            self.position = match.end()
+
+        objects = []
+        while self.position < len(self.buffer):
+            char = self.buffer[self.position]
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char in "{[":
+                if self.depth == 0 and char == "{":
+                    self.object_start = self.position
+                self.depth += 1
+            elif char in "}]":
+                if self.depth == 0:
+                    # End of the array itself
+                    self.finished = True
+                    break
+                self.depth -= 1
+                if self.depth == 0 and self.object_start is not None:
+                    raw_object = self.buffer[self.object_start : self.position + 1]
+                    self.object_start = None
+                    try:
+                        objects.append((self.index, json.loads(raw_object)))
+                    except json.JSONDecodeError as e:
+                        logger.warning(f"Skipping unparsable streamed object {self.index}: {e}")
+                    self.index += 1
+            self.position += 1
+
+        return objects
+
+
 def cleanup_files(dir_path: str, session_id: str) -> None:
     """Delete all temporary files generated during the workflow that contain the session_id"""
     for file_path in os.listdir(dir_path):
@@ -37,19 +116,7 @@ def cleanup_files(dir_path: str, session_id: str) -> None:
 
 
 ## Image Utils
-def capture_html_screenshot(
-    file_path: str,
-    element_selector: str,
-    output: str = "./data/scoopwhoop/element_screenshot.png",
-    zoom: float = 1.0,
-    delay: float = 0.6,
-    headless: bool = True,
-    get_video: bool = False,
-    class_name:str = ''
-):
-    file_url = Path(file_path).resolve().as_uri()
-    video_rect = None
-
+def _create_chrome_driver(headless: bool = True):
     options = Options()
     if headless:
         options.add_argument("--headless=new")
@@ -66,33 +133,158 @@ def capture_html_screenshot(
     options.add_argument("--disable-blink-features=AutomationControlled")
     options.add_argument("--silent")
 
-    driver = webdriver.Chrome(options=options)
-    try:
-        driver.get(file_url)
+    return webdriver.Chrome(options=options)
 
-        # Apply zoom if needed
-        if zoom != 1.0:
-            driver.execute_script(f"document.body.style.zoom='{zoom}';")
 
-        time.sleep(delay)
+class BrowserPool:
+    """
+    Keeps headless Chrome instances alive between screenshots.
+
+    Starting Chrome takes longer than rendering a card, so batch runs borrow
+    a running browser instead. At most `size` browsers exist at once; a
+    browser is restarted after `max_uses` screenshots or any error. Once the
+    pool is closed, browsers still in use are quit when they are returned.
+    """
 
-        # Find the element (e.g., an <img> tag)
-        element = driver.find_element("css selector", element_selector)
-        if get_video:
-            video_element = driver.find_element("css selector", f".{class_name}")
-            video_rect = video_element.rect  # Returns {'x': int, 'y': int, 'width': int, 'height': int}
+    def __init__(self, size: int, max_uses: int = 200):
+        self.size = size
+        self.max_uses = max_uses
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._uses = {}
+        self._lock = threading.Lock()
+        self.closed = False
+
+    @contextmanager
+    def driver(self):
+        self._slots.acquire()
+        try:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                driver = _create_chrome_driver()
+                self._uses[id(driver)] = 0
+
+            healthy = False
+            try:
+                yield driver
+                healthy = True
+            finally:
+                self._uses[id(driver)] += 1
+                with self._lock:
+                    keep = not self.closed and healthy and self._uses[id(driver)] < self.max_uses
+                    if keep:
+                        self._idle.put(driver)
+                if not keep:
+                    self._quit(driver)
+        finally:
+            self._slots.release()
+
+    def _quit(self, driver) -> None:
+        self._uses.pop(id(driver), None)
+        try:
+            driver.quit()
+        except Exception as e:
+            logger.warning(f"Failed to quit browser: {e}")
 
-        # Capture screenshot of the element
-        element.screenshot(output)
-        logger.info(f"Image element captured and saved to {output}")
+    def close(self) -> None:
+        """Quit all idle browsers, and the ones in use once they are returned"""
+        with self._lock:
+            self.closed = True
+        while True:
+            try:
+                self._quit(self._idle.get_nowait())
+            except queue.Empty:
+                break
 
-        return video_rect
-    except Exception as e:
-        logger.error(f"Error capturing image element: {e}")
-        raise e
-    finally:
-        driver.quit()
-        return video_rect
+
+_browser_pool: Optional[BrowserPool] = None
+_browser_pool_lock = threading.Lock()
+
+
+def enable_browser_pool(size: int) -> BrowserPool:
+    """
+    Make screenshots reuse up to `size` browsers (see BrowserPool).
+
+    A pool of another size (or a closed one) is closed and replaced; its
+    browsers that are still rendering are quit when they are returned.
+    """
+    global _browser_pool
+    with _browser_pool_lock:
+        if _browser_pool is None or _browser_pool.closed or _browser_pool.size != size:
+            if _browser_pool is not None:
+                _browser_pool.close()
+            _browser_pool = BrowserPool(size)
+        return _browser_pool
+
+
+def get_browser_pool() -> Optional[BrowserPool]:
+    """The shared browser pool, enabled by BROWSER_POOL_SIZE or enable_browser_pool()
+
+    A pool closed by its owner (e.g. a finished batch run) is forgotten, so
+    later screenshots use a fresh driver (or a new BROWSER_POOL_SIZE pool).
+    """
+    global _browser_pool
+    with _browser_pool_lock:
+        if _browser_pool is not None and _browser_pool.closed:
+            _browser_pool = None
+    pool_size = int(os.getenv("BROWSER_POOL_SIZE", "0"))
+    if _browser_pool is None and pool_size > 0:
+        return enable_browser_pool(pool_size)
+    return _browser_pool
+
+
+@contextmanager
+def _browser(headless: bool):
+    pool = get_browser_pool()
+    if pool is not None and headless:
+        with pool.driver() as driver:
+            yield driver
+    else:
+        driver = _create_chrome_driver(headless)
+        try:
+            yield driver
+        finally:
+            driver.quit()
+
+
+def capture_html_screenshot(
+    file_path: str,
+    element_selector: str,
+    output: str = "./data/scoopwhoop/element_screenshot.png",
+    zoom: float = 1.0,
+    delay: float = 0.6,
+    headless: bool = True,
+    get_video: bool = False,
+    class_name:str = ''
+):
+    file_url = Path(file_path).resolve().as_uri()
+    video_rect = None
+
+    with _browser(headless) as driver:
+        try:
+            driver.get(file_url)
+
+            # Apply zoom if needed
+            if zoom != 1.0:
+                driver.execute_script(f"document.body.style.zoom='{zoom}';")
+
+            time.sleep(delay)
+
+            # Find the element (e.g., an <img> tag)
+            element = driver.find_element("css selector", element_selector)
+            if get_video:
+                video_element = driver.find_element("css selector", f".{class_name}")
+                video_rect = video_element.rect  # Returns {'x': int, 'y': int, 'width': int, 'height': int}
+
+            # Capture screenshot of the element
+            element.screenshot(output)
+            logger.info(f"Image element captured and saved to {output}")
+        except Exception as e:
+            logger.error(f"Error capturing image element: {e}")
+            raise e
+
+    return video_rect
 
 
 def pil_image_to_bytes(image, format="PNG"):
@@ -150,6 +342,56 @@ def compress_image(
         return image_data  # Return original if compression fails
 
 
+def create_thumbnail(image_data: bytes, max_size: tuple, quality: int = 70) -> bytes:
+    """
+    Create a WebP thumbnail that fits within max_size, keeping aspect ratio.
+
+    Args:
+        image_data: Raw image bytes
+        max_size: Maximum dimensions (width, height) of the thumbnail
+        quality: WebP quality (1-100)
+
+    Returns:
+        WebP thumbnail bytes
+    """
+    img = Image.open(io.BytesIO(image_data))
+    # draft() lets JPEG decode at reduced scale; a no-op for other formats
+    img.draft("RGB", max_size)
+    if img.mode not in ("RGB", "RGBA"):
+        img = img.convert("RGBA" if "transparency" in img.info else "RGB")
+    # thumbnail() only ever shrinks
+    img.thumbnail(max_size, Image.Resampling.LANCZOS)
+
+    output = io.BytesIO()
+    img.save(output, format="WEBP", quality=quality, method=4)
+    return output.getvalue()
+
+
+def dhash(image_data: bytes, hash_size: int = 8) -> int:
+    """
+    Difference hash of an image for near-duplicate detection.
+
+    The image is reduced to (hash_size + 1) x hash_size grayscale pixels and
+    each bit records whether a pixel is brighter than its right neighbour,
+    so re-encoded, resized or slightly edited copies get (nearly) the same hash.
+
+    Returns:
+        hash_size * hash_size bit integer
+    """
+    img = Image.open(io.BytesIO(image_data))
+    img.draft("L", (hash_size * 8, hash_size * 8))
+    img = img.convert("L").resize((hash_size + 1, hash_size), Image.Resampling.LANCZOS)
+    pixels = list(img.getdata())
+
+    value = 0
+    for row in range(hash_size):
+        for col in range(hash_size):
+            left = pixels[row * (hash_size + 1) + col]
+            right = pixels[row * (hash_size + 1) + col + 1]
+            value = (value << 1) | (left > right)
+    return value
+
+
 def crop_image(
     image_bytes: bytes,
     output_width: int = 1080,
@@ -0,0 +1,176 @@
+import asyncio
+import logging
+from typing import Dict, List, Optional
+
+from src.services.async_mongo import AsyncMongoRepository, get_async_repository
+
+logger = logging.getLogger(__name__)
+
+
+class WorkflowCheckpoint:
+    """
+    Persists each completed stage of a content workflow.
+
+    Stages are research, story board, per-slide image candidates and
+    per-slide renders. Image bytes go to the asset store and the checkpoint
+    document only keeps references, so an interrupted session can be resumed
+    from its last completed stage without repeating paid API calls.
+
+    Saving a checkpoint never fails the workflow; errors are only logged.
+    """
+
+    def __init__(
+        self,
+        session_id: str,
+        state: Optional[Dict] = None,
+        repository: Optional[AsyncMongoRepository] = None,
+    ):
+        self.session_id = session_id
+        self.state = state or {}
+        self.repository = repository or get_async_repository()
+
+    @classmethod
+    async def open(cls, session_id: str) -> "WorkflowCheckpoint":
+        """Load the checkpoint of a session (empty if it has none yet)"""
+        repository = get_async_repository()
+        try:
+            state = await repository.get_checkpoint(session_id)
+        except Exception as e:
+            logger.error(f"Failed to load checkpoint for {session_id}: {e}")
+            state = None
+        return cls(session_id, state, repository)
+
+    @property
+    def exists(self) -> bool:
+        return bool(self.state)
+
+    async def _save(self, fields: Dict) -> bool:
+        try:
+            await self.repository.save_checkpoint(self.session_id, fields)
+            return True
+        except Exception as e:
+            logger.error(f"Failed to save checkpoint for {self.session_id}: {e}")
+            return False
+
+    async def _store_bytes(self, data: Optional[bytes], filename: str) -> Optional[Dict]:
+        if not data:
+            return None
+        return await self.repository.store_checkpoint_asset(data, filename, self.session_id)
+
+    async def start(
+        self, headline: str, template_type: str, page_name: str, image_bytes: Optional[bytes]
+    ) -> None:
+        """Record the workflow inputs"""
+        try:
+            image_asset = await self._store_bytes(image_bytes, "reference_image")
+        except Exception as e:
+            logger.error(f"Failed to checkpoint reference image: {e}")
+            image_asset = None
+        fields = {
+            "headline": headline,
+            "template_type": template_type,
+            "page_name": page_name,
+            "image": {"asset": image_asset},
+            "status": "running",
+        }
+        if await self._save(fields):
+            self.state.update(fields)
+
+    async def load_reference_image(self) -> Optional[bytes]:
+        return await self.repository.load_image(self.state.get("image"))
+
+    @property
+    def research(self) -> Optional[str]:
+        return self.state.get("research")
+
+    async def save_research(self, research_result: str) -> None:
+        await self._save({"research": research_result})
+
+    @property
+    def story_board(self) -> Optional[Dict]:
+        return self.state.get("story_board")
+
+    async def save_story_board(self, story_board: Dict) -> None:
+        await self._save({"story_board": story_board})
+
+    def _slide(self, index: int) -> Dict:
+        return self.state.get("slides", {}).get(str(index), {})
+
+    async def _load_images(self, entries: List[Dict], keys: List[str]) -> List[Dict]:
+        """Replace the asset references of checkpointed images with their bytes"""
+        images = []
+        for entry in entries:
+            image = dict(entry)
+            for key in keys:
+                image[key] = await self.repository.load_image(entry.get(key))
+            images.append(image)
+        return images
+
+    async def slide_candidates(self, index: int) -> Optional[List[Dict]]:
+        """Image candidates of a slide, or None if they were never checkpointed"""
+        entries = self._slide(index).get("candidates")
+        if entries is None:
+            return None
+        candidates = await self._load_images(entries, ["image_bytes"])
+        return [c for c in candidates if c["image_bytes"]]
+
+    async def save_slide_candidates(self, index: int, candidates: List[Dict]) -> None:
+        try:
+            entries = []
+            for i, candidate in enumerate(candidates):
+                asset = await self._store_bytes(
+                    candidate.get("image_bytes"), f"slide_{index}_candidate_{i}"
+                )
+                if asset:
+                    entries.append({**candidate, "image_bytes": {"asset": asset}})
+        except Exception as e:
+            logger.error(f"Failed to checkpoint candidates of slide {index}: {e}")
+            return
+        await self._save({f"slides.{index}.candidates": entries})
+
+    async def slide_renders(self, index: int) -> Optional[List[Dict]]:
+        """Rendered images of a slide, or None if the slide isn't done yet"""
+        entries = self._slide(index).get("renders")
+        if entries is None:
+            return None
+        renders = []
+        for entry in entries:
+            versions = await self._load_images([entry["images"]], ["without_text", "with_text"])
+            renders.append({**entry, "images": versions[0]})
+        return renders
+
+    async def save_slide_renders(self, index: int, renders: List[Dict]) -> None:
+        try:
+            entries = []
+            for i, render in enumerate(renders):
+                versions = await asyncio.gather(
+                    self._store_bytes(render["images"]["without_text"], f"slide_{index}_{i}_without_text"),
+                    self._store_bytes(render["images"]["with_text"], f"slide_{index}_{i}_with_text"),
+                )
+                entries.append(
+                    {
+                        **render,
+                        "images": {
+                            "without_text": {"asset": versions[0]},
+                            "with_text": {"asset": versions[1]},
+                        },
+                    }
+                )
+        except Exception as e:
+            logger.error(f"Failed to checkpoint renders of slide {index}: {e}")
+            return
+        await self._save({f"slides.{index}.renders": entries})
+
+    async def reset_slide(self, index: int) -> None:
+        """Forget the checkpointed stages of a slide"""
+        await self._save({f"slides.{index}": {}})
+
+    async def mark(self, status: str, error: Optional[str] = None) -> None:
+        await self._save({"status": status, "error": error})
+
+    async def complete(self) -> None:
+        """Drop the checkpoint once the full result has been saved"""
+        try:
+            await self.repository.delete_checkpoint(self.session_id)
+        except Exception as e:
+            logger.error(f"Failed to delete checkpoint for {self.session_id}: {e}")
@@ -0,0 +1,233 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+import statistics
+from pathlib import Path
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from src.templates import get_template_config
+from src.workflows.content_creator import workflow
+
+logger = logging.getLogger(__name__)
+
+# Workflows running at the same time; each one also runs its slides in parallel
+WORKFLOW_BATCH_CONCURRENCY = int(os.getenv("WORKFLOW_BATCH_CONCURRENCY", "3"))
+
+
+def parse_jobs(
+    lines: List[str], page_name: str, template_type: str
+) -> Tuple[List[Dict], List[str]]:
+    """
+    Turn input lines into workflow jobs.
+
+    A line is either a plain headline, using the default page and template,
+    or a JSON object with "headline" and optional "page_name" and
+    "template_type" to pick the template per item. Empty lines and lines
+    starting with # are skipped.
+
+    Returns:
+        Tuple of (jobs, errors). Invalid lines (malformed JSON, no headline,
+        unknown page/template) don't become jobs; each one is reported in
+        errors as "line <n>: <reason>".
+    """
+    jobs = []
+    errors = []
+    for line_number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        try:
+            if line.startswith("{"):
+                item = json.loads(line)
+            else:
+                item = {"headline": line}
+            if not isinstance(item, dict):
+                raise ValueError("expected a JSON object")
+            job = {
+                "line": line_number,
+                "headline": item["headline"],
+                "page_name": item.get("page_name", page_name),
+                "template_type": item.get("template_type", template_type),
+            }
+            if not isinstance(job["headline"], str) or not job["headline"].strip():
+                raise ValueError("headline is empty")
+            # Fail before anything runs if a page/template doesn't exist
+            get_template_config(job["template_type"], job["page_name"])
+        except json.JSONDecodeError as e:
+            errors.append(f"line {line_number}: invalid JSON ({e})")
+            continue
+        except KeyError as e:
+            errors.append(f"line {line_number}: missing {e}")
+            continue
+        except ValueError as e:
+            errors.append(f"line {line_number}: {e}")
+            continue
+        jobs.append(job)
+    return jobs, errors
+
+
+async def run_job(job: Dict, semaphore: asyncio.Semaphore, save: bool) -> Dict:
+    """Run one workflow and return its result row"""
+    async with semaphore:
+        stats = {}
+        start = time.perf_counter()
+        try:
+            session_id = await workflow(
+                headline=job["headline"],
+                template=get_template_config(job["template_type"], job["page_name"]),
+                save=save,
+                stats=stats,
+            )
+        except Exception as e:
+            session_id = None
+            stats["error"] = str(e)
+        elapsed = time.perf_counter() - start
+
+    if stats.get("error"):
+        status = "failed"
+    elif stats.get("failed_slides"):
+        status = "incomplete"
+    else:
+        status = "ok"
+    return {
+        **job,
+        "session_id": session_id,
+        "status": status,
+        "seconds": round(elapsed, 2),
+        "stages": stats.get("stages", {}),
+        "slides": stats.get("slides", 0),
+        "failed_slides": stats.get("failed_slides", 0),
+        "error": stats.get("error"),
+    }
+
+
+def _percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+def summarize(results: List[Dict], elapsed: float) -> Dict:
+    """Counts, throughput and latency (mean/p50/p95/max) per stage and in total"""
+    latencies = {"total": [r["seconds"] for r in results]}
+    for result in results:
+        for stage, seconds in result["stages"].items():
+            latencies.setdefault(stage, []).append(seconds)
+
+    return {
+        "workflows": len(results),
+        "ok": sum(1 for r in results if r["status"] == "ok"),
+        "incomplete": sum(1 for r in results if r["status"] == "incomplete"),
+        "failed": sum(1 for r in results if r["status"] == "failed"),
+        "elapsed_seconds": round(elapsed, 2),
+        "workflows_per_hour": round(len(results) / elapsed * 3600, 2) if elapsed else 0,
+        "latency": {
+            stage: {
+                "mean": round(statistics.mean(values), 2),
+                "p50": _percentile(values, 0.5),
+                "p95": _percentile(values, 0.95),
+                "max": max(values),
+            }
+            for stage, values in latencies.items()
+            if values
+        },
+    }
+
+
+async def run_batch(
+    jobs: List[Dict],
+    concurrency: int = WORKFLOW_BATCH_CONCURRENCY,
+    save: bool = True,
+    on_result=None,
+) -> Dict:
+    """
+    Run workflows for all jobs, at most `concurrency` at a time.
+
+    on_result(result, done, total) is called as each workflow finishes.
+
+    Returns:
+        {"results": [...], "summary": {...}} with results in input order
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    start = time.perf_counter()
+    tasks = [asyncio.create_task(run_job(job, semaphore, save)) for job in jobs]
+
+    done = 0
+    for finished in asyncio.as_completed(tasks):
+        result = await finished
+        done += 1
+        if on_result:
+            on_result(result, done, len(tasks))
+
+    results = [task.result() for task in tasks]
+    return {"results": results, "summary": summarize(results, time.perf_counter() - start)}
+
+
+def print_progress(result: Dict, done: int, total: int) -> None:
+    stages = " ".join(f"{stage}={seconds}s" for stage, seconds in result["stages"].items())
+    print(
+        f"[{done}/{total}] {result['status']:<10} {result['session_id'] or '-':<8} "
+        f"{result['seconds']:>7}s  {result['page_name']}/{result['template_type']}  "
+        f"{result['headline'][:60]}  {stages}",
+        flush=True,
+    )
+    if result["error"]:
+        print(f"    error: {result['error']}", flush=True)
+
+
+def print_summary(summary: Dict) -> None:
+    print(
+        f"\n{summary['workflows']} workflows in {summary['elapsed_seconds']}s "
+        f"({summary['workflows_per_hour']}/hour): {summary['ok']} ok, "
+        f"{summary['incomplete']} incomplete, {summary['failed']} failed"
+    )
+    print(f"{'stage':<12} {'mean':>8} {'p50':>8} {'p95':>8} {'max':>8}")
+    for stage, latency in summary["latency"].items():
+        print(
+            f"{stage:<12} {latency['mean']:>8} {latency['p50']:>8} "
+            f"{latency['p95']:>8} {latency['max']:>8}"
+        )
+
+
+def read_lines(source: Optional[str]) -> List[str]:
+    """Read input lines from a file or stdin ("-" or None)"""
+    if source in (None, "-"):
+        return sys.stdin.read().splitlines()
+    return Path(source).read_text().splitlines()
+
+
+if __name__ == "__main__":
+    # python -m src.workflows.content_batch headlines.txt --page scoopwhoop --template writeup
+    parser = argparse.ArgumentParser(description="Run content workflows for a list of headlines")
+    parser.add_argument("headlines", nargs="?", default="-", help="File with one headline (or JSON job) per line (default: stdin)")
+    parser.add_argument("--page", default="scoopwhoop", help="Default page_name")
+    parser.add_argument("--template", default="writeup", help="Default template_type")
+    parser.add_argument("--concurrency", type=int, default=WORKFLOW_BATCH_CONCURRENCY)
+    parser.add_argument("--no-save", action="store_true", help="Don't save results to MongoDB")
+    parser.add_argument("--report", help="Write results and summary as JSON to this path")
+    parser.add_argument("--strict", action="store_true", help="Exit without running anything if a line is invalid")
+    args = parser.parse_args()
+
+    jobs, errors = parse_jobs(read_lines(args.headlines), args.page, args.template)
+    for error in errors:
+        print(f"Skipping {error}", file=sys.stderr, flush=True)
+    if errors and args.strict:
+        sys.exit(f"{len(errors)} invalid lines, nothing was run")
+    print(f"Running {len(jobs)} workflows, {args.concurrency} at a time", flush=True)
+    report = asyncio.run(
+        run_batch(jobs, args.concurrency, save=not args.no_save, on_result=print_progress)
+    )
+    print_summary(report["summary"])
+
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(
+                {"created_at": datetime.now().isoformat(timespec="seconds"), "invalid_lines": errors, **report},
+                f,
+                indent=4,
+            )
+    sys.exit(1 if report["summary"]["failed"] or errors else 0)
@@ -1,34 +1,81 @@
 import logging
-from typing import List, Dict
+import os
+from typing import Callable, List, Dict, Optional
 import uuid
+import time
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
-
-from src.agents import story_board_generator, content_research_agent
-from src.workflows.editors import text_editor
+import contextlib
+
+from src.agents import (
+    story_board_generator,
+    story_board_stream_generator,
+    content_research_agent,
+)
+from src.workflows.editors import text_editor, render_executor
 from src.services.mongo_client import get_mongo_client
-from src.workflows.image_gen import fetch_multiple_images, generate_single_image
+from src.services.async_mongo import get_async_repository
+from src.templates import get_template_config
+from src.workflows.checkpoints import WorkflowCheckpoint
+from src.workflows.image_gen import fetch_multiple_images, generate_raced_image
+from src.single_flight import workflow_scope
 
 logger = logging.getLogger(__name__)
 
-
-async def story_board_creator(headline: str, text_template: str,image_bytes: bytes) -> Dict:
-    """Generate story board from headline and template"""
+# Image generation race: comma separated models in preference order, the delay
+# before hedging onto the next model, the overall deadline and the race mode
+IMAGE_RACE_MODELS = [
+    model.strip()
+    for model in os.getenv("IMAGE_RACE_MODELS", "gpt-image-1").split(",")
+    if model.strip()
+]
+IMAGE_RACE_HEDGE_DELAY = float(os.getenv("IMAGE_RACE_HEDGE_DELAY", "0"))
+IMAGE_RACE_DEADLINE = float(os.getenv("IMAGE_RACE_DEADLINE", "150"))
+IMAGE_RACE_MODE = os.getenv("IMAGE_RACE_MODE", "first")
+
+# How many slides of one workflow may run at once (0 = all of them) and how
+# long slide generation may take once the story board is done
+SLIDE_CONCURRENCY = int(os.getenv("SLIDE_CONCURRENCY", "0"))
+SLIDE_TIMEOUT = int(os.getenv("SLIDE_TIMEOUT", "300"))
+
+
+async def story_board_creator(
+    headline: str,
+    text_template: str,
+    image_bytes: bytes,
+    on_slide: Optional[Callable[[int, dict], None]] = None,
+    research_result: Optional[str] = None,
+) -> Dict:
+    """Generate story board from headline and template
+
+    If on_slide is given the story board is streamed and on_slide is called
+    with the index and content of every slide as soon as it has been generated. The headline is
+    researched first unless research_result is given.
+    """
     try:
         # Research the headline
-        research_result = await content_research_agent(
-            headline=headline, 
-            template=text_template['template_description']
-        )
+        if research_result is None:
+            research_result = await content_research_agent(
+                headline=headline, 
+                template=text_template['template_description']
+            )
 
         # Generate story board with research context
         template_context = f"{text_template['template_description']}\n{text_template['json_description']}"
-        story_board = await story_board_generator(
-            headline=headline,
-            research_result=research_result, 
-            template=template_context,
-            image_bytes=image_bytes
-        )
+        if on_slide is None:
+            story_board = await story_board_generator(
+                headline=headline,
+                research_result=research_result, 
+                template=template_context,
+                image_bytes=image_bytes
+            )
+        else:
+            story_board = await story_board_stream_generator(
+                headline=headline,
+                research_result=research_result,
+                template=template_context,
+                image_bytes=image_bytes,
+                on_slide=on_slide,
+            )
 
         slide_count = len(story_board.get('storyboard', []))
         logger.info(f"Story board created with {slide_count} slides")
@@ -38,54 +85,78 @@ async def story_board_creator(headline: str, text_template: str,image_bytes: byt
         raise
 
 
-async def slide_creator(slide_template: dict, html_template: dict, page_name:str) -> List[Dict]:
-    """Create slides with images and handle errors gracefully"""
+async def collect_slide_images(slide_template: dict) -> List[Dict]:
+    """Fetch real images and generate images for a slide"""
+    session_id = str(uuid.uuid4())[:8]
+
+    # Generate images from different sources
+    image_tasks = [
+        fetch_multiple_images(
+            headline=slide_template["image_description"],
+            reference_image=None,
+            session_id=session_id,
+        ),
+        generate_raced_image(
+            headline=slide_template["image_description"],
+            session_id=session_id,
+            models=IMAGE_RACE_MODELS,
+            hedge_delay=IMAGE_RACE_HEDGE_DELAY,
+            deadline=IMAGE_RACE_DEADLINE,
+            mode=IMAGE_RACE_MODE,
+        ),
+    ]
+
+    results = await asyncio.gather(*image_tasks, return_exceptions=True)
+
+    # Process results and handle individual failures
+    all_images = []
+
+    # Collect all successful images
+    # Real images from fetch_multiple_images
+    if not isinstance(results[0], Exception) and results[0]:
+        for img in results[0]:
+            img["type"] = "real"
+            all_images.append(img)
+
+    # Generated images from AI models
+    for result in results[1:]:
+        if isinstance(result, Exception) or not result:
+            continue
+        
+        # Handle both single images and lists
+        images_to_add = result if isinstance(result, list) else [result]
+        for img in images_to_add:
+            img["type"] = "generated"
+            all_images.append(img)
+
+    return all_images
+
+
+async def slide_creator(
+    slide_template: dict,
+    html_template: dict,
+    page_name: str,
+    checkpoint: Optional[WorkflowCheckpoint] = None,
+    slide_index: int = 0,
+) -> List[Dict]:
+    """Create slides with images and handle errors gracefully
+
+    With a checkpoint, image candidates are saved once collected and reused
+    instead of fetched again when the session is resumed.
+    """
     try:
-        session_id = str(uuid.uuid4())[:8]
         name = slide_template["name"]
         text = slide_template["text"]
 
-        # Generate images from different sources
-        image_tasks = [
-            fetch_multiple_images(
-                headline=slide_template["image_description"],
-                reference_image=None,
-                session_id=session_id,
-            ),
-            generate_single_image(
-                headline=slide_template["image_description"],
-                session_id=session_id,
-                model="gpt-image-1",
-            ),
-            # generate_single_image(
-            #     headline=slide_template['image_description'],
-            #     session_id=session_id,
-            #     model="imagen-4.0-ultra-generate-preview-06-06"
-            # ),
-        ]
-
-        results = await asyncio.gather(*image_tasks, return_exceptions=True)
-
-        # Process results and handle individual failures
-        all_images = []
-
-        # Collect all successful images
-        # Real images from fetch_multiple_images
-        if not isinstance(results[0], Exception) and results[0]:
-            for img in results[0]:
-                img["type"] = "real"
-                all_images.append(img)
-
-        # Generated images from AI models
-        for result in results[1:]:
-            if isinstance(result, Exception) or not result:
-                continue
-            
-            # Handle both single images and lists
-            images_to_add = result if isinstance(result, list) else [result]
-            for img in images_to_add:
-                img["type"] = "generated"
-                all_images.append(img)
+        all_images = None
+        if checkpoint is not None:
+            all_images = await checkpoint.slide_candidates(slide_index)
+            if all_images is not None:
+                logger.info(f"Reusing {len(all_images)} checkpointed images for slide {slide_index}")
+        if all_images is None:
+            all_images = await collect_slide_images(slide_template)
+            if checkpoint is not None:
+                await checkpoint.save_slide_candidates(slide_index, all_images)
 
         # If no images were generated, return empty list
         if not all_images:
@@ -104,9 +175,9 @@ async def slide_creator(slide_template: dict, html_template: dict, page_name:str
                 
                 with open(file_path, "wb") as f:
                     f.write(img_data["image_bytes"])
-                loop = asyncio.get_event_loop()
+                loop = asyncio.get_running_loop()
                 with_text_bytes = await loop.run_in_executor(
-                    None,
+                    render_executor,
                     text_editor,
                     html_template[name],
                     page_name,
@@ -147,9 +218,9 @@ async def text_only_slide_creator(slide_template: dict, html_template: dict, pag
     name = slide_template["name"]
     text = slide_template["text"]
 
-    loop = asyncio.get_event_loop()
+    loop = asyncio.get_running_loop()
     with_text_bytes = await loop.run_in_executor(
-                    None,
+                    render_executor,
                     text_editor,
                     html_template[name],
                     page_name,
@@ -172,11 +243,11 @@ async def text_only_slide_creator(slide_template: dict, html_template: dict, pag
 
 
 async def save_to_mongo(session_id: str, headline: str, template_type: str, 
-                      story_board: dict, slide_images: list, page_name: str = "scoopwhoop", error: str = None) -> str:
-    """Save workflow results to MongoDB"""
+                      story_board: dict, slide_images: list, page_name: str = "scoopwhoop", error: str = None,
+                      replace: bool = False) -> str:
+    """Save workflow results to MongoDB (replace=True for a resumed session)"""
     try:
-        mongo_client = get_mongo_client()
-        document_id = mongo_client.store_content_workflow(
+        document_id = await get_async_repository().store_content_workflow(
             session_id=session_id,
             headline=headline,
             template_type=template_type,
@@ -184,8 +255,8 @@ async def save_to_mongo(session_id: str, headline: str, template_type: str,
             slide_images=slide_images,
             page_name=page_name,
             error=error,
+            replace=replace,
         )
-        mongo_client.close()
         logger.info(f"Saved to MongoDB: {document_id}")
         return document_id
     except Exception as e:
@@ -193,45 +264,151 @@ async def save_to_mongo(session_id: str, headline: str, template_type: str,
         raise
 
 
-async def workflow(headline: str, template: dict,image_bytes: bytes = None, save: bool = True) -> str:
-    """Main workflow function that creates content and optionally saves to MongoDB"""
-    session_id = str(uuid.uuid4())[:8]
+async def workflow(
+    headline: str,
+    template: dict,
+    image_bytes: bytes = None,
+    save: bool = True,
+    stream: bool = False,
+    max_parallel_slides: Optional[int] = None,
+    session_id: Optional[str] = None,
+    stats: Optional[Dict] = None,
+) -> str:
+    """Main workflow function that creates content and optionally saves to MongoDB
+
+    All slides run as tasks on the current event loop. max_parallel_slides
+    limits how many run at once (defaults to SLIDE_CONCURRENCY, 0 = no limit).
+    With stream=True the story board is streamed and each slide's image
+    pipeline starts as soon as that slide has been generated.
+
+    With save=True every completed stage is checkpointed, and passing the
+    session_id of an interrupted run continues from its checkpoint (see
+    resume_workflow).
+
+    If a stats dict is passed it is filled with the seconds spent per stage
+    ("stages"), the slide counts and the error, if any.
+    """
+    # Full uuids, saving never overwrites another session's result
+    session_id = session_id or uuid.uuid4().hex
+    stats = stats if stats is not None else {}
+    stats.update({"stages": {}, "slides": 0, "failed_slides": 0, "error": None})
+    stage_started = time.perf_counter()
+
+    def end_stage(name: str):
+        """Record the time since the previous stage ended"""
+        nonlocal stage_started
+        now = time.perf_counter()
+        stats["stages"][name] = round(now - stage_started, 2)
+        stage_started = now
+
+    if max_parallel_slides is None:
+        max_parallel_slides = SLIDE_CONCURRENCY
+    slide_limiter = (
+        asyncio.Semaphore(max_parallel_slides)
+        if max_parallel_slides > 0
+        else contextlib.nullcontext()
+    )
+    slide_outputs = {}
+
+    checkpoint = None
+    resumed = False
+    if save:
+        checkpoint = await WorkflowCheckpoint.open(session_id)
+        resumed = checkpoint.exists
+        if not checkpoint.exists:
+            await checkpoint.start(
+                headline, template["template_type"], template["page_name"], image_bytes
+            )
 
-    try:
-        # Generate story board
-        story_board = await story_board_creator(
-            headline=headline, text_template=template["text_template"],image_bytes=image_bytes
-        )
-        # Generate all slides in parallel using threads
-        slides = story_board.get("storyboard", [])
-        if not slides:
-            slide_results = []
-        else:
-            def create_slide(slide):
-                """Run slide creator in thread"""
+    async def create_slide(index: int, slide: dict):
+        """Create a single slide, recording failures as an empty result"""
+        try:
+            if checkpoint is not None:
+                renders = await checkpoint.slide_renders(index)
+                if renders is not None:
+                    logger.info(f"Reusing checkpointed renders for slide {index}")
+                    slide_outputs[index] = renders
+                    return
+
+            async with slide_limiter:
                 if slide.get("image_description", None) is None:
-                    return asyncio.run(text_only_slide_creator(slide, template["slides"], template["page_name"]))
+                    slide_outputs[index] = await text_only_slide_creator(slide, template["slides"], template["page_name"])
                 else:
-                    return asyncio.run(slide_creator(slide, template["slides"], template["page_name"]))
-
-            # Run each slide in its own thread
-            loop = asyncio.get_event_loop()
-            with ThreadPoolExecutor(max_workers=3) as executor:
-                tasks = [loop.run_in_executor(executor, create_slide, slide) for slide in slides]
-                try:
-                    results = await asyncio.wait_for(asyncio.gather(*tasks, return_exceptions=True), timeout=300) # 5 min timeout
-                except asyncio.TimeoutError:
-                    logger.error("Slide generation timed out after 5 minutes")
-                    results = [TimeoutError(f"Slide {i} timed out") for i in range(len(slides))]
-                
-                # Handle failures
-                slide_results = []
-                for i, result in enumerate(results):
-                    if isinstance(result, Exception):
-                        logger.error(f"Slide {i} failed: {result}")
-                        slide_results.append([])
-                    else:
-                        slide_results.append(result)
+                    slide_outputs[index] = await slide_creator(
+                        slide, template["slides"], template["page_name"], checkpoint, index
+                    )
+
+            if checkpoint is not None and slide_outputs[index]:
+                await checkpoint.save_slide_renders(index, slide_outputs[index])
+        except Exception as e:
+            logger.error(f"Slide {index} failed: {e}")
+
+    try:
+        # Research the headline
+        research_result = checkpoint.research if checkpoint else None
+        if research_result is None:
+            research_result = await content_research_agent(
+                headline=headline,
+                template=template["text_template"]["template_description"],
+            )
+            if checkpoint is not None:
+                await checkpoint.save_research(research_result)
+        end_stage("research")
+
+        # Identical queries, downloads and scoring are shared between slides
+        with workflow_scope():
+            async with asyncio.TaskGroup() as task_group:
+                # Slide index -> (slide, task)
+                dispatched = {}
+
+                def dispatch_slide(index, slide):
+                    """Start generating a slide as soon as it is known"""
+                    dispatched[index] = (slide, task_group.create_task(create_slide(index, slide)))
+
+                # Generate story board
+                story_board = checkpoint.story_board if checkpoint else None
+                if story_board is None:
+                    story_board = await story_board_creator(
+                        headline=headline,
+                        text_template=template["text_template"],
+                        image_bytes=image_bytes,
+                        on_slide=dispatch_slide if stream else None,
+                        research_result=research_result,
+                    )
+                    if checkpoint is not None:
+                        await checkpoint.save_story_board(story_board)
+                end_stage("story_board")
+                # Generate remaining slides concurrently. A streamed slide is
+                # only kept if the final story board has the same slide at
+                # its index (the stream can skip slides it couldn't parse)
+                slides = story_board.get("storyboard", [])
+                for index in list(dispatched):
+                    streamed_slide, task = dispatched[index]
+                    if index < len(slides) and slides[index] == streamed_slide:
+                        continue
+                    logger.warning(f"Streamed slide {index} differs from the story board, regenerating")
+                    task.cancel()
+                    await asyncio.gather(task, return_exceptions=True)
+                    del dispatched[index]
+                    slide_outputs.pop(index, None)
+                    if checkpoint is not None:
+                        await checkpoint.reset_slide(index)
+                for index, slide in enumerate(slides):
+                    if index not in dispatched:
+                        dispatch_slide(index, slide)
+
+                tasks = [task for _, task in dispatched.values()]
+                if tasks:
+                    _, pending = await asyncio.wait(tasks, timeout=SLIDE_TIMEOUT)
+                    if pending:
+                        logger.error(f"{len(pending)} slides timed out after {SLIDE_TIMEOUT}s")
+                        for task in pending:
+                            task.cancel()
+
+        slide_results = [slide_outputs.get(i, []) for i in range(len(slides))]
+        stats["slides"] = len(slide_results)
+        stats["failed_slides"] = sum(1 for result in slide_results if not result)
+        end_stage("slides")
 
         # Save to MongoDB if requested
         if save:
@@ -243,25 +420,36 @@ async def workflow(headline: str, template: dict,image_bytes: bytes = None, save
                 slide_images=slide_results,
                 page_name=template["page_name"],
                 error=None,
+                replace=resumed,
             )
+            # Keep the checkpoint while slides are missing so they can be resumed
+            if all(slide_results):
+                await checkpoint.complete()
+            else:
+                await checkpoint.mark("incomplete")
+            end_stage("save")
 
         logger.info(f"Workflow completed successfully. Session: {session_id}")
         return session_id
 
     except Exception as e:
+        # Errors raised inside the task group arrive wrapped in an ExceptionGroup
+        if isinstance(e, ExceptionGroup) and len(e.exceptions) == 1:
+            e = e.exceptions[0]
         logger.error(f"Workflow failed: {e}")
+        stats["error"] = str(e)
 
         # Save error state to MongoDB if requested
         if save:
+            await checkpoint.mark("failed", str(e))
             try:
-                document_id = await save_to_mongo(
+                # Keeps the partial result of an earlier run of this session
+                await get_async_repository().mark_workflow_failed(
                     session_id=session_id,
+                    error=str(e),
                     headline=headline,
                     template_type=template.get("template_type", "unknown"),
-                    story_board={"storyboard": []},
-                    slide_images=[],
                     page_name=template.get("page_name", "scoopwhoop"),
-                    error=str(e),
                 )
             except Exception as mongo_error:
                 logger.error(f"Failed to save error state to MongoDB: {mongo_error}")
@@ -269,9 +457,40 @@ async def workflow(headline: str, template: dict,image_bytes: bytes = None, save
         return session_id
 
 
+async def resume_workflow(
+    session_id: str,
+    template: Optional[dict] = None,
+    stream: bool = False,
+    max_parallel_slides: Optional[int] = None,
+) -> str:
+    """Resume an interrupted workflow from its last completed stage
+
+    Completed research, story board, image candidates and slide renders are
+    reused; only the missing stages run. The saved result of the session is
+    replaced by the resumed one.
+    """
+    checkpoint = await WorkflowCheckpoint.open(session_id)
+    if not checkpoint.exists:
+        raise ValueError(f"No checkpoint found for session {session_id}")
+
+    state = checkpoint.state
+    if template is None:
+        template = get_template_config(state["template_type"], state["page_name"])
+    logger.info(f"Resuming workflow {session_id} ({state.get('status', 'unknown')})")
+
+    return await workflow(
+        headline=state["headline"],
+        template=template,
+        image_bytes=await checkpoint.load_reference_image(),
+        save=True,
+        stream=stream,
+        max_parallel_slides=max_parallel_slides,
+        session_id=session_id,
+    )
+
+
 if __name__ == "__main__":
     import asyncio
-    import base64
     # from src.templates.timeline import timeline_template
     # from src.templates.twitter.tweet_image import tweet_image_template
     from src.templates.the_sarcastic_indian.writeup import writeup_template
@@ -287,11 +506,10 @@ if __name__ == "__main__":
         result = mongo_client.get_workflow_result(session_id)
         for slide in result["slides"]:
             for img in slide["images"]:
-                b64_img = base64.b64decode(img["images"]["with_text"]["image_base64"])
+                image_bytes = mongo_client.load_image(img["images"]["with_text"])
                 with open(
                     f"./data_/slide_1/test_{slide['slide_index']}.png", "wb"
                 ) as f:
-                    f.write(b64_img)
-        mongo_client.close()
+                    f.write(image_bytes)
     except Exception as e:
         print(f"Workflow failed: {e}")
@@ -1,5 +1,7 @@
 import logging
+import os
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 
 from src.utils import (
     capture_html_screenshot,
@@ -11,6 +13,13 @@ from src.workflows.editor_utils import create_overlay_image, create_image_over_v
 
 logger = logging.getLogger(__name__)
 
+# Dedicated pool for rendering (headless Chrome screenshots, moviepy, PIL) so
+# rendering never competes with the default executor used for I/O helpers
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", "4"))
+render_executor = ThreadPoolExecutor(
+    max_workers=RENDER_WORKERS, thread_name_prefix="render"
+)
+
 
 def image_editor(text: dict,page_name:str, assets: dict, image_edits: dict, html_template: str, session_id: str) -> bytes:
     try:
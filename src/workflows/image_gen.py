@@ -1,10 +1,11 @@
 import logging
-from typing import List, Dict
+from typing import List, Dict, Optional
 import json
 
 from src.agents import (
     image_desc_generator,
     image_generator,
+    race_image_generator,
     image_query_creator,
     image_search_agent,
 )
@@ -56,6 +57,48 @@ async def generate_single_image(
         }
 
 
+async def generate_raced_image(
+    headline: str,
+    session_id: str,
+    models: Optional[List[str]] = None,
+    hedge_delay: float = 0,
+    deadline: float = 150,
+    mode: str = "first",
+) -> Dict[str, str]:
+    """Generate one image by racing the description across several providers
+
+    Returns:
+        Same structure as generate_single_image, with 'model' set to the
+        provider whose image was kept
+    """
+    try:
+        image_descriptions = await image_desc_generator(query=headline)
+        model, image_bytes = await race_image_generator(
+            query=image_descriptions[0],
+            models=models,
+            hedge_delay=hedge_delay,
+            deadline=deadline,
+            mode=mode,
+        )
+
+        return {
+            "type": "generated",
+            "model": model,
+            "description": image_descriptions[0],
+            "image_bytes": image_bytes,
+        }
+
+    except Exception as e:
+        logger.error(f"Error processing raced image {models} {session_id}: {e}")
+        return {
+            "type": "generated",
+            "model": ",".join(models or []),
+            "description": None,
+            "image_bytes": None,
+            "error": str(e),
+        }
+
+
 async def fetch_multiple_images(
     headline: str, session_id: str, reference_image: bytes = None
 ) -> List[Dict[str, str]]:
@@ -1,29 +1,69 @@
+import asyncio
 import logging
+import random
 from typing import List, Dict, Optional
-import time
 import threading
 import time
 from datetime import datetime
 import os
 from dotenv import load_dotenv
 
+from src.clients import close_loop_resources
 from src.services.mongo_client import get_mongo_client
-from src.services.rapidapi import get_latest_instagram_post
+from src.services.async_mongo import get_async_repository
+from src.services.rapidapi import (
+    fetch_post_media,
+    get_latest_instagram_post,
+    get_latest_tweets,
+    rapid_api_client,
+)
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 load_dotenv(override=True)
 
+# Fetch function per platform, media is downloaded separately:
+# fn(account_id, last_created_at, n_posts, cursor) -> (posts, next_cursor)
+FETCHERS = {
+    "instagram": lambda account_id, last_created_at, n_posts, cursor: get_latest_instagram_post(
+        page_id=account_id, last_created_at=last_created_at, n_posts=n_posts,
+        cursor=cursor, return_cursor=True, fetch_media=False
+    ),
+    "twitter": lambda account_id, last_created_at, n_posts, cursor: get_latest_tweets(
+        user_id=account_id, last_created_at=last_created_at, n_posts=n_posts,
+        cursor=cursor, return_cursor=True, fetch_media=False
+    ),
+}
+
+# How far back the first fetch of a new account goes
+SOURCES_BACKFILL_DAYS = int(os.getenv("SOURCES_BACKFILL_DAYS", "30"))
+
+# Max number of accounts fetched at the same time
+SOURCES_MAX_CONCURRENT = int(os.getenv("SOURCES_MAX_CONCURRENT", "4"))
 
 
-def fetch_and_update_sources(page_id: str, max_posts: int = 10) -> Dict[str, any]:
+async def update_sources(
+    page_id: str, max_posts: int = 10, platform: str = "instagram"
+) -> Dict[str, any]:
     """
-    Fetch latest Instagram posts and update sources collection.
+    Fetch the posts an account published since its watermark and add them
+    to the sources collection.
+
+    Every account has a watermark in the source_watermarks collection:
+    last_taken_at is the newest post up to which everything was ingested.
+    When a fetch stops at max_posts before reaching it, the pagination
+    cursor is kept and the next update continues from there instead of
+    re-reading the newest pages; last_taken_at only moves once the gap is
+    closed, so no posts are skipped.
+
+    Database calls go through the async repository and the platform fetch
+    runs in a worker thread, so the event loop is never blocked.
     
     Args:
-        page_name: Instagram username to fetch posts from
+        page_id: Instagram user ID / Twitter user ID to fetch posts from
         max_posts: Maximum number of new posts to fetch
+        platform: Key of FETCHERS
         
     Returns:
         Dictionary with operation results
@@ -34,35 +74,52 @@ def fetch_and_update_sources(page_id: str, max_posts: int = 10) -> Dict[str, any
         "latest_timestamp": None,
         "new_posts_fetched": 0,
         "new_posts_added": 0,
+        "existing_posts": 0,
+        "has_more": False,
+        "media_downloaded": 0,
         "error": None
     }
     
-    mongo_client = None
-    
     try:
-        mongo_client = get_mongo_client()
+        fetcher = FETCHERS[platform]
+        repository = get_async_repository()
         
-        # Step 1: Get latest timestamp
-        latest_timestamp = mongo_client.get_latest_source_timestamp()
+        # Step 1: Get the account's watermark
+        watermark = await repository.get_source_watermark(platform, page_id) or {}
+        latest_timestamp = watermark.get("last_taken_at")
+        cursor = watermark.get("cursor")
         result["latest_timestamp"] = latest_timestamp
         
         if latest_timestamp:
-            logger.info(f"Latest timestamp in collection: {latest_timestamp}")
+            logger.info(f"Watermark of {platform}:{page_id}: {latest_timestamp}")
         else:
-            logger.info("No existing posts found, will fetch latest posts")
-            # If no posts exist, use timestamp from 30 days ago
-            latest_timestamp = int(time.time()) - (30 * 24 * 60 * 60)
+            # Seed the watermark from posts stored before it existed
+            latest_timestamp = await repository.get_latest_source_timestamp(platform, page_id)
+            if not latest_timestamp and page_id == os.getenv("INSTA_USER_ID"):
+                # Posts of the legacy account were stored before account_id tagging
+                latest_timestamp = await repository.get_latest_source_timestamp(platform, untagged=True)
+            if latest_timestamp:
+                logger.info(f"No watermark for {platform}:{page_id}, starting from newest stored post {latest_timestamp}")
+            else:
+                logger.info(f"No watermark for {platform}:{page_id}, backfilling {SOURCES_BACKFILL_DAYS} days")
+                latest_timestamp = int(time.time()) - (SOURCES_BACKFILL_DAYS * 24 * 60 * 60)
         
-        # Step 3: Fetch new Instagram posts after latest timestamp
-        logger.info(f"Fetching new Instagram posts for {page_id} after timestamp {latest_timestamp}")
-        new_posts = get_latest_instagram_post(
-            page_id=page_id,
-            last_created_at=latest_timestamp,
-            n_posts=max_posts
+        # Step 2: Fetch new posts after the watermark (continuing a pending gap)
+        logger.info(
+            f"Fetching new {platform} posts for {page_id} after timestamp {latest_timestamp}"
+            + (" from saved cursor" if cursor else "")
+        )
+        new_posts, next_cursor = await asyncio.to_thread(
+            fetcher, page_id, latest_timestamp, max_posts, cursor
         )
         
+        for post in new_posts:
+            # Lets a missing watermark be seeded from the account's stored posts
+            post["account_id"] = page_id
         result["new_posts_fetched"] = len(new_posts)
-        logger.info(f"Fetched {len(new_posts)} new posts from Instagram")
+        result["has_more"] = bool(next_cursor)
+        result["media_downloaded"] = await download_new_media(new_posts)
+        logger.info(f"Fetched {len(new_posts)} new posts from {platform}")
         
         if new_posts:
             # Log some details about the posts
@@ -70,29 +127,102 @@ def fetch_and_update_sources(page_id: str, max_posts: int = 10) -> Dict[str, any
             logger.info(f"  Newest post: {new_posts[0]['taken_at']}")
             logger.info(f"  Oldest post: {new_posts[-1]['taken_at']}")
             
-            # Step 4: Add new posts to sources collection
-            inserted_ids = mongo_client.add_sources(new_posts)
-            result["new_posts_added"] = len(inserted_ids)
-            
+            # Step 3: Add new posts to sources collection
+            add_result = await repository.add_sources(new_posts)
+            result["new_posts_added"] = add_result["inserted"]
+            result["existing_posts"] = add_result["existing"]
+            if add_result["failed"]:
+                # Keep the watermark so the failed posts are fetched again
+                raise RuntimeError(f"{add_result['failed']} posts could not be stored")
         else:
             logger.info("No new posts found")
         
+        # Step 4: Move the watermark
+        newest = max(
+            [post["taken_at"] for post in new_posts] + [watermark.get("pending_taken_at") or 0]
+        )
+        if next_cursor:
+            fields = {
+                # Persist the backfill start so it doesn't drift between runs
+                "last_taken_at": latest_timestamp,
+                "cursor": next_cursor,
+                "pending_taken_at": newest or None,
+            }
+        else:
+            fields = {
+                "last_taken_at": max(newest, latest_timestamp),
+                "cursor": None,
+                "pending_taken_at": None,
+            }
+        await repository.save_source_watermark(platform, page_id, fields)
+        
         result["success"] = True
         logger.info("Sources update completed successfully")
         
     except Exception as e:
-        error_msg = f"Error in fetch_and_update_sources: {e}"
+        error_msg = f"Error updating {platform} sources for {page_id}: {e}"
         logger.error(error_msg)
         result["error"] = error_msg
-        
-    finally:
-        if mongo_client:
-            mongo_client.close()
-            logger.info("MongoDB connection closed")
     
     return result
 
 
+async def download_new_media(posts: List[Dict]) -> int:
+    """
+    Download the media of posts, skipping posts and media that are already stored.
+
+    Posts whose code is already in the sources collection are left without
+    media (add_sources doesn't touch them). For the others, the item
+    fetch_post_media would store (the first image; videos are stored as their
+    thumbnail) is looked up by the same URL key store_source_media saves, and
+    a known item becomes a reference to the stored media. Returns the number
+    of posts whose media was downloaded.
+    """
+    repository = get_async_repository()
+    posts = [post for post in posts if post.get("media_list")]
+    existing_codes = await repository.find_existing_source_codes(
+        [post["code"] for post in posts if post.get("code")]
+    )
+    posts = [post for post in posts if post.get("code") not in existing_codes]
+    stored_media = {
+        id(post): next(
+            (media for media in post["media_list"] if media.get("type") in ("image", "thumbnail")),
+            None,
+        )
+        for post in posts
+    }
+    urls = [media["url"] for media in stored_media.values() if media]
+    known = await repository.find_source_media(urls) if urls else {}
+
+    to_download = []
+    for post in posts:
+        media = stored_media[id(post)]
+        doc = known.get(media["url"]) if media else None
+        if doc:
+            post["media_bytes"] = {
+                "type": media.get("type", ""),
+                "url": media["url"],
+                "media_id": doc["_id"],
+                "asset": doc.get("asset"),
+            }
+        else:
+            to_download.append(post)
+
+    skipped = len(posts) - len(to_download)
+    if existing_codes or skipped:
+        logger.info(f"Skipped media of {len(existing_codes)} stored posts and {skipped} known media")
+    if to_download:
+        await asyncio.to_thread(fetch_post_media, to_download)
+    return len(to_download)
+
+
+def fetch_and_update_sources(
+    page_id: str, max_posts: int = 10, platform: str = "instagram"
+) -> Dict[str, any]:
+    """Synchronous entry point for update_sources"""
+    return asyncio.run(update_sources(page_id=page_id, max_posts=max_posts, platform=platform))
+
+
 def get_sources_summary(limit: int = 5) -> Dict[str, any]:
     """
     Get a summary of the sources collection.
@@ -107,8 +237,6 @@ def get_sources_summary(limit: int = 5) -> Dict[str, any]:
         "error": None
     }
     
-    mongo_client = None
-    
     try:
         mongo_client = get_mongo_client()
         
@@ -127,60 +255,256 @@ def get_sources_summary(limit: int = 5) -> Dict[str, any]:
         error_msg = f"Error getting sources summary: {e}"
         logger.error(error_msg)
         summary["error"] = error_msg
-        
-    finally:
-        if mongo_client:
-            mongo_client.close()
     
     return summary
 
 
+class SourceAccount:
+    """
+    An account polled by the sources daemon.
+
+    Each account has its own fetch interval, adapted to how often the account
+    posts: the interval aims at TARGET_POSTS_PER_FETCH new posts per fetch,
+    stays within [min_interval, max_interval] and gets +/- JITTER so accounts
+    don't all hit the API at the same moment.
+    """
+
+    TARGET_POSTS_PER_FETCH = 3
+    JITTER = 0.1
+    # Weight of the latest fetch in the posting rate estimate
+    RATE_SMOOTHING = 0.3
+
+    def __init__(
+        self,
+        platform: str,
+        account_id: str,
+        interval_minutes: float = 120,
+        min_interval_minutes: Optional[float] = None,
+        max_interval_minutes: Optional[float] = None,
+        max_posts: int = 10,
+    ):
+        if platform not in FETCHERS:
+            raise ValueError(f"Unsupported source platform: {platform}")
+        self.platform = platform
+        self.account_id = account_id
+        self.max_posts = max_posts
+        self.interval_seconds = interval_minutes * 60
+        self.min_interval_seconds = (min_interval_minutes or interval_minutes / 4) * 60
+        self.max_interval_seconds = (max_interval_minutes or interval_minutes * 4) * 60
+
+        # Due right away
+        self.next_run_at = time.time()
+        self.last_run_at: Optional[float] = None
+        self.is_fetching = False
+        self.posts_per_hour: Optional[float] = None
+
+        # Stats
+        self.last_update_time: Optional[datetime] = None
+        self.last_duration: Optional[float] = None
+        self.total_updates = 0
+        self.total_posts_added = 0
+        self.last_error: Optional[str] = None
+
+    @property
+    def key(self) -> str:
+        return f"{self.platform}:{self.account_id}"
+
+    def is_due(self, now: float) -> bool:
+        return not self.is_fetching and now >= self.next_run_at
+
+    def _clamp(self, seconds: float) -> float:
+        return min(max(seconds, self.min_interval_seconds), self.max_interval_seconds)
+
+    def record_result(self, result: Dict, duration: float, now: Optional[float] = None) -> None:
+        """Update stats and the posting rate, then schedule the next fetch"""
+        now = now or time.time()
+        self.last_duration = duration
+
+        if not result["success"]:
+            self.last_error = result.get("error", "Unknown error")
+            # Back off on errors, the API or the account may be unavailable
+            self.interval_seconds = self._clamp(self.interval_seconds * 2)
+        else:
+            self.total_updates += 1
+            self.total_posts_added += result["new_posts_added"]
+            self.last_update_time = datetime.now()
+            self.last_error = None
+            self._adapt_interval(result["new_posts_fetched"], result.get("has_more", False), now)
+
+        self.last_run_at = now
+        jitter = random.uniform(1 - self.JITTER, 1 + self.JITTER)
+        self.next_run_at = now + self.interval_seconds * jitter
+
+    def _adapt_interval(self, new_posts: int, has_more: bool, now: float) -> None:
+        elapsed_hours = ((now - self.last_run_at) if self.last_run_at else self.interval_seconds) / 3600
+        rate = new_posts / max(elapsed_hours, 1 / 60)
+        if self.posts_per_hour is None:
+            self.posts_per_hour = rate
+        else:
+            self.posts_per_hour = (
+                self.RATE_SMOOTHING * rate + (1 - self.RATE_SMOOTHING) * self.posts_per_hour
+            )
+
+        if has_more:
+            # The fetch was capped, catch up on the rest of the gap soon
+            interval = self.interval_seconds / 2
+        elif self.posts_per_hour > 0:
+            interval = self.TARGET_POSTS_PER_FETCH / self.posts_per_hour * 3600
+        else:
+            interval = self.interval_seconds * 1.5
+        self.interval_seconds = self._clamp(interval)
+
+    def get_status(self) -> dict:
+        return {
+            "platform": self.platform,
+            "account_id": self.account_id,
+            "is_fetching": self.is_fetching,
+            "interval_minutes": round(self.interval_seconds / 60, 1),
+            "posts_per_hour": round(self.posts_per_hour, 3) if self.posts_per_hour is not None else None,
+            "next_run_at": datetime.fromtimestamp(self.next_run_at),
+            "last_update_time": self.last_update_time,
+            "last_duration": self.last_duration,
+            "total_updates": self.total_updates,
+            "total_posts_added": self.total_posts_added,
+            "last_error": self.last_error,
+        }
+
+
+def parse_source_accounts(config: str, default_interval_minutes: float = 120) -> List[SourceAccount]:
+    """
+    Parse accounts from a comma separated "platform:account_id[:interval_minutes]" list,
+    e.g. "instagram:123456,twitter:44196397:60"
+    """
+    accounts = []
+    for entry in config.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        parts = entry.split(":")
+        try:
+            interval = float(parts[2]) if len(parts) > 2 else default_interval_minutes
+            accounts.append(SourceAccount(parts[0].strip().lower(), parts[1].strip(), interval))
+        except (IndexError, ValueError) as e:
+            logger.error(f"Invalid source account '{entry}': {e}")
+    return accounts
+
+
 class SourcesDaemon:
-    """Background daemon for updating Instagram sources periodically."""
+    """
+    Background daemon that keeps the sources collection up to date.
+
+    Polls every configured account (SOURCE_ACCOUNTS, defaulting to the
+    INSTA_USER_ID Instagram page) on its own adaptive schedule. Due accounts
+    are fetched concurrently on one event loop, at most max_concurrent at a time.
+    """
     
-    def __init__(self, update_interval_hours: int = 2, page_id: str = ""):
+    def __init__(
+        self,
+        update_interval_hours: int = 2,
+        page_id: str = "",
+        accounts: Optional[List[SourceAccount]] = None,
+        max_concurrent: int = SOURCES_MAX_CONCURRENT,
+    ):
         self.update_interval_hours = update_interval_hours
         self.page_id = page_id or os.getenv("INSTA_USER_ID")
-        self.update_interval_seconds = update_interval_hours * 3600
+        self.max_concurrent = max_concurrent
         self.is_running = False
         self.thread: Optional[threading.Thread] = None
         self.stop_event = threading.Event()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+        if accounts is None:
+            accounts = parse_source_accounts(
+                os.getenv("SOURCE_ACCOUNTS", ""), update_interval_hours * 60
+            )
+            if not accounts and self.page_id:
+                accounts = [SourceAccount("instagram", self.page_id, update_interval_hours * 60)]
+        self.accounts: Dict[str, SourceAccount] = {a.key: a for a in accounts}
         
         # Stats
         self.last_update_time: Optional[datetime] = None
         self.total_updates = 0
         self.total_posts_added = 0
         self.last_error: Optional[str] = None
+
+    def add_account(self, account: SourceAccount) -> None:
+        """Start tracking an account (takes effect on a running daemon too)"""
+        self.accounts[account.key] = account
+        self._wake()
+
+    def remove_account(self, platform: str, account_id: str) -> None:
+        self.accounts.pop(f"{platform}:{account_id}", None)
+
+    def _wake(self):
+        if self._loop and self._wakeup:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def _update_account(self, account: SourceAccount, semaphore: asyncio.Semaphore):
+        async with semaphore:
+            start = time.perf_counter()
+            result = await update_sources(
+                page_id=account.account_id, max_posts=account.max_posts, platform=account.platform
+            )
+            duration = time.perf_counter() - start
+
+        account.record_result(result, duration)
+        account.is_fetching = False
+        if result["success"]:
+            self.total_updates += 1
+            self.total_posts_added += result["new_posts_added"]
+            self.last_update_time = datetime.now()
+            self.last_error = None
+            logger.info(
+                f"Daemon update {account.key}: {result['new_posts_added']} new posts added, "
+                f"next in {account.interval_seconds / 60:.0f} min"
+            )
+        else:
+            self.last_error = f"{account.key}: {account.last_error}"
+            logger.error(f"Daemon update failed: {self.last_error}")
+
+    async def _scheduler(self):
+        """Start due accounts and sleep until the next one is due"""
+        self._wakeup = asyncio.Event()
+        semaphore = asyncio.Semaphore(self.max_concurrent)
+        tasks = set()
+
+        while not self.stop_event.is_set():
+            now = time.time()
+            for account in list(self.accounts.values()):
+                if account.is_due(now):
+                    account.is_fetching = True
+                    task = asyncio.create_task(self._update_account(account, semaphore))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+
+            idle = [a.next_run_at for a in self.accounts.values() if not a.is_fetching]
+            # Re-check at least every minute, accounts may be added meanwhile
+            timeout = min(max(min(idle, default=now + 60) - now, 1), 60)
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
     
     def _daemon_loop(self):
         """Main daemon loop that runs in background thread."""
         logger.info("Sources daemon started")
-        
-        while not self.stop_event.is_set():
-            try:
-                result = fetch_and_update_sources(
-                    page_id=self.page_id,
-                    max_posts=10
-                )
-                
-                if result["success"]:
-                    self.total_updates += 1
-                    self.total_posts_added += result["new_posts_added"]
-                    self.last_update_time = datetime.now()
-                    self.last_error = None
-                    logger.info(f"Daemon update: {result['new_posts_added']} new posts added")
-                else:
-                    self.last_error = result.get("error", "Unknown error")
-                    logger.error(f"Daemon update failed: {self.last_error}")
-                    
-            except Exception as e:
-                self.last_error = f"Daemon error: {e}"
-                logger.error(self.last_error)
-            
-            # Wait for next update or stop signal
-            if self.stop_event.wait(timeout=self.update_interval_seconds):
-                break
-        
+        # One event loop for the daemon's lifetime, shared by all accounts
+        loop = asyncio.new_event_loop()
+        self._loop = loop
+        try:
+            loop.run_until_complete(self._scheduler())
+        except Exception as e:
+            self.last_error = f"Daemon error: {e}"
+            logger.error(self.last_error)
+        finally:
+            self._loop = None
+            loop.run_until_complete(close_loop_resources())
+            loop.close()
         logger.info("Sources daemon stopped")
     
     def start(self):
@@ -192,7 +516,7 @@ class SourcesDaemon:
         self.stop_event.clear()
         self.thread = threading.Thread(target=self._daemon_loop, daemon=True)
         self.thread.start()
-        logger.info(f"Sources daemon started - updating every {self.update_interval_hours} hours")
+        logger.info(f"Sources daemon started - tracking {len(self.accounts)} accounts")
     
     def stop(self):
         """Stop the background daemon thread."""
@@ -200,18 +524,21 @@ class SourcesDaemon:
             return
         
         self.stop_event.set()
+        self._wake()
         self.is_running = False
         logger.info("Sources daemon stopped")
     
     def get_status(self) -> dict:
-        """Get current daemon status."""
+        """Get current daemon status, with the status of every account."""
         return {
             "is_running": self.is_running,
             "update_interval_hours": self.update_interval_hours,
             "last_update_time": self.last_update_time,
             "total_updates": self.total_updates,
             "total_posts_added": self.total_posts_added,
-            "last_error": self.last_error
+            "last_error": self.last_error,
+            "accounts": [account.get_status() for account in list(self.accounts.values())],
+            "api_quota": rapid_api_client.get_quota_status(),
         }
 
 
@@ -230,7 +557,7 @@ def start_background_daemon():
     daemon = get_daemon()
     if not daemon.is_running:
         daemon.start()
-        logger.info(f"Started daemon for {daemon.page_id}")
+        logger.info(f"Started daemon for {', '.join(daemon.accounts) or 'no accounts'}")
     else:
         logger.info("Daemon already running")
     return daemon
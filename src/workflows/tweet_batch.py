@@ -0,0 +1,148 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+from pathlib import Path
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from src.services.rapidapi import get_tweet_data, parse_tweet_id
+from src.workflows.editors import RENDER_WORKERS
+from src.workflows.tweet_creator import create_tweet_content
+from src.utils import enable_browser_pool
+
+logger = logging.getLogger(__name__)
+
+# Tweets processed at the same time (metadata, downloads and render)
+TWEET_BATCH_CONCURRENCY = int(os.getenv("TWEET_BATCH_CONCURRENCY", "8"))
+
+
+async def create_tweet_card(
+    tweet_url: str, output_dir: Path, crop_type: str, semaphore: asyncio.Semaphore
+) -> Dict:
+    """Fetch, render and save one tweet card, returning its manifest entry"""
+    entry = {
+        "url": tweet_url,
+        "tweet_id": parse_tweet_id(tweet_url),
+        "status": "failed",
+        "output": None,
+        "is_video": False,
+        "seconds": None,
+        "error": None,
+    }
+    async with semaphore:
+        start = time.perf_counter()
+        try:
+            tweet_data = await asyncio.to_thread(get_tweet_data, tweet_url)
+            if not tweet_data.get("userhandle"):
+                raise ValueError("Tweet data could not be fetched")
+            tweet_data["crop_type"] = crop_type
+
+            result, is_video = await create_tweet_content(tweet_data)
+            if not result:
+                raise ValueError("Rendering the card failed")
+
+            output = output_dir / f"{entry['tweet_id']}.{'mp4' if is_video else 'png'}"
+            output.write_bytes(result)
+            entry.update({"status": "ok", "output": output.name, "is_video": is_video})
+        except Exception as e:
+            logger.error(f"Failed to create card for {tweet_url}: {e}")
+            entry["error"] = str(e)
+        entry["seconds"] = round(time.perf_counter() - start, 2)
+    return entry
+
+
+async def create_tweet_cards(
+    tweet_urls: List[str],
+    output_dir: str,
+    crop_type: str = "cover",
+    concurrency: int = TWEET_BATCH_CONCURRENCY,
+    browsers: int = RENDER_WORKERS,
+) -> Dict:
+    """
+    Turn a list of tweet URLs into cards.
+
+    Tweets are processed concurrently: metadata and media are fetched while
+    other cards render, and screenshots reuse a pool of running browsers.
+    Cards are written to output_dir as <tweet_id>.png/.mp4 together with a
+    manifest.json listing every URL, its output or error, and the run's
+    throughput.
+
+    Returns:
+        The manifest
+    """
+    output_path = Path(output_dir)
+    output_path.mkdir(parents=True, exist_ok=True)
+    browser_pool = enable_browser_pool(browsers)
+
+    # The same tweet (e.g. pasted twice, or with another query string) is
+    # rendered once, like the <tweet_id> output names
+    urls_by_id = {}
+    for url in tweet_urls:
+        if url.strip():
+            urls_by_id.setdefault(parse_tweet_id(url.strip()), url.strip())
+    unique_urls = list(urls_by_id.values())
+    semaphore = asyncio.Semaphore(concurrency)
+    start = time.perf_counter()
+    try:
+        cards = await asyncio.gather(
+            *(create_tweet_card(url, output_path, crop_type, semaphore) for url in unique_urls)
+        )
+    finally:
+        browser_pool.close()
+    elapsed = time.perf_counter() - start
+
+    succeeded = sum(1 for card in cards if card["status"] == "ok")
+    manifest = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "crop_type": crop_type,
+        "total": len(cards),
+        "succeeded": succeeded,
+        "failed": len(cards) - succeeded,
+        "elapsed_seconds": round(elapsed, 2),
+        "cards_per_minute": round(succeeded / elapsed * 60, 2) if elapsed else 0,
+        "cards": cards,
+    }
+    with open(output_path / "manifest.json", "w") as f:
+        json.dump(manifest, f, indent=4)
+    return manifest
+
+
+def read_tweet_urls(source: Optional[str]) -> List[str]:
+    """Read tweet URLs, one per line, from a file or stdin ("-" or None)"""
+    if source in (None, "-"):
+        lines = sys.stdin.read().splitlines()
+    else:
+        lines = Path(source).read_text().splitlines()
+    return [line.strip() for line in lines if line.strip() and not line.startswith("#")]
+
+
+if __name__ == "__main__":
+    # python -m src.workflows.tweet_batch urls.txt --output ./data/twitter/batch
+    parser = argparse.ArgumentParser(description="Create tweet cards for a list of tweet URLs")
+    parser.add_argument("urls", nargs="?", default="-", help="File with one tweet URL per line (default: stdin)")
+    parser.add_argument("--output", default=f"./data/twitter/batch/{datetime.now():%Y%m%d_%H%M%S}")
+    parser.add_argument("--crop-type", default="cover", choices=["cover", "contain"])
+    parser.add_argument("--concurrency", type=int, default=TWEET_BATCH_CONCURRENCY)
+    parser.add_argument("--browsers", type=int, default=RENDER_WORKERS)
+    args = parser.parse_args()
+
+    manifest = asyncio.run(
+        create_tweet_cards(
+            read_tweet_urls(args.urls),
+            args.output,
+            crop_type=args.crop_type,
+            concurrency=args.concurrency,
+            browsers=args.browsers,
+        )
+    )
+    print(
+        f"{manifest['succeeded']}/{manifest['total']} cards in {manifest['elapsed_seconds']}s "
+        f"({manifest['cards_per_minute']} cards/min) -> {args.output}"
+    )
+    for card in manifest["cards"]:
+        if card["error"]:
+            print(f"  failed {card['url']}: {card['error']}")
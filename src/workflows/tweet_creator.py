@@ -1,16 +1,25 @@
 import uuid
 import os
+import asyncio
+import logging
 from pathlib import Path
 import re
 from datetime import datetime
+from typing import Optional
 
 from src.services.rapidapi import get_tweet_data
-from src.workflows.editors import text_editor
+from src.workflows.editors import text_editor, render_executor
 from src.templates.twitter.tweet_image import tweet_image_template
 from src.templates.twitter.tweet_text import tweet_text_template
 from src.templates.twitter.tweet_tag import tweet_tag_template
 
 from src.clients import download_image, download_video
+from src.services.avatar_cache import download_avatar
+
+logger = logging.getLogger(__name__)
+
+# Max seconds to wait for the profile pictures and media of a tweet
+TWEET_ASSET_DEADLINE = float(os.getenv("TWEET_ASSET_DEADLINE", "20"))
 
 def clean_tweet_text(tweet_text: str) -> str:
     """
@@ -28,29 +37,34 @@ async def create_tweet_content_from_url(tweet_url: str, crop_type: str = "cover"
     Returns:
         tuple: (Generated image/video content bytes, is_video boolean)
     """
-    # First fetch tweet data
-    tweet_data = get_tweet_data(tweet_url)
+    # First fetch tweet data, off the event loop
+    tweet_data = await asyncio.to_thread(get_tweet_data, tweet_url)
     # Then create content from data
     tweet_data["crop_type"] = crop_type
     return await create_tweet_content(tweet_data)
 
-async def handle_quoted_media(tweet_data: dict, session_id: str) -> tuple[dict, dict, bool]:
-    """Handle quoted media and return assets, text updates, and video flag"""
-    assets = {}
+def _media_download(media: dict, name: str, session_id: str) -> tuple[str, tuple]:
+    """Asset key and download spec of a tweet media item"""
+    if media["type"] == "photo":
+        return "background_image", (download_image, media["url"], f"./data/twitter/temp/{name}_image_{session_id}.png")
+    return "background_video", (download_video, media["url"], f"./data/twitter/temp/{name}_video_{session_id}.mp4")
+
+
+def handle_quoted_media(tweet_data: dict, session_id: str) -> tuple[dict, dict, bool]:
+    """Plan the quoted tweet downloads and return downloads, text updates, and video flag"""
+    downloads = {}
     text_updates = {}
     is_video = False
     
     if not tweet_data["quoted_media"]:
-        return assets, text_updates, is_video
+        return downloads, text_updates, is_video
     
-    media_type = tweet_data["quoted_media"][0]["type"]
-    media_url = tweet_data["quoted_media"][0]["url"]
-
-    profile_pic_data = await download_image(tweet_data["quoted_profile_picture_url"])
-    profile_pic_path = f"./data/twitter/temp/quoted_profile_pic_{session_id}.png"
-    with open(profile_pic_path, "wb") as f:
-        f.write(profile_pic_data.getvalue())
-    assets["quoted_profile_pic"] = profile_pic_path
+    media = tweet_data["quoted_media"][0]
+    downloads["quoted_profile_pic"] = (
+        download_avatar,
+        tweet_data["quoted_profile_picture_url"],
+        f"./data/twitter/temp/quoted_profile_pic_{session_id}.png",
+    )
     
     # Add quoted user info to text
     text_updates.update({
@@ -60,50 +74,70 @@ async def handle_quoted_media(tweet_data: dict, session_id: str) -> tuple[dict,
         "quoted_tweet_text": clean_tweet_text(tweet_data["quoted_text"])
     })
     
-    if media_type == "photo":
-        media_data = await download_image(media_url)
-        media_path = f"./data/twitter/temp/quoted_background_image_{session_id}.png"
-        with open(media_path, "wb") as f:
-            f.write(media_data.getvalue())
-        assets["background_image"] = media_path
-    elif media_type == "video" or media_type == "animated_gif":
-        media_data = await download_video(media_url)
-        media_path = f"./data/twitter/temp/quoted_background_video_{session_id}.mp4"
-        with open(media_path, "wb") as f:
-            f.write(media_data.getvalue())
-        assets["background_video"] = media_path
-        is_video = True
-    
-    return assets, text_updates, is_video
-
-async def handle_main_media(tweet_data: dict, session_id: str) -> tuple[dict, dict, bool]:
-    """Handle main tweet media and return assets, video edits, and video flag"""
-    assets = {}
+    if media["type"] in ("photo", "video", "animated_gif"):
+        key, download = _media_download(media, "quoted_background", session_id)
+        downloads[key] = download
+        is_video = key == "background_video"
+    
+    return downloads, text_updates, is_video
+
+def handle_main_media(tweet_data: dict, session_id: str) -> tuple[dict, dict, bool]:
+    """Plan the main tweet media download and return downloads, video edits, and video flag"""
+    downloads = {}
     video_edits = {}
     is_video = False
     
     if not tweet_data["media"]:
-        return assets, video_edits, is_video
-    
-    media_type = tweet_data["media"][0]["type"]
-    media_url = tweet_data["media"][0]["url"]
-    
-    if media_type == "photo":
-        media_data = await download_image(media_url)
-        media_path = f"./data/twitter/temp/background_image_{session_id}.png"
-        with open(media_path, "wb") as f:
-            f.write(media_data.getvalue())
-        assets["background_image"] = media_path
-    elif media_type == "video" or media_type == "animated_gif":
-        media_data = await download_video(media_url)
-        media_path = f"./data/twitter/temp/background_video_{session_id}.mp4"
-        with open(media_path, "wb") as f:
-            f.write(media_data.getvalue())
-        assets["background_video"] = media_path
-        is_video = True
-        video_edits = {"crop_type": "cover", "type": "video_overlay", "class_name":"tweet-media", "padding":85}
-    
-    return assets, video_edits, is_video
+        return downloads, video_edits, is_video
+    
+    media = tweet_data["media"][0]
+    if media["type"] in ("photo", "video", "animated_gif"):
+        key, download = _media_download(media, "background", session_id)
+        downloads[key] = download
+        if key == "background_video":
+            is_video = True
+            video_edits = {"crop_type": "cover", "type": "video_overlay", "class_name":"tweet-media", "padding":85}
+    
+    return downloads, video_edits, is_video
+
+async def _download_to_file(download, url: str, path: str) -> Optional[str]:
+    data = await download(url)
+    if data is None:
+        return None
+    with open(path, "wb") as f:
+        f.write(data.getvalue())
+    return path
+
+async def fetch_tweet_assets(downloads: dict, deadline: float = TWEET_ASSET_DEADLINE) -> dict:
+    """
+    Download all tweet assets concurrently on the shared http client.
+
+    Args:
+        downloads: Asset key -> (download function, url, file path)
+        deadline: Seconds to wait for all downloads; slower ones are cancelled
+
+    Returns:
+        Asset key -> file path of every asset that was downloaded
+    """
+    tasks = {
+        asyncio.create_task(_download_to_file(*download)): key
+        for key, download in downloads.items()
+    }
+    if not tasks:
+        return {}
+
+    done, pending = await asyncio.wait(tasks, timeout=deadline)
+    for task in pending:
+        task.cancel()
+        logger.warning(f"Tweet asset {tasks[task]} not downloaded within {deadline}s")
+
+    assets = {}
+    for task in done:
+        if task.exception():
+            logger.error(f"Failed to download tweet asset {tasks[task]}: {task.exception()}")
+        elif task.result():
+            assets[tasks[task]] = task.result()
+    return assets
 
 async def create_tweet_content(tweet_data: dict) -> tuple[bytes, bool]:
     """
@@ -138,16 +172,6 @@ async def create_tweet_content(tweet_data: dict) -> tuple[bytes, bool]:
     temp_dir = Path("./data/twitter/temp")
     temp_dir.mkdir(parents=True, exist_ok=True)
     
-    # Download and save main user profile picture
-    profile_pic_data = await download_image(tweet_data["profile_picture_url"])
-    profile_pic_path = f"./data/twitter/temp/profile_pic_{session_id}.png"
-    with open(profile_pic_path, "wb") as f:
-        f.write(profile_pic_data.getvalue())
-    
-    # Set up assets dictionary
-    assets = {
-        "profile_pic": profile_pic_path
-    }
     # Set up text dictionary
     text = {
         "user_name": tweet_data["username"],
@@ -158,14 +182,26 @@ async def create_tweet_content(tweet_data: dict) -> tuple[bytes, bool]:
     image_edits = {"crop_type": tweet_data["crop_type"]}
     video_edits = {}
     
-    # Handle quoted media
-    quoted_assets, quoted_text, quoted_is_video = await handle_quoted_media(tweet_data, session_id)
-    assets.update(quoted_assets)
+    # Collect every asset to download (main media wins over quoted media)
+    downloads = {
+        "profile_pic": (
+            download_avatar,
+            tweet_data["profile_picture_url"],
+            f"./data/twitter/temp/profile_pic_{session_id}.png",
+        )
+    }
+    quoted_downloads, quoted_text, quoted_is_video = handle_quoted_media(tweet_data, session_id)
+    downloads.update(quoted_downloads)
     text.update(quoted_text)
     
-    # Handle main media
-    main_assets, main_video_edits, main_is_video = await handle_main_media(tweet_data, session_id)
-    assets.update(main_assets)
+    main_downloads, main_video_edits, main_is_video = handle_main_media(tweet_data, session_id)
+    downloads.update(main_downloads)
+    
+    # Download all assets at once, bounded by the slowest single asset
+    assets = await fetch_tweet_assets(downloads)
+    missing = [key for key in downloads if key not in assets]
+    if missing:
+        raise RuntimeError(f"Failed to download tweet assets: {', '.join(missing)}")
     
     # Set video edits for quoted media if needed
     if quoted_is_video:
@@ -183,23 +219,25 @@ async def create_tweet_content(tweet_data: dict) -> tuple[bytes, bool]:
     else:
         template = tweet_text_template["slides"]["text_based_slide"]
     
-    # Call text_editor to generate content
-    result = text_editor(
-        template=template,
-        page_name="twitter",
-        image_edits=image_edits,
-        video_edits=video_edits,
-        text=text,
-        assets=assets,
-        session_id=session_id,
-        is_video=is_video
+    # Render on the render pool so the event loop stays free
+    loop = asyncio.get_running_loop()
+    result = await loop.run_in_executor(
+        render_executor,
+        text_editor,
+        template,
+        "twitter",
+        image_edits,
+        video_edits,
+        text,
+        assets,
+        session_id,
+        is_video,
     )
     
     return result, is_video
 
 
 if __name__ == "__main__":
-    import asyncio
     tweet_url = "https://x.com/divyanshiwho/status/1962363623675707434"
     result, is_video = asyncio.run(create_tweet_content_from_url(tweet_url))
     with open("./data_/tweet_test.png", "wb") as f:
@@ -1,11 +1,12 @@
 import streamlit as st
 import asyncio
 import time
-import base64
 import uuid
 import concurrent.futures
 
 from src.services.mongo_client import get_mongo_client
+from src.services.asset_store import load_image_bytes
+from streamlit_pages.image_loading import cached_image_bytes, download_on_demand
 from src.templates import get_template_config
 from src.workflows.content_creator import workflow
 from streamlit_pages.page_editor import text_editor_form
@@ -157,7 +158,6 @@ def show_content_results(session_id: str):
         if result_key not in st.session_state:
             mongo_client = get_mongo_client()
             result = mongo_client.get_workflow_result(session_id)
-            mongo_client.close()
             st.session_state[result_key] = result
         else:
             result = st.session_state[result_key]
@@ -246,19 +246,17 @@ def show_text_only_results(session_id: str, result: dict, slides: list, selected
                         else:
                             # Show original with text
                             try:
-                                # Validate base64 data exists
-                                base64_data = img_data.get("images", {}).get("with_text", {}).get("image_base64")
-                                if not base64_data:
-                                    raise ValueError("No base64 image data found")
-                                
-                                with_text_data = base64.b64decode(base64_data)
+                                with_text_data = cached_image_bytes(img_data.get("images", {}).get("with_text"), size="medium")
                                 if not with_text_data:
-                                    raise ValueError("Decoded image data is empty")
+                                    raise ValueError("No image data found")
                                 
-                                st.image(with_text_data, width=400)
-                                st.download_button(
+                                st.image(
+                                    with_text_data,
+                                    width=400,
+                                )
+                                download_on_demand(
                                     label="⬇️ Download",
-                                    data=with_text_data,
+                                    load=lambda info=img_data.get("images", {}).get("with_text"): load_image_bytes(info),
                                     file_name=f"slide_{selected_slide_idx+1}_post_{tab_idx+1}.png",
                                     mime="image/png",
                                     key=f"download_with_{session_id}_{selected_slide_idx}_{tab_idx}",
@@ -413,19 +411,17 @@ def show_media_results(session_id: str, result: dict, slides: list, selected_sli
                     with col1:
                         st.markdown("**Without Text Overlay**")
                         try:
-                            # Validate base64 data exists
-                            base64_data = img_data.get("images", {}).get("without_text", {}).get("image_base64")
-                            if not base64_data:
-                                raise ValueError("No base64 image data found")
-                            
-                            without_text_data = base64.b64decode(base64_data)
+                            without_text_data = cached_image_bytes(img_data.get("images", {}).get("without_text"), size="medium")
                             if not without_text_data:
-                                raise ValueError("Decoded image data is empty")
+                                raise ValueError("No image data found")
                             
-                            st.image(without_text_data, width=400)
-                            st.download_button(
+                            st.image(
+                                without_text_data,
+                                width=400,
+                            )
+                            download_on_demand(
                                 label="⬇️ Download",
-                                data=without_text_data,
+                                load=lambda info=img_data.get("images", {}).get("without_text"): load_image_bytes(info),
                                 file_name=f"slide_{selected_slide_idx+1}_post_{tab_idx+1}_without_text.png",
                                 mime="image/png",
                                 key=f"download_without_{session_id}_{selected_slide_idx}_{tab_idx}",
@@ -462,19 +458,17 @@ def show_media_results(session_id: str, result: dict, slides: list, selected_sli
                         else:
                             # Show original with text
                             try:
-                                # Validate base64 data exists
-                                base64_data = img_data.get("images", {}).get("with_text", {}).get("image_base64")
-                                if not base64_data:
-                                    raise ValueError("No base64 image data found")
-                                
-                                with_text_data = base64.b64decode(base64_data)
+                                with_text_data = cached_image_bytes(img_data.get("images", {}).get("with_text"), size="medium")
                                 if not with_text_data:
-                                    raise ValueError("Decoded image data is empty")
+                                    raise ValueError("No image data found")
                                 
-                                st.image(with_text_data, width=400)
-                                st.download_button(
+                                st.image(
+                                    with_text_data,
+                                    width=400,
+                                )
+                                download_on_demand(
                                     label="⬇️ Download",
-                                    data=with_text_data,
+                                    load=lambda info=img_data.get("images", {}).get("with_text"): load_image_bytes(info),
                                     file_name=f"slide_{selected_slide_idx+1}_post_{tab_idx+1}_with_text.png",
                                     mime="image/png",
                                     key=f"download_with_{session_id}_{selected_slide_idx}_{tab_idx}",
@@ -500,21 +494,16 @@ def show_media_results(session_id: str, result: dict, slides: list, selected_sli
                                     "text_template", {}
                                 )
                                 
-                                # Validate base64 data exists
-                                base64_data = img_data.get("images", {}).get("without_text", {}).get("image_base64")
-                                if not base64_data:
-                                    raise ValueError("No base64 image data found for editing")
-                                
-                                without_text_bytes = base64.b64decode(base64_data)
-                                if not without_text_bytes:
-                                    raise ValueError("Decoded image data is empty for editing")
+                                without_text_info = img_data.get("images", {}).get("without_text")
+                                if not without_text_info:
+                                    raise ValueError("No image data found for editing")
                                 # Get original image without text for editing
 
                                 # Get the specific slide configuration
                                 slide_config = template["slides"][slide_name]
                                 new_image, submitted = text_editor_form(
                                     text_values=current_text_values,
-                                    content_bytes=without_text_bytes,
+                                    content_bytes=lambda info=without_text_info: load_image_bytes(info),
                                     template={"slides": {slide_name: slide_config}},
                                     slide_name=slide_name,
                                     form_key=f"edit_form_{session_id}_{selected_slide_idx}_{tab_idx}",
@@ -1,19 +1,40 @@
 import streamlit as st
 import time
-import base64
 import uuid
 import logging
+import base64
 import pytz
+from datetime import datetime, timedelta
 
 from src.services.mongo_client import get_mongo_client
 from src.templates import get_template_config
 from streamlit_pages.page_editor import text_editor_form
+from streamlit_pages.image_loading import download_on_demand
+
+
+HISTORY_PAGE_SIZE = 15
+
+# Template types per page, used by the history filters
+PAGE_TEMPLATES = {
+    "scoopwhoop": ["timeline", "thumbnail", "writeup", "text_based", "meme"],
+    "twitter": ["tweet_image", "tweet_tag", "text_based"],
+    "social_village": ["content", "thumbnail"],
+    "the_sarcastic_indian": ["writeup"],
+    "infomance": ["content", "thumbnail", "thumbnail_3"],
+}
 
 
 def show_history_page():
     st.title("📜 Content Generation History")
     st.markdown("View previously generated content slides and workflows")
 
+    # Filters are applied by the database; changing them starts again at page 1
+    filters = show_history_filters()
+    if filters != st.session_state.get("history_filters"):
+        st.session_state.history_filters = filters
+        st.session_state.history_cursors = [None]
+        st.session_state.history_loaded = False
+
     # Loading overlay while fetching data
     if "history_loaded" not in st.session_state:
         st.session_state.history_loaded = False
@@ -27,9 +48,50 @@ def show_history_page():
         with col1:
             if st.button("🔄 Refresh", type="secondary"):
                 st.session_state.history_loaded = False
+                st.session_state.history_details = {}
                 st.rerun()
 
         display_history()
+        show_pagination()
+
+
+def show_history_filters():
+    """Show the history filters and return them as query arguments"""
+    with st.expander("🔍 Filters", expanded=False):
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            page_name = st.selectbox(
+                "Page", ["All"] + list(PAGE_TEMPLATES.keys()), key="history_filter_page"
+            )
+        with col2:
+            template_options = (
+                PAGE_TEMPLATES[page_name]
+                if page_name in PAGE_TEMPLATES
+                else sorted({t for templates in PAGE_TEMPLATES.values() for t in templates})
+            )
+            template_type = st.selectbox(
+                "Template", ["All"] + template_options, key="history_filter_template"
+            )
+        with col3:
+            date_range = st.date_input("Created between", value=(), key="history_filter_dates")
+        with col4:
+            error_state = st.selectbox(
+                "Status", ["All", "Successful", "Failed"], key="history_filter_status"
+            )
+
+    created_after = created_before = None
+    if len(date_range) > 0:
+        created_after = datetime.combine(date_range[0], datetime.min.time())
+    if len(date_range) > 1:
+        created_before = datetime.combine(date_range[1] + timedelta(days=1), datetime.min.time())
+
+    return {
+        "page_name": None if page_name == "All" else page_name,
+        "template_type": None if template_type == "All" else template_type,
+        "created_after": created_after,
+        "created_before": created_before,
+        "has_error": {"All": None, "Successful": False, "Failed": True}[error_state],
+    }
 
 
 def show_loading_overlay():
@@ -60,40 +122,56 @@ def show_loading_overlay():
 
 
 def load_history_data():
-    """Load history data from database"""
+    """Load the current page of history data from database"""
     try:
+        cursors = st.session_state.setdefault("history_cursors", [None])
         mongo_client = get_mongo_client()
-        history_data = mongo_client.get_recent_workflows(limit=15)
-        mongo_client.close()
+        page = mongo_client.list_workflows_page(
+            page_size=HISTORY_PAGE_SIZE,
+            cursor=cursors[-1],
+            **st.session_state.get("history_filters", {}),
+        )
 
-        st.session_state.history_data = history_data
+        st.session_state.history_data = page["items"]
+        st.session_state.history_next_cursor = page["next_cursor"]
         st.session_state.history_loaded = True
 
         st.rerun()
     except Exception as e:
         st.error(f"❌ Error loading history: {str(e)}")
         st.session_state.history_data = []
+        st.session_state.history_next_cursor = None
         st.session_state.history_loaded = True
 
 
-def display_history():
-    """Display the loaded history data"""
-    history_data = st.session_state.get("history_data", [])
+def show_pagination():
+    """Show previous/next buttons; only the current page is kept in memory"""
+    cursors = st.session_state.get("history_cursors", [None])
+    col1, col2, col3 = st.columns([1, 1, 4])
+    with col1:
+        if len(cursors) > 1 and st.button("⬅️ Previous", key="history_prev"):
+            cursors.pop()
+            st.session_state.history_loaded = False
+            st.rerun()
+    with col2:
+        next_cursor = st.session_state.get("history_next_cursor")
+        if next_cursor and st.button("Next ➡️", key="history_next"):
+            cursors.append(next_cursor)
+            st.session_state.history_loaded = False
+            st.rerun()
+    with col3:
+        st.caption(f"Page {len(cursors)}")
 
-    if not history_data:
-        st.info("📭 No generation history found. Generate some content first!")
-        return
 
-    # Filter for content creator workflows
-    content_workflows = [
-        w for w in history_data if w.get("workflow_type") == "content_creator"
-    ]
+def display_history():
+    """Display the loaded history data"""
+    content_workflows = st.session_state.get("history_data", [])
 
     if not content_workflows:
         st.info("📭 No content workflows found. Generate some content first!")
         return
 
-    st.success(f"📊 Found {len(content_workflows)} content generations")
+    st.success(f"📊 Showing {len(content_workflows)} content generations")
 
     # Display each workflow result
     for i, workflow_result in enumerate(content_workflows):
@@ -106,24 +184,70 @@ def display_history():
             f"{format_date(workflow_result.get('created_at'))}",
             expanded=(i == 0),
         ):
-            display_content_workflow(workflow_result)
+            display_content_workflow(workflow_result, open_by_default=(i == 0))
 
 
-def display_content_workflow(workflow_result):
+def get_history_details(session_id):
+    """Fetch a workflow's slide metadata once and keep it in session state"""
+    details_cache = st.session_state.setdefault("history_details", {})
+    if session_id not in details_cache:
+        mongo_client = get_mongo_client()
+        details_cache[session_id] = mongo_client.get_workflow_details(session_id)
+    return details_cache[session_id]
+
+
+def get_history_image(session_id, slide_index, image_index, with_text=True, size=None):
+    """Fetch a single image on demand
+
+    Thumbnails ("medium"/"small") are kept in session state for reruns; full
+    size images are only fetched for downloads and edits and never kept.
+    """
+    image_cache = st.session_state.setdefault("history_images", {})
+    cache_key = (session_id, slide_index, image_index, with_text, size)
+    if cache_key in image_cache:
+        return image_cache[cache_key]
+
+    mongo_client = get_mongo_client()
+    image_bytes = mongo_client.get_workflow_image(
+        session_id, slide_index, image_index, with_text=with_text, size=size
+    )
+    if not image_bytes:
+        raise ValueError("No image data found")
+    if size:
+        image_cache[cache_key] = image_bytes
+    return image_bytes
+
+
+def display_content_workflow(workflow_summary, open_by_default=False):
     """Display a content creator workflow result with similar layout to generate page"""
     # Basic info
-    col1, col2, col3 = st.columns(3)
+    col0, col1, col2, col3 = st.columns([1, 2, 2, 2])
 
+    with col0:
+        if workflow_summary.get("thumbnail"):
+            st.image(base64.b64decode(workflow_summary["thumbnail"]), width=80)
     with col1:
-        st.write(f"**Template:** {workflow_result.get('template_type', 'N/A').title()}")
+        st.write(f"**Template:** {workflow_summary.get('template_type', 'N/A').title()}")
     with col2:
-        st.write(f"**Total Slides:** {workflow_result.get('total_slides', 0)}")
+        st.write(f"**Total Slides:** {workflow_summary.get('total_slides', 0)}")
     with col3:
-        st.write(f"**Session ID:** {workflow_result.get('session_id', 'N/A')}")
+        st.write(f"**Session ID:** {workflow_summary.get('session_id', 'N/A')}")
 
     # Check for errors
-    if workflow_result.get("error"):
-        st.error(f"❌ **Error:** {workflow_result['error']}")
+    if workflow_summary.get("error"):
+        st.error(f"❌ **Error:** {workflow_summary['error']}")
+        return
+
+    # Slides and images are only fetched for workflows that are opened
+    session_id = workflow_summary.get("session_id", "unknown")
+    if not st.toggle(
+        "Show slides", value=open_by_default, key=f"history_open_{session_id}"
+    ):
+        return
+
+    workflow_result = get_history_details(session_id)
+    if not workflow_result:
+        st.warning("Workflow not found")
         return
 
     # Get slides data
@@ -134,7 +258,6 @@ def display_content_workflow(workflow_result):
 
     # Check if this is text-only content
 
-    session_id = workflow_result.get("session_id", "unknown")
     slide_options = [
         f"Slide {i+1}: {slide.get('name', f'slide_{i}')}"
         for i, slide in enumerate(slides)
@@ -204,13 +327,17 @@ def show_history_text_only_results(workflow_result, slides, session_id, selected
                         else:
                             # Show original with text
                             try:
-                                with_text_data = base64.b64decode(
-                                    img_data["images"]["with_text"]["image_base64"]
+                                st.image(
+                                    get_history_image(
+                                        session_id, selected_slide_idx, tab_idx, with_text=True, size="medium"
+                                    ),
+                                    width=400,
                                 )
-                                st.image(with_text_data, width=400)
-                                st.download_button(
+                                download_on_demand(
                                     label="⬇️ Download",
-                                    data=with_text_data,
+                                    load=lambda slide_idx=selected_slide_idx, image_idx=tab_idx: get_history_image(
+                                        session_id, slide_idx, image_idx, with_text=True
+                                    ),
                                     file_name=f"history_{session_id}_slide_{selected_slide_idx+1}_post_{tab_idx+1}.png",
                                     mime="image/png",
                                     key=f"history_download_with_{session_id}_{selected_slide_idx}_{tab_idx}",
@@ -349,13 +476,17 @@ def show_history_media_results(workflow_result, slides, session_id, selected_sli
                     with col1:
                         st.markdown("**Without Text**")
                         try:
-                            without_text_data = base64.b64decode(
-                                img_data["images"]["without_text"]["image_base64"]
+                            st.image(
+                                get_history_image(
+                                    session_id, selected_slide_idx, tab_idx, with_text=False, size="medium"
+                                ),
+                                width=400,
                             )
-                            st.image(without_text_data, width=400)
-                            st.download_button(
+                            download_on_demand(
                                 label="⬇️ Download",
-                                data=without_text_data,
+                                load=lambda slide_idx=selected_slide_idx, image_idx=tab_idx: get_history_image(
+                                    session_id, slide_idx, image_idx, with_text=False
+                                ),
                                 file_name=f"history_{session_id}_slide_{selected_slide_idx+1}_post_{tab_idx+1}_without_text.png",
                                 mime="image/png",
                                 key=f"history_download_without_{session_id}_{selected_slide_idx}_{tab_idx}",
@@ -390,13 +521,17 @@ def show_history_media_results(workflow_result, slides, session_id, selected_sli
                         else:
                             # Show original with text
                             try:
-                                with_text_data = base64.b64decode(
-                                    img_data["images"]["with_text"]["image_base64"]
+                                st.image(
+                                    get_history_image(
+                                        session_id, selected_slide_idx, tab_idx, with_text=True, size="medium"
+                                    ),
+                                    width=400,
                                 )
-                                st.image(with_text_data, width=400)
-                                st.download_button(
+                                download_on_demand(
                                     label="⬇️ Download",
-                                    data=with_text_data,
+                                    load=lambda slide_idx=selected_slide_idx, image_idx=tab_idx: get_history_image(
+                                        session_id, slide_idx, image_idx, with_text=True
+                                    ),
                                     file_name=f"history_{session_id}_slide_{selected_slide_idx+1}_post_{tab_idx+1}_with_text.png",
                                     mime="image/png",
                                     key=f"history_download_with_{session_id}_{selected_slide_idx}_{tab_idx}",
@@ -416,9 +551,9 @@ def show_history_media_results(workflow_result, slides, session_id, selected_sli
                         if "slides" in template and slide_name in template["slides"]:
                             # Get original image without text for editing
                             try:
-                                without_text_bytes = base64.b64decode(
-                                    img_data["images"]["without_text"]["image_base64"]
-                                )
+                                # Loaded only when the edit form is submitted
+                                def load_without_text(slide_idx=selected_slide_idx, image_idx=tab_idx):
+                                    return get_history_image(session_id, slide_idx, image_idx, with_text=False)
 
                                 # Extract current text values from slide data
                                 current_text_values = selected_slide.get(
@@ -427,7 +562,7 @@ def show_history_media_results(workflow_result, slides, session_id, selected_sli
 
                                 new_image = text_editor_form(
                                     text_values=current_text_values,
-                                    content_bytes=without_text_bytes,
+                                    content_bytes=load_without_text,
                                     template=template,
                                     slide_name=slide_name,
                                     form_key=f"history_edit_form_{session_id}_{selected_slide_idx}_{tab_idx}",
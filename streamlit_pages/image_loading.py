@@ -0,0 +1,57 @@
+import os
+from typing import Callable, Dict, Optional
+
+import streamlit as st
+
+from src.services.asset_store import load_image_bytes, open_asset
+from src.services.image_encoding import detect_content_type, filename_for
+
+# Stored assets never change (a new image gets a new id), so reads are cached
+# across reruns and sessions, keyed by asset id
+IMAGE_CACHE_ENTRIES = int(os.getenv("IMAGE_CACHE_ENTRIES", "500"))
+
+
+@st.cache_data(max_entries=IMAGE_CACHE_ENTRIES, show_spinner=False)
+def load_asset(asset_id: str, store: str) -> bytes:
+    """Read a stored asset (errors are raised, so they aren't cached)"""
+    with open_asset({"asset_id": asset_id, "store": store}) as stream:
+        return stream.read()
+
+
+def cached_image_bytes(image_info: Optional[Dict], size: Optional[str] = None) -> Optional[bytes]:
+    """load_image_bytes with asset store reads cached across reruns"""
+    if not image_info:
+        return None
+    thumbnail = (image_info.get("thumbnails") or {}).get(size) if size else None
+    asset = thumbnail or image_info.get("asset")
+    if asset and asset.get("asset_id"):
+        try:
+            return load_asset(asset["asset_id"], asset.get("store"))
+        except Exception:
+            return None
+    # Older documents with the image inlined as base64
+    return load_image_bytes(image_info, size=size)
+
+
+def download_on_demand(
+    label: str, load: Callable[[], Optional[bytes]], file_name: str, mime: str, key: str
+) -> None:
+    """
+    Download button for a full-size image that is only loaded once clicked.
+
+    Pages display thumbnails, so the full image is read from the asset store
+    (uncached) only when the user asks for it. Stored images may be JPEG,
+    WebP or AVIF, so the file extension and mime type follow the loaded
+    bytes (mime is only used when the format can't be detected).
+    """
+    if st.button(label, key=f"{key}_prepare"):
+        data = load()
+        if not data:
+            st.error("Failed to load image")
+            return
+        content_type = detect_content_type(data)
+        if content_type != "application/octet-stream":
+            file_name, mime = filename_for(file_name, content_type), content_type
+        st.download_button(
+            label="💾 Save file", data=data, file_name=file_name, mime=mime, key=key
+        )
@@ -1,7 +1,7 @@
 import streamlit as st
 import io
 import uuid
-from typing import Dict, Tuple
+from typing import Callable, Dict, Tuple, Union
 
 from PIL import Image
 
@@ -16,7 +16,7 @@ def text_editor_form(
     slide_name: str,
     form_key: str,
     page_name: str,
-    content_bytes: bytes,
+    content_bytes: Union[bytes, Callable[[], bytes]],
     show_image_upload: bool = False,
     is_video: bool = False,
     session_id: str = None,
@@ -27,7 +27,8 @@ def text_editor_form(
 
     Args:
         text_values: Current text values
-        content_bytes: Original image/video bytes
+        content_bytes: Original image/video bytes, or a function loading them
+            (only called when the form is submitted without an upload)
         template: Template configuration
         slide_name: Slide name
         form_key: Unique form key
@@ -173,6 +174,10 @@ def text_editor_form(
                     session_id = str(uuid.uuid4())[:8]
 
                 for key, value in assets_input.items():
+                    if value.get("file_type") == "bytes" and callable(value.get("content")):
+                        value["content"] = value["content"]()
+                        if not value["content"]:
+                            raise ValueError("Failed to load the original image")
                     if value.get("file_type") == "bytes":
                         file_name = f"{key}_{session_id}.{value.get('extension')}"
                         file_path = f"./data/{page_name}/temp/{file_name}"
@@ -10,6 +10,8 @@ import uuid
 
 from src.workflows.sources import get_sources_summary
 from src.services.mongo_client import get_mongo_client
+from src.services.asset_store import load_image_bytes
+from streamlit_pages.image_loading import cached_image_bytes, download_on_demand
 from src.templates import get_template_config
 from src.workflows.content_creator import workflow
 from streamlit_pages.page_editor import text_editor_form
@@ -63,7 +65,11 @@ def show_sources_page():
                     # Display original Instagram media (first item only)
                     media = post.get("media_bytes", "")
                     if media:
-                        image_bytes = base64.b64decode(media.get("image_bytes"))
+                        if media.get("asset"):
+                            image_bytes = cached_image_bytes(media)
+                        else:
+                            # Posts added before media was stored by content hash
+                            image_bytes = base64.b64decode(media.get("image_bytes") or "")
                         media_type = media.get("type")
                         
                         if image_bytes:
@@ -249,7 +255,6 @@ def show_generation_results(session_key: str, container_key: str):
         if result_key not in st.session_state:
             mongo_client = get_mongo_client()
             result = mongo_client.get_workflow_result(session_id)
-            mongo_client.close()
             st.session_state[result_key] = result
         else:
             result = st.session_state[result_key]
@@ -337,13 +342,15 @@ def show_sources_text_only_results(result, slides, session_id, container_key, se
                         else:
                             # Show original with text
                             try:
-                                base64_data = img_data.get("images", {}).get("with_text", {}).get("image_base64")
-                                if base64_data:
-                                    with_text_data = base64.b64decode(base64_data)
-                                    st.image(with_text_data, width=300)
-                                    st.download_button(
+                                with_text_data = cached_image_bytes(img_data.get("images", {}).get("with_text"), size="medium")
+                                if with_text_data:
+                                    st.image(
+                                        with_text_data,
+                                        width=300,
+                                    )
+                                    download_on_demand(
                                         label="⬇️ Download",
-                                        data=with_text_data,
+                                        load=lambda info=img_data.get("images", {}).get("with_text"): load_image_bytes(info),
                                         file_name=f"slide_{selected_slide_idx+1}_img_{tab_idx+1}.png",
                                         mime="image/png",
                                         key=f"download_with_{container_key}_{selected_slide_idx}_{tab_idx}",
@@ -496,13 +503,15 @@ def show_sources_media_results(result, slides, session_id, container_key, select
                     with col1:
                         st.markdown("**Without Text Overlay**")
                         try:
-                            base64_data = img_data.get("images", {}).get("without_text", {}).get("image_base64")
-                            if base64_data:
-                                without_text_data = base64.b64decode(base64_data)
-                                st.image(without_text_data, width=300)
-                                st.download_button(
+                            without_text_data = cached_image_bytes(img_data.get("images", {}).get("without_text"), size="medium")
+                            if without_text_data:
+                                st.image(
+                                    without_text_data,
+                                    width=300,
+                                )
+                                download_on_demand(
                                     label="⬇️ Download",
-                                    data=without_text_data,
+                                    load=lambda info=img_data.get("images", {}).get("without_text"): load_image_bytes(info),
                                     file_name=f"slide_{selected_slide_idx+1}_img_{tab_idx+1}_without_text.png",
                                     mime="image/png",
                                     key=f"download_without_{container_key}_{selected_slide_idx}_{tab_idx}",
@@ -539,13 +548,15 @@ def show_sources_media_results(result, slides, session_id, container_key, select
                         else:
                             # Show original with text
                             try:
-                                base64_data = img_data.get("images", {}).get("with_text", {}).get("image_base64")
-                                if base64_data:
-                                    with_text_data = base64.b64decode(base64_data)
-                                    st.image(with_text_data, width=300)
-                                    st.download_button(
+                                with_text_data = cached_image_bytes(img_data.get("images", {}).get("with_text"), size="medium")
+                                if with_text_data:
+                                    st.image(
+                                        with_text_data,
+                                        width=300,
+                                    )
+                                    download_on_demand(
                                         label="⬇️ Download",
-                                        data=with_text_data,
+                                        load=lambda info=img_data.get("images", {}).get("with_text"): load_image_bytes(info),
                                         file_name=f"slide_{selected_slide_idx+1}_img_{tab_idx+1}_with_text.png",
                                         mime="image/png",
                                         key=f"download_with_{container_key}_{selected_slide_idx}_{tab_idx}",
@@ -572,13 +583,12 @@ def show_sources_media_results(result, slides, session_id, container_key, select
                             try:
                                 current_text_values = selected_slide.get("text_template", {})
                                 
-                                base64_data = img_data.get("images", {}).get("without_text", {}).get("image_base64")
-                                if base64_data:
-                                    without_text_bytes = base64.b64decode(base64_data)
+                                without_text_info = img_data.get("images", {}).get("without_text")
+                                if without_text_info:
                                     
                                     new_image, submitted = text_editor_form(
                                         text_values=current_text_values,
-                                        content_bytes=without_text_bytes,
+                                        content_bytes=lambda info=without_text_info: load_image_bytes(info),
                                         page_name=page_name,
                                         template=template,
                                         slide_name=slide_name,
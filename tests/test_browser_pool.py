@@ -0,0 +1,37 @@
+import pytest
+
+from src import utils
+
+
+@pytest.fixture(autouse=True)
+def no_shared_pool(monkeypatch):
+    monkeypatch.setattr(utils, "_browser_pool", None)
+    monkeypatch.delenv("BROWSER_POOL_SIZE", raising=False)
+
+
+def test_closed_pool_is_no_longer_used():
+    pool = utils.enable_browser_pool(2)
+    assert utils.get_browser_pool() is pool
+
+    pool.close()
+
+    assert utils.get_browser_pool() is None
+
+
+def test_closed_pool_is_replaced_when_configured(monkeypatch):
+    monkeypatch.setenv("BROWSER_POOL_SIZE", "3")
+    pool = utils.get_browser_pool()
+    pool.close()
+
+    replacement = utils.get_browser_pool()
+
+    assert replacement is not pool
+    assert (replacement.size, replacement.closed) == (3, False)
+
+
+def test_enable_reuses_an_open_pool_of_the_same_size():
+    pool = utils.enable_browser_pool(2)
+
+    assert utils.enable_browser_pool(2) is pool
+    assert utils.enable_browser_pool(4) is not pool
+    assert pool.closed
@@ -0,0 +1,65 @@
+import subprocess
+import sys
+
+from src.workflows.content_batch import parse_jobs
+
+
+def test_parse_jobs_plain_and_json_lines():
+    jobs, errors = parse_jobs(
+        [
+            "# comment",
+            "",
+            "A plain headline",
+            '{"headline": "A JSON headline", "template_type": "timeline"}',
+        ],
+        "scoopwhoop",
+        "writeup",
+    )
+
+    assert errors == []
+    assert [(job["line"], job["headline"], job["template_type"]) for job in jobs] == [
+        (3, "A plain headline", "writeup"),
+        (4, "A JSON headline", "timeline"),
+    ]
+
+
+def test_parse_jobs_skips_malformed_json():
+    jobs, errors = parse_jobs(
+        ['{"headline": "Broken", ', "Still runs"], "scoopwhoop", "writeup"
+    )
+
+    assert [job["headline"] for job in jobs] == ["Still runs"]
+    assert len(errors) == 1
+    assert errors[0].startswith("line 1: invalid JSON")
+
+
+def test_parse_jobs_skips_missing_headline():
+    jobs, errors = parse_jobs(
+        ['{"page_name": "scoopwhoop"}', '{"headline": "  "}', "Still runs"],
+        "scoopwhoop",
+        "writeup",
+    )
+
+    assert [job["line"] for job in jobs] == [3]
+    assert errors == ["line 1: missing 'headline'", "line 2: headline is empty"]
+
+
+def test_parse_jobs_skips_unknown_template():
+    jobs, errors = parse_jobs(['{"headline": "x", "template_type": "nope"}'], "scoopwhoop", "writeup")
+
+    assert jobs == []
+    assert len(errors) == 1
+    assert errors[0].startswith("line 1: Unknown template type")
+
+
+def test_cli_strict_exits_non_zero_on_invalid_lines():
+    result = subprocess.run(
+        [sys.executable, "-m", "src.workflows.content_batch", "--strict", "--no-save"],
+        input='{"headline": "Broken", \n',
+        capture_output=True,
+        text=True,
+    )
+
+    assert result.returncode == 1
+    assert "line 1: invalid JSON" in result.stderr
+    assert "1 invalid lines, nothing was run" in result.stderr
@@ -0,0 +1,50 @@
+import asyncio
+
+import pytest
+
+from src.clients import FluxJobPoller
+
+
+def test_next_interval_backs_off_without_history():
+    poller = FluxJobPoller(min_interval=0.5, max_interval=5.0)
+
+    assert poller.next_interval(0, 0) == 1.0
+    assert poller.next_interval(1, 1.0) == 1.5
+    assert poller.next_interval(10, 4.0) == 5.0
+
+
+def test_next_interval_waits_for_the_next_observed_quantile():
+    poller = FluxJobPoller(min_interval=0.5, max_interval=5.0)
+    poller.durations.extend([4.0, 6.0, 8.0, 10.0, 12.0])
+
+    # The 10%, 25%, 50%, 75% and 90% quantiles are 4, 6, 8, 10 and 10 seconds
+    assert poller.next_interval(5.0, 1.0) == 1.0
+    assert poller.next_interval(7.9, 1.0) == 0.5
+    # Past every quantile: exponential backoff, capped
+    assert poller.next_interval(13.0, 2.0) == 3.0
+    assert poller.next_interval(13.0, 4.0) == 5.0
+
+
+def test_request_timeout_is_bounded_by_the_deadline():
+    poller = FluxJobPoller()
+
+    async def timeouts():
+        started_at = asyncio.get_running_loop().time()
+        return [
+            poller.request_timeout("job", 10, started_at),
+            poller.request_timeout("job", 10, started_at - 9.5),
+        ]
+
+    remaining, last = asyncio.run(timeouts())
+    assert 9 < remaining <= 10
+    assert last == FluxJobPoller.MIN_REQUEST_TIMEOUT
+
+
+def test_request_timeout_raises_after_the_deadline():
+    poller = FluxJobPoller()
+
+    async def expired():
+        poller.request_timeout("job", 10, asyncio.get_running_loop().time() - 11)
+
+    with pytest.raises(TimeoutError, match="job not ready after 10s"):
+        asyncio.run(expired())
@@ -0,0 +1,65 @@
+import io
+
+import pytest
+from PIL import Image
+
+from src.services import image_encoding
+from src.services.image_encoding import detect_content_type, encode_asset, encode_image, filename_for
+
+
+def png(size=(40, 30), mode="RGB"):
+    output = io.BytesIO()
+    Image.new(mode, size, "red").save(output, format="PNG")
+    return output.getvalue()
+
+
+def test_encodings_report_their_content_type():
+    for encoding, content_type in [("jpeg", "image/jpeg"), ("webp", "image/webp"), ("webp_lossless", "image/webp")]:
+        data, reported = encode_image(png(), encoding)
+        assert reported == content_type
+        assert detect_content_type(data) == content_type
+
+
+def test_passthrough_keeps_the_original_bytes():
+    original = png()
+
+    assert encode_image(original, "passthrough") == (original, "image/png")
+
+
+def test_avif_falls_back_to_webp_without_support(monkeypatch):
+    monkeypatch.setattr(image_encoding.features, "check", lambda feature: False)
+
+    data, content_type = encode_image(png(), "avif")
+
+    assert content_type == "image/webp"
+    assert detect_content_type(data) == "image/webp"
+
+
+def test_images_are_only_shrunk():
+    data, _ = encode_image(png((3000, 1000)), "webp")
+    assert Image.open(io.BytesIO(data)).size == (1200, 400)
+
+    data, _ = encode_image(png((40, 30)), "webp")
+    assert Image.open(io.BytesIO(data)).size == (40, 30)
+
+
+def test_jpeg_drops_transparency():
+    data, _ = encode_image(png(mode="RGBA"), "jpeg")
+
+    assert Image.open(io.BytesIO(data)).mode == "RGB"
+
+
+def test_invalid_input_raises():
+    with pytest.raises(ValueError):
+        encode_image(png(), "bmp")
+    with pytest.raises(ValueError):
+        encode_image(b"", "webp")
+
+
+def test_encode_asset_falls_back_to_the_original():
+    assert encode_asset(b"not an image", "photo") == (b"not an image", "application/octet-stream")
+
+
+def test_filename_follows_the_content_type():
+    assert filename_for("slide_1.png", "image/webp") == "slide_1.webp"
+    assert filename_for("slide_1.png", "application/octet-stream") == "slide_1.png"
@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+
+from src import agents
+
+MODELS = ["gpt-image-1", "imagen-4.0-ultra-generate-preview-06-06", "flux-pro-1.1-ultra"]
+
+
+@pytest.fixture(autouse=True)
+def api_keys(monkeypatch):
+    for key in agents.IMAGE_MODEL_KEYS.values():
+        monkeypatch.setenv(key, "x")
+
+
+def fake_generator(monkeypatch, delays, failing=()):
+    """Patch image_generator to answer after delays[model] seconds"""
+    started = []
+
+    async def image_generator(query="", model="gpt-image-1"):
+        started.append(model)
+        await asyncio.sleep(delays[model])
+        if model in failing:
+            raise RuntimeError(f"{model} failed")
+        return model.encode()
+
+    monkeypatch.setattr(agents, "image_generator", image_generator)
+    return started
+
+
+def test_first_image_wins(monkeypatch):
+    fake_generator(monkeypatch, {MODELS[0]: 0.2, MODELS[1]: 0.01, MODELS[2]: 0.2})
+
+    model, image = asyncio.run(agents.race_image_generator("q", MODELS))
+
+    assert (model, image) == (MODELS[1], MODELS[1].encode())
+
+
+def test_best_of_keeps_the_most_preferred_image(monkeypatch):
+    fake_generator(monkeypatch, {MODELS[0]: 0.05, MODELS[1]: 0.01, MODELS[2]: 0.01})
+
+    model, _ = asyncio.run(agents.race_image_generator("q", MODELS, mode="best_of"))
+
+    assert model == MODELS[0]
+
+
+def test_hedged_provider_only_starts_after_a_failure(monkeypatch):
+    started = fake_generator(
+        monkeypatch, {MODELS[0]: 0.01, MODELS[1]: 0.01, MODELS[2]: 0.01}, failing={MODELS[0]}
+    )
+
+    model, _ = asyncio.run(agents.race_image_generator("q", MODELS, hedge_delay=10))
+
+    assert model == MODELS[1]
+    assert started == MODELS[:2]
+
+
+def test_unconfigured_providers_are_skipped(monkeypatch):
+    monkeypatch.delenv("GOOGLE_API_KEY")
+
+    assert agents.configured_image_models(MODELS) == [MODELS[0], MODELS[2]]
+
+
+def test_all_providers_failing_raises(monkeypatch):
+    fake_generator(monkeypatch, {model: 0.01 for model in MODELS}, failing=set(MODELS))
+
+    with pytest.raises(Exception, match="No provider returned an image"):
+        asyncio.run(agents.race_image_generator("q", MODELS))
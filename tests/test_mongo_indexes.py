@@ -0,0 +1,138 @@
+import os
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+from pymongo import MongoClient
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+from src.services.mongo_client import SimpleMongoClient, workflows_page_pipeline
+
+MONGODB_URI = os.getenv("MONGODB_URI", "mongodb://localhost:27017/")
+
+
+@pytest.fixture(scope="module")
+def mongo_client():
+    """A client on a throwaway database, skipping the tests when no Mongo is reachable"""
+    client = MongoClient(MONGODB_URI, serverSelectionTimeoutMS=2000)
+    try:
+        client.admin.command("ping")
+    except PyMongoError:
+        pytest.skip(f"No MongoDB reachable at {MONGODB_URI}")
+
+    database_name = f"postgen_test_{uuid.uuid4().hex[:8]}"
+    previous_database = os.environ.get("MONGODB_DATABASE")
+    os.environ["MONGODB_DATABASE"] = database_name
+    try:
+        mongo_client = SimpleMongoClient(client=client)
+        mongo_client.ensure_indexes()
+
+        now = datetime.now()
+        mongo_client.collection.insert_many(
+            [
+                {
+                    "session_id": f"s{i}",
+                    "workflow_type": "content_creator",
+                    "page_name": "scoopwhoop",
+                    "template_type": "writeup" if i % 2 else "timeline",
+                    "created_at": now - timedelta(minutes=i),
+                    "error": None,
+                }
+                for i in range(50)
+            ]
+        )
+        yield mongo_client
+    finally:
+        client.drop_database(database_name)
+        client.close()
+        if previous_database is None:
+            os.environ.pop("MONGODB_DATABASE", None)
+        else:
+            os.environ["MONGODB_DATABASE"] = previous_database
+
+
+def plan_stages(explain) -> set:
+    """All stage names of an explain output"""
+    stages = set()
+    if isinstance(explain, dict):
+        if isinstance(explain.get("stage"), str):
+            stages.add(explain["stage"])
+        for value in explain.values():
+            stages |= plan_stages(value)
+    elif isinstance(explain, list):
+        for value in explain:
+            stages |= plan_stages(value)
+    return stages
+
+
+def explain_pipeline(mongo_client, pipeline) -> set:
+    explain = mongo_client.db.command(
+        "explain",
+        {"aggregate": mongo_client.collection.name, "pipeline": pipeline, "cursor": {}},
+        verbosity="queryPlanner",
+    )
+    return plan_stages(explain)
+
+
+@pytest.mark.parametrize(
+    "page_args",
+    [
+        {},
+        {"cursor": {"created_at": datetime.now(), "_id": str(ObjectId())}},
+        {"page_name": "scoopwhoop", "template_type": "writeup"},
+        {
+            "page_name": "scoopwhoop",
+            "template_type": "writeup",
+            "cursor": {"created_at": datetime.now(), "_id": str(ObjectId())},
+        },
+        {"created_after": datetime.now() - timedelta(days=1), "has_error": False},
+    ],
+    ids=["first_page", "next_page", "filtered", "filtered_next_page", "date_and_error_filter"],
+)
+def test_workflow_pages_use_an_index(mongo_client, page_args):
+    stages = explain_pipeline(mongo_client, workflows_page_pipeline(page_size=15, **page_args))
+    assert "IXSCAN" in stages
+    assert "COLLSCAN" not in stages
+
+
+def test_hot_queries_use_an_index(mongo_client):
+    usage = mongo_client.check_index_usage()
+    assert "COLLSCAN" not in usage.values(), usage
+
+
+def test_session_id_is_unique(mongo_client):
+    with pytest.raises(DuplicateKeyError):
+        mongo_client.collection.insert_one({"session_id": "s0"})
+
+
+def test_undeclared_indexes_are_only_dropped_on_request(mongo_client):
+    mongo_client.collection.create_index("headline", name="old_headline")
+
+    report = mongo_client.ensure_indexes()
+    assert report["ig_posts"]["undeclared"] == ["old_headline"]
+    assert "old_headline" in mongo_client.collection.index_information()
+
+    report = mongo_client.ensure_indexes(drop_undeclared=True)
+    assert report["ig_posts"]["dropped"] == ["old_headline"]
+    assert "old_headline" not in mongo_client.collection.index_information()
+
+
+def test_renamed_unique_index_waits_for_dedupe(mongo_client):
+    # An older deployment: non-unique session_id index and a collision
+    mongo_client.collection.drop_index("session_id_unique")
+    mongo_client.collection.create_index("session_id", name="session_id")
+    mongo_client.collection.insert_one({"session_id": "s1", "workflow_type": "content_creator"})
+
+    report = mongo_client.ensure_indexes(drop_undeclared=True)
+    assert "session_id_unique" in report["ig_posts"]["failed"]
+    assert "session_id" in mongo_client.collection.index_information()
+
+    assert mongo_client.dedupe_unique_keys() == {"ig_posts": 1}
+    assert mongo_client.collection.count_documents({"session_id": "s1"}) == 1
+
+    report = mongo_client.ensure_indexes(drop_undeclared=True)
+    assert report["ig_posts"]["dropped"] == ["session_id"]
+    indexes = mongo_client.collection.index_information()
+    assert "session_id" not in indexes
+    assert indexes["session_id_unique"]["unique"]
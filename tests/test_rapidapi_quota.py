@@ -0,0 +1,67 @@
+import time
+
+import pytest
+
+from src.services import rapidapi
+from src.services.rapidapi import RapidAPIClient, RapidAPIError
+
+
+class Response:
+    def __init__(self, headers):
+        self.headers = headers
+
+
+def client_with(headers):
+    client = RapidAPIClient()
+    client._update_quota("host", Response(headers))
+    return client
+
+
+def test_quota_headers_are_recorded():
+    client = client_with(
+        {
+            "x-ratelimit-requests-limit": "100",
+            "x-ratelimit-requests-remaining": "42",
+            "x-ratelimit-requests-reset": "60",
+        }
+    )
+
+    quota = client.quota["host"]
+    assert (quota["requests"], quota["limit"], quota["remaining"]) == (1, 100, 42)
+    assert quota["reset_at"] == pytest.approx(time.time() + 60, abs=5)
+    client._check_quota("host")
+
+
+def test_malformed_quota_headers_are_skipped():
+    client = client_with(
+        {
+            "x-ratelimit-requests-limit": "1.5",
+            "x-ratelimit-requests-remaining": "",
+            "x-ratelimit-requests-reset": "Tue, 01 Jan 2030 00:00:00 GMT",
+        }
+    )
+
+    quota = client.quota["host"]
+    assert (quota["limit"], quota["remaining"], quota["reset_at"]) == (None, None, None)
+
+
+def test_exhausted_quota_is_refused_until_it_resets():
+    client = client_with({"x-ratelimit-requests-remaining": "0", "x-ratelimit-requests-reset": "60"})
+
+    with pytest.raises(RapidAPIError, match="quota exhausted"):
+        client._check_quota("host")
+
+
+def test_one_probe_is_let_through_after_the_reset(monkeypatch):
+    monkeypatch.setattr(rapidapi, "RAPIDAPI_QUOTA_COOLDOWN", 600)
+    client = client_with({"x-ratelimit-requests-remaining": "0"})
+    assert client.quota["host"]["reset_at"] == pytest.approx(time.time() + 600, abs=5)
+
+    client.quota["host"]["reset_at"] = time.time() - 1
+    client._check_quota("host")
+    with pytest.raises(RapidAPIError):
+        client._check_quota("host")
+
+    # The probe's response reports fresh quota
+    client._update_quota("host", Response({"x-ratelimit-requests-remaining": "99"}))
+    client._check_quota("host")
@@ -0,0 +1,124 @@
+import asyncio
+
+import pytest
+
+from src.single_flight import SingleFlight, coalesce, workflow_scope
+
+
+def counting(result=None, error=None, delay=0.01):
+    """An async call counting its executions"""
+    calls = []
+
+    async def fn():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        if error:
+            raise error
+        return result
+
+    return fn, calls
+
+
+def test_concurrent_calls_share_one_execution():
+    fn, calls = counting("image")
+
+    async def run():
+        flight = SingleFlight()
+        return await asyncio.gather(*(flight.do("key", fn) for _ in range(5)))
+
+    assert asyncio.run(run()) == ["image"] * 5
+    assert len(calls) == 1
+
+
+def test_errors_reach_every_waiting_caller():
+    fn, calls = counting(error=ValueError("download failed"))
+
+    async def run():
+        flight = SingleFlight()
+        return await asyncio.gather(*(flight.do("key", fn) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert [str(result) for result in results] == ["download failed"] * 3
+    assert len(calls) == 1
+
+
+def test_a_cancelled_leader_lets_a_follower_retry():
+    fn, calls = counting("image", delay=0.05)
+
+    async def run():
+        flight = SingleFlight()
+        leader = asyncio.create_task(flight.do("key", fn))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flight.do("key", fn))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        return await follower
+
+    assert asyncio.run(run()) == "image"
+    assert len(calls) == 2
+
+
+def test_results_are_reused_only_inside_the_workflow_scope():
+    fn, calls = counting("image")
+
+    async def run():
+        with workflow_scope():
+            await coalesce("download", "url", fn)
+            await coalesce("download", "url", fn)
+        with workflow_scope():
+            await coalesce("download", "url", fn)
+        await coalesce("download", "url", fn)
+        await coalesce("download", "url", fn)
+
+    asyncio.run(run())
+    assert len(calls) == 4
+
+
+def test_namespaces_do_not_share_results():
+    fn, calls = counting("image")
+
+    async def run():
+        with workflow_scope():
+            await coalesce("download", "key", fn)
+            await coalesce("score", "key", fn)
+
+    asyncio.run(run())
+    assert len(calls) == 2
+
+
+def test_exceptions_are_not_memoized():
+    fn, calls = counting(error=ValueError("download failed"))
+
+    async def run():
+        with workflow_scope():
+            for _ in range(2):
+                with pytest.raises(ValueError):
+                    await coalesce("download", "url", fn)
+
+    asyncio.run(run())
+    assert len(calls) == 2
+
+
+def test_failed_results_are_only_shared_in_flight():
+    fn, calls = counting(None)
+
+    async def run():
+        with workflow_scope():
+            first = await asyncio.gather(*(coalesce("download", "url", fn) for _ in range(3)))
+            second = await coalesce("download", "url", fn)
+        return first, second
+
+    assert asyncio.run(run()) == ([None] * 3, None)
+    assert len(calls) == 2
+
+
+def test_cache_if_decides_what_is_memoized():
+    fn, calls = counting({"error": "quota"})
+
+    async def run():
+        with workflow_scope():
+            for _ in range(2):
+                await coalesce("serp", "q", fn, cache_if=lambda results: "error" not in results)
+
+    asyncio.run(run())
+    assert len(calls) == 2
@@ -0,0 +1,66 @@
+import pytest
+
+from src.workflows.sources import SourceAccount
+
+HOUR = 3600
+
+
+def account():
+    return SourceAccount("instagram", "123", interval_minutes=120)
+
+
+def test_interval_aims_at_the_target_posts_per_fetch():
+    source = account()
+
+    # 6 posts in the first 2 hours: 3 posts per hour, so fetch every hour
+    source._adapt_interval(6, has_more=False, now=0)
+
+    assert source.posts_per_hour == 3
+    assert source.interval_seconds == HOUR
+
+
+def test_busy_accounts_are_fetched_at_most_every_min_interval():
+    source = account()
+
+    source._adapt_interval(60, has_more=False, now=0)
+
+    assert source.interval_seconds == source.min_interval_seconds == 30 * 60
+
+
+def test_quiet_accounts_back_off_up_to_the_max():
+    source = account()
+
+    for _ in range(10):
+        source._adapt_interval(0, has_more=False, now=0)
+
+    assert source.interval_seconds == source.max_interval_seconds == 8 * HOUR
+
+
+def test_capped_fetches_catch_up_sooner():
+    source = account()
+
+    source._adapt_interval(0, has_more=True, now=0)
+
+    assert source.interval_seconds == HOUR
+
+
+def test_posting_rate_is_smoothed():
+    source = account()
+    source._adapt_interval(2, has_more=False, now=0)
+    source.last_run_at = 0
+
+    # 0 posts in the last 2 hours only moves the estimate by RATE_SMOOTHING
+    source._adapt_interval(0, has_more=False, now=2 * HOUR)
+
+    assert source.posts_per_hour == pytest.approx(0.7)
+    assert source.interval_seconds == pytest.approx(3 / 0.7 * HOUR)
+
+
+def test_failures_double_the_interval():
+    source = account()
+
+    source.record_result({"success": False, "error": "boom"}, duration=1, now=1000)
+
+    assert source.interval_seconds == 4 * HOUR
+    assert source.last_error == "boom"
+    assert 1000 + 0.9 * 4 * HOUR <= source.next_run_at <= 1000 + 1.1 * 4 * HOUR
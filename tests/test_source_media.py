@@ -0,0 +1,111 @@
+import io
+
+import pytest
+from PIL import Image
+
+from src.services import mongo_client
+from src.services.source_media import (
+    DHASH_BANDS,
+    SOURCE_MEDIA_MAX_DISTANCE,
+    dhash_bands,
+    hamming_distance,
+    media_url_key,
+)
+
+
+def test_media_url_key_ignores_host_and_signature():
+    assert media_url_key("https://scontent-a.cdninstagram.com/v/t51/123_n.jpg?oh=abc&oe=1") == "/v/t51/123_n.jpg"
+    assert media_url_key("https://scontent-b.cdninstagram.com/v/t51/123_n.jpg?oh=def") == "/v/t51/123_n.jpg"
+    assert media_url_key("") is None
+    assert media_url_key("https://example.com") is None
+
+
+def test_hamming_distance():
+    assert hamming_distance(0, 0) == 0
+    assert hamming_distance(0b1011, 0b0001) == 2
+    assert hamming_distance(0, (1 << 64) - 1) == 64
+
+
+def test_dhash_bands_split_the_hash():
+    bands = dhash_bands(0x0123456789ABCDEF)
+
+    assert len(bands) == DHASH_BANDS
+    assert bands[0] == "0:ef"
+    assert bands[-1] == "7:1"
+
+
+def test_near_duplicates_share_a_band():
+    value = 0x0123456789ABCDEF
+    # Flip one bit in as many bands as a match may differ in
+    near = value
+    for band in range(SOURCE_MEDIA_MAX_DISTANCE):
+        near ^= 1 << (band * 8)
+
+    assert hamming_distance(value, near) == SOURCE_MEDIA_MAX_DISTANCE
+    assert set(dhash_bands(value)) & set(dhash_bands(near))
+
+
+class FakeSourceMedia:
+    """The source_media collection queries store_source_media_batch makes"""
+
+    def __init__(self):
+        self.docs = {}
+
+    def find(self, query, projection=None):
+        (field, condition), = query.items()
+        wanted = set(condition["$in"])
+        return [dict(doc) for doc in self.docs.values() if wanted & set(doc.get(field, []))]
+
+    def insert_one(self, doc):
+        self.docs[doc["_id"]] = dict(doc)
+
+    def bulk_write(self, updates, ordered=True):
+        for update in updates:
+            doc = self.docs[update._filter["_id"]]
+            for field, value in update._doc["$addToSet"].items():
+                if value not in doc[field]:
+                    doc[field].append(value)
+
+
+@pytest.fixture
+def media_client(monkeypatch):
+    client = mongo_client.SimpleMongoClient.__new__(mongo_client.SimpleMongoClient)
+    client.source_media_collection = FakeSourceMedia()
+    client.asset_store = None
+    monkeypatch.setattr(
+        mongo_client, "store_asset", lambda store, data, filename, **kwargs: {"asset_id": filename}
+    )
+    return client
+
+
+def image(color):
+    output = io.BytesIO()
+    Image.new("RGB", (32, 32), color).save(output, format="PNG")
+    return output.getvalue()
+
+
+def test_different_images_sharing_a_band_are_not_merged(media_client, monkeypatch):
+    first, second = image("red"), image("blue")
+    # Same first band, but 56 differing bits
+    hashes = {first: 0, second: (1 << 64) - 1 - 0xFF}
+    monkeypatch.setattr(mongo_client, "dhash", hashes.get)
+
+    refs = media_client.store_source_media_batch(
+        [{"type": "image", "url": "https://cdn/a.jpg", "image_bytes": data} for data in (first, second)]
+    )
+
+    assert refs[0]["media_id"] != refs[1]["media_id"]
+    assert len(media_client.source_media_collection.docs) == 2
+
+
+def test_near_duplicate_images_are_merged(media_client, monkeypatch):
+    first, second = image("red"), image("blue")
+    hashes = {first: 0, second: (1 << SOURCE_MEDIA_MAX_DISTANCE) - 1}
+    monkeypatch.setattr(mongo_client, "dhash", hashes.get)
+
+    refs = media_client.store_source_media_batch(
+        [{"type": "image", "url": f"https://cdn/{i}.jpg", "image_bytes": data} for i, data in enumerate((first, second))]
+    )
+
+    assert refs[0]["media_id"] == refs[1]["media_id"]
+    assert len(media_client.source_media_collection.docs) == 1
@@ -0,0 +1,54 @@
+import json
+
+from src.utils import JsonArrayStreamParser
+
+STORYBOARD = {
+    "title": "t",
+    "storyboard": [
+        {"text": "first {not a brace}"},
+        {"text": "second", "nested": {"list": [1, 2]}},
+        {"text": "third \"quoted\" ]"},
+    ],
+}
+
+
+def parse(chunks, key="storyboard"):
+    parser = JsonArrayStreamParser(key)
+    objects = []
+    for chunk in chunks:
+        objects.extend(parser.feed(chunk))
+    return objects
+
+
+def test_objects_of_the_array_are_returned_with_their_index():
+    assert parse([json.dumps(STORYBOARD)]) == list(enumerate(STORYBOARD["storyboard"]))
+
+
+def test_objects_split_across_chunks():
+    text = json.dumps(STORYBOARD)
+
+    for size in (1, 3, 7):
+        chunks = [text[i : i + size] for i in range(0, len(text), size)]
+        assert parse(chunks) == list(enumerate(STORYBOARD["storyboard"]))
+
+
+def test_objects_are_returned_as_soon_as_they_close():
+    parser = JsonArrayStreamParser("storyboard")
+
+    assert parser.feed('{"storyboard": [{"a": 1}, {"b"') == [(0, {"a": 1})]
+    assert parser.feed(": 2}]}") == [(1, {"b": 2})]
+    assert parser.finished
+
+
+def test_malformed_objects_are_skipped_but_counted():
+    text = '{"storyboard": [{"a": 1}, {"b": 2,}, {"c" 3}, {"d": 4}]}'
+
+    assert parse([text[:20], text[20:]]) == [(0, {"a": 1}), (3, {"d": 4})]
+
+
+def test_nothing_after_the_array_is_parsed():
+    assert parse(['{"storyboard": [{"a": 1}], "other": [{"b": 2}]}']) == [(0, {"a": 1})]
+
+
+def test_key_split_across_chunks():
+    assert parse(['{"story', 'board"', ": [", '{"a": 1}]}']) == [(0, {"a": 1})]